@@ -142,11 +142,14 @@ class AsynchromixClient(object):
 
 
 class AsynchromixServer(object):
-    def __init__(self, sid, myid, send, recv, w3, contract):
+    def __init__(self, sid, myid, send, recv, w3, contract, drain=None):
         self.sid = sid
         self.myid = myid
         self.contract = contract
         self.w3 = w3
+        # Awaited at the start of each round of the offline and mixing loops, so
+        # that a slow server does not make the others queue messages without limit
+        self.drain = drain
         self._task1a = asyncio.ensure_future(self._offline_inputmasks_loop())
         self._task1a.add_done_callback(print_exception_callback)
         self._task1b = asyncio.ensure_future(self._offline_mixes_loop())
@@ -190,6 +193,10 @@ class AsynchromixServer(object):
     task
     """
 
+    async def _drain(self):
+        if self.drain is not None:
+            await self.drain()
+
     async def _preprocess_report(self):
         # Submit the preprocessing report
         tx_hash = self.contract.functions.preprocess_report(
@@ -224,6 +231,7 @@ class AsynchromixServer(object):
                 await asyncio.sleep(5)
 
             # Step 1a. II) Run generate triples and generate_bits
+            await self._drain()
             logging.info(
                 f"[{self.myid}] mixes available: {mixes_available} \
                    target: {target}"
@@ -275,6 +283,7 @@ class AsynchromixServer(object):
                 await asyncio.sleep(5)
 
             # Step 1b. II) Run Randousha
+            await self._drain()
             logging.info(
                 f"[{self.myid}] totalmasks: {totalmasks} \
                 inputmasks available: {inputmasks_available} \
@@ -391,6 +400,7 @@ class AsynchromixServer(object):
 
                 return msgs
 
+            await self._drain()
             send, recv = self.get_send_recv(f"mpc:{epoch}")
             logging.info(f"[{self.myid}] MPC initiated:{epoch}")
 
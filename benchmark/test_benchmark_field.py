@@ -0,0 +1,44 @@
+from pytest import mark
+
+
+def get_nonzero_elements(n, galois_field):
+    values = [galois_field.random() for _ in range(n)]
+    return [v if v != 0 else galois_field(1) for v in values]
+
+
+@mark.parametrize("n", [10, 100, 1000, 10000])
+def test_benchmark_invert_elementwise(benchmark, n, galois_field):
+    values = get_nonzero_elements(n, galois_field)
+    benchmark(lambda: [~v for v in values])
+
+
+@mark.parametrize("n", [10, 100, 1000, 10000])
+def test_benchmark_batch_inverse(benchmark, n, galois_field):
+    values = get_nonzero_elements(n, galois_field)
+    benchmark(galois_field.batch_inverse, values)
+
+
+@mark.parametrize("op", ["add", "sub", "mul", "neg", "div_small", "create"])
+def test_benchmark_field_op(benchmark, op, galois_field):
+    a, b = galois_field.random(), galois_field.random()
+    ops = {
+        "add": lambda: a + b,
+        "sub": lambda: a - b,
+        "mul": lambda: a * b,
+        "neg": lambda: -a,
+        "div_small": lambda: a / 4,
+        "create": lambda: galois_field(12345),
+    }
+    benchmark(ops[op])
+
+
+def test_benchmark_field_accumulate(benchmark, galois_field):
+    values = [galois_field.random() for _ in range(1000)]
+
+    def _accumulate():
+        acc = galois_field(0)
+        for v in values:
+            acc.add_in_place(v * v)
+        return acc
+
+    benchmark(_accumulate)
@@ -0,0 +1,82 @@
+import asyncio
+import socket
+from time import perf_counter
+
+from pytest import mark
+
+from honeybadgermpc.config import CommunicationConfig, NodeDetails, Transport
+from honeybadgermpc.ipc import NodeCommunicator, SharedMemoryCommunicator
+
+
+def _free_ports(n):
+    sockets = [socket.socket() for _ in range(n)]
+    for s in sockets:
+        s.bind(("127.0.0.1", 0))
+    ports = [s.getsockname()[1] for s in sockets]
+    for s in sockets:
+        s.close()
+    return ports
+
+
+async def _exchange(n, msgs_per_node, comm_config, msg=("sid", ("EST", 0, 1))):
+    peers = {i: NodeDetails("127.0.0.1", port) for i, port in enumerate(_free_ports(n))}
+    communicator_class = NodeCommunicator
+    if comm_config.transport == Transport.SHARED_MEMORY:
+        communicator_class = SharedMemoryCommunicator
+    nodes = [communicator_class(peers, i, 0, comm_config) for i in range(n)]
+    await asyncio.gather(*[node.__aenter__() for node in nodes])
+
+    async def _recv_all(node):
+        for _ in range(msgs_per_node * (n - 1)):
+            await node.recv()
+
+    start = perf_counter()
+    for _ in range(msgs_per_node):
+        for node in nodes:
+            for j in range(n):
+                if j != node.my_id:
+                    node.send(j, msg)
+    await asyncio.gather(*[_recv_all(node) for node in nodes])
+    elapsed = perf_counter() - start
+
+    await asyncio.gather(*[node.__aexit__(None, None, None) for node in nodes])
+    return elapsed
+
+
+@mark.parametrize("n", [4, 16, 64])
+@mark.parametrize("flush_bytes", [0, 2 ** 16])
+@mark.parametrize("transport", [Transport.TCP, Transport.SHARED_MEMORY])
+def test_benchmark_ipc_messages(benchmark, tmp_path, n, flush_bytes, transport):
+    loop = asyncio.get_event_loop()
+    msgs_per_node = 2 ** 12 // n
+    comm_config = CommunicationConfig(
+        flush_bytes=flush_bytes,
+        flush_delay=0,
+        transport=transport,
+        shm_dir=str(tmp_path),
+    )
+
+    # Small messages, as sent by binary agreement or single share openings
+    def _prog():
+        elapsed = loop.run_until_complete(_exchange(n, msgs_per_node, comm_config))
+        benchmark.extra_info["msgs_per_node"] = msgs_per_node
+        benchmark.extra_info["msgs_per_sec"] = n * (n - 1) * msgs_per_node / elapsed
+
+    benchmark.pedantic(_prog, rounds=3)
+
+
+@mark.parametrize("transport", [Transport.TCP, Transport.SHARED_MEMORY])
+def test_benchmark_ipc_bandwidth(benchmark, tmp_path, transport):
+    loop = asyncio.get_event_loop()
+    n, msgs_per_node = 4, 64
+    comm_config = CommunicationConfig(
+        flush_bytes=2 ** 20, flush_delay=0, transport=transport, shm_dir=str(tmp_path)
+    )
+    # Messages of one MB, such as large batches of shares
+    msg = ("sid", ("R1", 0, b"\x00" * 2 ** 20))
+
+    def _prog():
+        elapsed = loop.run_until_complete(_exchange(n, msgs_per_node, comm_config, msg))
+        benchmark.extra_info["mb_per_sec"] = n * (n - 1) * msgs_per_node / elapsed
+
+    benchmark.pedantic(_prog, rounds=3)
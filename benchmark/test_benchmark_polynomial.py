@@ -3,7 +3,14 @@ from random import randint
 from pytest import mark
 
 from honeybadgermpc.ntl import fft_interpolate, lagrange_interpolate
-from honeybadgermpc.polynomial import get_omega
+from honeybadgermpc.polynomial import (
+    _divmod_long,
+    _divmod_newton,
+    _mul_karatsuba,
+    _mul_ntt,
+    _mul_schoolbook,
+    get_omega,
+)
 
 cache = {}
 
@@ -38,6 +45,13 @@ def test_benchmark_fft_interpolate_python(benchmark, n, galois_field, polynomial
     benchmark(polynomial.interpolate_fft, y, omega)
 
 
+@mark.parametrize("n", [2 ** i for i in range(4, 17, 4)])
+def test_benchmark_fft_evaluate_python(benchmark, n, galois_field, polynomial):
+    _, y, _, omega = get_points(n, galois_field)
+    poly = polynomial(y)
+    benchmark(poly.evaluate_fft, omega, n)
+
+
 @mark.parametrize("n", [2 ** i for i in range(4, 21, 4)])
 def test_benchmark_fft_interpolate_cpp(benchmark, n, galois_field, polynomial):
     _, y, _, omega = get_points(n, galois_field)
@@ -46,3 +60,33 @@ def test_benchmark_fft_interpolate_cpp(benchmark, n, galois_field, polynomial):
     p = galois_field.modulus
     z = list(range(n))
     benchmark(fft_interpolate, z, y, omega, p, n)
+
+
+# Crossover benchmarks for the thresholds in honeybadgermpc/polynomial.py
+_mul_algorithms = {
+    "schoolbook": _mul_schoolbook,
+    "karatsuba": _mul_karatsuba,
+    "ntt": _mul_ntt,
+}
+
+
+@mark.parametrize("algorithm", list(_mul_algorithms))
+@mark.parametrize("n", [2 ** i for i in range(3, 11)])
+def test_benchmark_poly_mul(benchmark, algorithm, n, galois_field):
+    p = galois_field.modulus
+    a = [randint(0, p - 1) for _ in range(n)]
+    b = [randint(0, p - 1) for _ in range(n)]
+    benchmark(_mul_algorithms[algorithm], a, b, p)
+
+
+_divmod_algorithms = {"long": _divmod_long, "newton": _divmod_newton}
+
+
+@mark.parametrize("algorithm", list(_divmod_algorithms))
+@mark.parametrize("n", [2 ** i for i in range(4, 11)])
+def test_benchmark_poly_divmod(benchmark, algorithm, n, galois_field):
+    # Divide a polynomial with 2n coefficients by one with n coefficients
+    p = galois_field.modulus
+    a = [randint(0, p - 1) for _ in range(2 * n)]
+    b = [randint(1, p - 1) for _ in range(n)]
+    benchmark(_divmod_algorithms[algorithm], a, b, p)
@@ -5,7 +5,14 @@ from pytest import mark
 from honeybadgermpc.elliptic_curve import Subgroup
 from honeybadgermpc.field import GF
 from honeybadgermpc.polynomial import EvalPoint, polynomials_over
-from honeybadgermpc.reed_solomon import GaoRobustDecoder
+from honeybadgermpc.reed_solomon import (
+    Algorithm,
+    DecoderFactory,
+    GaoRobustDecoder,
+    IncrementalDecoder,
+    VandermondeDecoder,
+    VandermondeEncoder,
+)
 
 
 @mark.parametrize("t", [1, 3, 5, 10, 25, 33, 50, 100, 256])
@@ -57,3 +64,82 @@ def test_benchmark_gao_robust_decode_fft(benchmark, t, galois_field):
         else:
             shares_with_faults.append(int(truepoly(omega ** (i) % p)))
     benchmark(dec.robust_decode, parties, shares_with_faults)
+
+
+@mark.parametrize("algorithm", [Algorithm.VANDERMONDE, Algorithm.SUBPRODUCT_TREE])
+@mark.parametrize("n", [16, 64, 256])
+def test_benchmark_batch_decode(benchmark, algorithm, n, galois_field):
+    t = (n - 1) // 3
+    point = EvalPoint(galois_field, n)
+    dec = DecoderFactory.get(point, algorithm)
+    poly = polynomials_over(galois_field)
+    parties = list(range(t + 1))
+    shares = [
+        [int(p(i + 1)) for i in parties] for p in [poly.random(t) for _ in range(64)]
+    ]
+    benchmark(dec.decode_batch, parties, shares)
+
+
+@mark.parametrize("batched", [False, True])
+@mark.parametrize("t", [1, 5, 10])
+def test_benchmark_gao_robust_decode_batch(benchmark, t, batched, galois_field):
+    n = 3 * t + 1
+    p = galois_field.modulus
+    point = EvalPoint(galois_field, n)
+    dec = GaoRobustDecoder(t, point)
+    coeffs = [[randint(0, p - 1) for _ in range(t + 1)] for _ in range(256)]
+    encoded = VandermondeEncoder(point).encode_batch(coeffs)
+
+    # t faulty parties corrupting all of their shares
+    for row in encoded:
+        for i in range(t):
+            row[i] = randint(0, p - 1)
+
+    parties = list(range(n))
+    if batched:
+        benchmark(dec.robust_decode_batch, parties, encoded)
+    else:
+        benchmark(lambda: [dec.robust_decode(parties, row) for row in encoded])
+
+
+class _RowByRowGaoDecoder(GaoRobustDecoder):
+    """ Runs the robust decoder on every codeword, as IncrementalDecoder did before
+    robust_decode_batch.
+    """
+
+    def robust_decode_batch(self, z, encoded):
+        decoded, errors = [], set()
+        for row in encoded:
+            coeffs, found = self.robust_decode(z, row)
+            if coeffs is None:
+                break
+            decoded.append(coeffs)
+            errors |= set(found)
+        return decoded, sorted(errors)
+
+
+@mark.parametrize("batched", [False, True])
+@mark.parametrize("t", [1, 5, 10])
+def test_benchmark_incremental_decode_with_faults(benchmark, t, batched, galois_field):
+    n = 3 * t + 1
+    p = galois_field.modulus
+    point = EvalPoint(galois_field, n)
+    enc, dec = VandermondeEncoder(point), VandermondeDecoder(point)
+    robust_dec = (GaoRobustDecoder if batched else _RowByRowGaoDecoder)(t, point)
+    coeffs = [[randint(0, p - 1) for _ in range(t + 1)] for _ in range(256)]
+    encoded = enc.encode_batch(coeffs)
+
+    # Shares sent by each party, the first t of which corrupt all of their shares
+    shares = [[row[i] for row in encoded] for i in range(n)]
+    for i in range(t):
+        shares[i] = [randint(0, p - 1) for _ in encoded]
+
+    def _decode():
+        inc_dec = IncrementalDecoder(enc, dec, robust_dec, t, len(coeffs), t)
+        for i in range(n):
+            inc_dec.add(i, shares[i])
+            if inc_dec.done():
+                break
+        assert inc_dec.get_results()[0] == coeffs
+
+    benchmark(_decode)
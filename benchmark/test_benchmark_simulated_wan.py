@@ -0,0 +1,85 @@
+import asyncio
+import os
+
+from pytest import mark
+
+from honeybadgermpc.batch_reconstruction import batch_reconstruct
+from honeybadgermpc.broadcast.reliablebroadcast import reliablebroadcast
+from honeybadgermpc.config import ReconstructionConfig
+from honeybadgermpc.reed_solomon import Algorithm
+from honeybadgermpc.router import LinkConfig, SimulatedRouter, VirtualTimeEventLoop
+
+# A WAN with 50ms +- 10ms of latency and 100 Mbit/s links
+WAN = LinkConfig(latency=lambda rnd: rnd.gauss(0.05, 0.01), bandwidth=12.5 * 10 ** 6)
+
+
+def _run_simulated(benchmark, n, prog):
+    """ Runs prog(router) on virtual time, recording the simulated run time.
+    """
+
+    def _prog():
+        loop = VirtualTimeEventLoop()
+        try:
+            router = SimulatedRouter(n, WAN, seed=0)
+            start = loop.time()
+            loop.run_until_complete(prog(router))
+            benchmark.extra_info["simulated_seconds"] = loop.time() - start
+        finally:
+            loop.close()
+
+    benchmark(_prog)
+
+
+@mark.parametrize("t, msglen", [(1, 10 ** 4), (1, 10 ** 6), (5, 10 ** 4), (5, 10 ** 6)])
+def test_benchmark_simulated_rbc(benchmark, t, msglen):
+    n = 3 * t + 1
+    msg = os.urandom(msglen)
+
+    async def _prog(router):
+        await asyncio.gather(
+            *[
+                reliablebroadcast(
+                    "rbc",
+                    i,
+                    n,
+                    t,
+                    0,
+                    msg if i == 0 else None,
+                    router.recvs[i],
+                    router.sends[i],
+                )
+                for i in range(n)
+            ]
+        )
+
+    _run_simulated(benchmark, n, _prog)
+
+
+@mark.parametrize("optimistic", [False, True])
+@mark.parametrize("k", [2 ** 10, 2 ** 14])
+def test_benchmark_simulated_batch_reconstruction(
+    benchmark, galois_field, polynomial, optimistic, k
+):
+    n, t = 4, 1
+    polys = [polynomial.random(t) for _ in range(k)]
+    shares = [[poly(i + 1) for poly in polys] for i in range(n)]
+    config = ReconstructionConfig(False, Algorithm.GAO, optimistic)
+
+    async def _prog(router):
+        await asyncio.gather(
+            *[
+                batch_reconstruct(
+                    shares[i],
+                    galois_field.modulus,
+                    t,
+                    n,
+                    i,
+                    router.sends[i],
+                    router.recvs[i],
+                    config,
+                )
+                for i in range(n)
+            ]
+        )
+
+    _run_simulated(benchmark, n, _prog)
@@ -3,15 +3,18 @@ import logging
 import random
 import time
 from asyncio import Queue
+from collections import deque
 
 from honeybadgermpc.utils.misc import (
     chunk_data,
     flatten_lists,
     subscribe_recv,
     transpose_lists,
+    wrap_send,
 )
 
-from .field import GF
+from .field import GF, GFArray
+from .packed_sharing import unpack_secrets
 from .polynomial import EvalPoint
 from .reed_solomon import (
     Algorithm,
@@ -21,6 +24,17 @@ from .reed_solomon import (
     RobustDecoderFactory,
 )
 
+# Batches of at least this many chunks are encoded and decoded on a thread pool,
+# so that the native computation overlaps with receiving messages instead of
+# blocking the event loop. Smaller batches are cheaper to process inline than to
+# hand off to another thread.
+OFFLOAD_THRESHOLD = 64
+
+# Default number of shares per window in batch_reconstruct_stream, and the
+# default number of windows which may be reconstructing at the same time.
+STREAM_WINDOW_SIZE = 2 ** 14
+STREAM_MAX_IN_FLIGHT = 4
+
 
 async def fetch_one(awaitables):
     """ Given a list of awaitables, run them concurrently and
@@ -41,7 +55,7 @@ async def fetch_one(awaitables):
 
 
 async def incremental_decode(
-    receivers, encoder, decoder, robust_decoder, batch_size, t, degree, n
+    receivers, encoder, decoder, robust_decoder, batch_size, t, degree, n, offload=False
 ):
     inc_decoder = IncrementalDecoder(
         encoder,
@@ -53,7 +67,10 @@ async def incremental_decode(
     )
 
     async for idx, d in fetch_one(receivers):
-        inc_decoder.add(idx, d)
+        if offload:
+            await inc_decoder.add_async(idx, d)
+        else:
+            inc_decoder.add(idx, d)
         if inc_decoder.done():
             result, _ = inc_decoder.get_results()
             return result
@@ -85,6 +102,39 @@ def recv_each_party(recv, n):
     return _task, [q.get for q in queues]
 
 
+async def broadcast_decode(values, send, recv, n, t, degree, enc, dec, robust_dec):
+    """ Single round reconstruction, in which every party broadcasts its shares as
+    ('O', shares), and the polynomial of each position is decoded directly from the
+    shares received. The incremental decoder finishes once degree + t + 1 points agree
+    on every polynomial, and only resorts to robust decoding when some of them are
+    inconsistent.
+
+    args:
+        values: list of share values (ints) to broadcast
+        send: send function
+        recv: recv function only returning the ('O', shares) messages, as (j, shares)
+        n, t, degree: as in batch_reconstruct
+        enc, dec, robust_dec: encoder and decoders to decode with
+
+    output:
+        List of the coefficients of each decoded polynomial, or None on failure
+    """
+    task_o, recvs_o = recv_each_party(recv, n)
+    data_o = [asyncio.create_task(recv()) for recv in recvs_o]
+
+    for dest in range(n):
+        send(dest, ("O", values))
+
+    offload = len(values) >= OFFLOAD_THRESHOLD
+    try:
+        return await incremental_decode(
+            data_o, enc, dec, robust_dec, len(values), t, degree, n, offload
+        )
+    finally:
+        for task in [task_o, *data_o]:
+            task.cancel()
+
+
 async def batch_reconstruct(
     secret_shares,
     p,
@@ -97,23 +147,30 @@ async def batch_reconstruct(
     use_omega_powers=False,
     debug=False,
     degree=None,
+    codecs=None,
 ):
     """
     args:
-      shared_secrets: an array of points representing shared secrets S1 - SB
+      shared_secrets: an array of points representing shared secrets S1 - SB, either
+        as a list of GFElements or as a GFArray
       p: field modulus
       t: faults tolerated
       n: total number of nodes n >= 3t+1
       myid: id of the specific node running batch_reconstruction function
       degree: degree of polynomial to decode (defaults to t)
+      codecs: optional CodecCache to take the evaluation point, encoder and
+        decoders from, instead of building new ones
 
     output:
-      the reconstructed array of B shares
+      the reconstructed array of B shares (a GFArray if shared_secrets was one)
 
     Communication takes place over two rounds,
       objects sent/received of the form('R1', shares) or ('R2', shares)
       up to one of each for each party
 
+    If config.optimistic is set, communication instead takes place over a single
+      round, with objects of the form ('O', shares)
+
     Reconstruction takes places in chunks of t+1 values
     """
     bench_logger = logging.LoggerAdapter(
@@ -123,7 +180,12 @@ async def batch_reconstruct(
     if degree is None:
         degree = t
 
-    secret_shares = [v.value for v in secret_shares]
+    fp = GF(p)
+    packed = isinstance(secret_shares, GFArray)
+    if packed:
+        secret_shares = secret_shares.values
+    else:
+        secret_shares = [v.value for v in secret_shares]
 
     # (optional) Induce faults
     if config is not None and config.induce_faults:
@@ -134,34 +196,77 @@ async def batch_reconstruct(
     subscribe_task, subscribe = subscribe_recv(recv)
     del recv  # ILC enforces this in type system, no duplication of reads
 
-    task_r1, recvs_r1 = recv_each_party(subscribe("R1"), n)
-    data_r1 = [asyncio.create_task(recv()) for recv in recvs_r1]
+    optimistic = config is not None and config.optimistic and len(secret_shares) > 0
+    if optimistic:
+        recv_o = subscribe("O")
+        del subscribe
+
+    else:
+        task_r1, recvs_r1 = recv_each_party(subscribe("R1"), n)
+        data_r1 = [asyncio.create_task(recv()) for recv in recvs_r1]
 
-    task_r2, recvs_r2 = recv_each_party(subscribe("R2"), n)
-    data_r2 = [asyncio.create_task(recv()) for recv in recvs_r2]
-    del subscribe  # ILC should determine we can garbage collect after this
+        task_r2, recvs_r2 = recv_each_party(subscribe("R2"), n)
+        data_r2 = [asyncio.create_task(recv()) for recv in recvs_r2]
+        del subscribe  # ILC should determine we can garbage collect after this
 
     # Set up encoding and decoding algorithms
-    fp = GF(p)
-    decoding_algorithm = Algorithm.GAO if config is None else config.decoding_algorithm
+    if codecs is not None:
+        assert codecs.field == fp
+        _, enc, dec, robust_dec = codecs.get(degree, use_omega_powers)
+    else:
+        decoding_algorithm = (
+            Algorithm.GAO if config is None else config.decoding_algorithm
+        )
 
-    point = EvalPoint(fp, n, use_omega_powers=use_omega_powers)
-    enc = EncoderFactory.get(
-        point, Algorithm.FFT if use_omega_powers else Algorithm.VANDERMONDE
-    )
-    dec = DecoderFactory.get(
-        point, Algorithm.FFT if use_omega_powers else Algorithm.VANDERMONDE
-    )
-    robust_dec = RobustDecoderFactory.get(t, point, algorithm=decoding_algorithm)
+        point = EvalPoint(fp, n, use_omega_powers=use_omega_powers)
+        enc = EncoderFactory.get(
+            point, Algorithm.FFT if use_omega_powers else Algorithm.VANDERMONDE
+        )
+        dec = DecoderFactory.get(
+            point, Algorithm.FFT if use_omega_powers else Algorithm.VANDERMONDE
+        )
+        robust_dec = RobustDecoderFactory.get(
+            degree, point, algorithm=decoding_algorithm
+        )
+
+    def _output(result):
+        # Get back result as GFElement type, or as a GFArray if the input was packed
+        assert len(result) >= len(secret_shares)
+        if packed:
+            return GFArray(result[: len(secret_shares)], fp)
+        return list(map(fp, result[: len(secret_shares)]))
+
+    if optimistic:
+        # Optimistic mode: a single round in which every party broadcasts its
+        # shares, which are then decoded directly (see broadcast_decode)
+        start_time = time.time()
+        try:
+            recons = await broadcast_decode(
+                secret_shares, send, recv_o, n, t, degree, enc, dec, robust_dec
+            )
+        finally:
+            subscribe_task.cancel()
+
+        if recons is None:
+            logging.error("[BatchReconstruct] Optimistic reconstruction failed!")
+            return None
+
+        end_time = time.time()
+        bench_logger.info(f"[BatchReconstruct] Optimistic: {end_time - start_time}")
+        return _output([poly[0] for poly in recons])
 
     # Prepare data for step 1
     round1_chunks = chunk_data(secret_shares, degree + 1)
     num_chunks = len(round1_chunks)
+    offload = num_chunks >= OFFLOAD_THRESHOLD
 
     # Step 1: Compute the polynomial P1, then send the elements
     start_time = time.time()
 
-    encoded = enc.encode(round1_chunks)
+    if offload:
+        encoded = await enc.encode_async(round1_chunks)
+    else:
+        encoded = enc.encode(round1_chunks)
     to_send = transpose_lists(encoded)
     for dest, message in enumerate(to_send):
         send(dest, ("R1", message))
@@ -173,7 +278,7 @@ async def batch_reconstruct(
     start_time = time.time()
     try:
         recons_r2 = await incremental_decode(
-            data_r1, enc, dec, robust_dec, num_chunks, t, degree, n
+            data_r1, enc, dec, robust_dec, num_chunks, t, degree, n, offload
         )
     except asyncio.CancelledError:
         # Cancel all created tasks
@@ -202,7 +307,7 @@ async def batch_reconstruct(
     start_time = time.time()
     try:
         recons_p = await incremental_decode(
-            data_r2, enc, dec, robust_dec, num_chunks, t, degree, n
+            data_r2, enc, dec, robust_dec, num_chunks, t, degree, n, offload
         )
     except asyncio.CancelledError:
         # Cancel all created tasks
@@ -220,8 +325,155 @@ async def batch_reconstruct(
     for task in [task_r1, task_r2, subscribe_task, *data_r1, *data_r2]:
         task.cancel()
 
-    result = flatten_lists(recons_p)
-    assert len(result) >= len(secret_shares)
+    return _output(flatten_lists(recons_p))
+
+
+async def batch_reconstruct_stream(
+    secret_shares,
+    p,
+    t,
+    n,
+    myid,
+    send,
+    recv,
+    window_size=STREAM_WINDOW_SIZE,
+    max_in_flight=STREAM_MAX_IN_FLIGHT,
+    config=None,
+    use_omega_powers=False,
+    degree=None,
+    codecs=None,
+):
+    """
+    Streaming version of batch_reconstruct for very large share arrays.
+
+    The shares are split into windows of window_size shares, each of which is
+    reconstructed with its own R1/R2 sub-rounds by batch_reconstruct. At most
+    max_in_flight windows are being reconstructed at once, so that encoding,
+    sending and decoding of neighbouring windows overlap while the memory used
+    stays bounded by the window size rather than the size of the whole array.
+
+    args:
+      shared_secrets: list of GFElements or a GFArray, as in batch_reconstruct
+      p, t, n, myid, send, recv, config, use_omega_powers, degree, codecs: as in
+        batch_reconstruct
+      window_size: number of shares per window. This is rounded down to a
+        multiple of degree + 1 so that only the last window is padded.
+      max_in_flight: maximum number of windows reconstructing concurrently
+
+    output:
+      Async iterator yielding the reconstructed values of each window in order,
+      in the same form batch_reconstruct returns them. If a window fails to
+      reconstruct, None is yielded for it and the stream ends.
+
+    All parties must use the same window_size. Messages are sent as
+    (window index, ('R1', shares)) or (window index, ('R2', shares)).
+    """
+    assert max_in_flight > 0
+
+    if degree is None:
+        degree = t
+
+    chunk_size = degree + 1
+    window_size = max(window_size - window_size % chunk_size, chunk_size)
+    num_windows = (len(secret_shares) + window_size - 1) // window_size
+
+    subscribe_task, subscribe = subscribe_recv(recv)
+    del recv
+
+    def _start(w):
+        window = secret_shares[w * window_size : (w + 1) * window_size]
+        return asyncio.create_task(
+            batch_reconstruct(
+                window,
+                p,
+                t,
+                n,
+                myid,
+                wrap_send(str(w), send),
+                subscribe(str(w)),
+                config=config,
+                use_omega_powers=use_omega_powers,
+                degree=degree,
+                codecs=codecs,
+            )
+        )
+
+    in_flight = deque()
+    try:
+        for w in range(num_windows):
+            in_flight.append(_start(w))
+            if len(in_flight) < max_in_flight and w + 1 < num_windows:
+                continue
+
+            result = await in_flight.popleft()
+            yield result
+            if result is None:
+                return
+
+        while in_flight:
+            result = await in_flight.popleft()
+            yield result
+            if result is None:
+                return
+    finally:
+        for task in [subscribe_task, *in_flight]:
+            task.cancel()
+
+
+async def batch_reconstruct_packed(
+    secret_shares, p, t, ell, n, myid, send, recv, degree=None, codecs=None
+):
+    """
+    Opens packed secret shares, each holding ell secrets (see
+    honeybadgermpc.packed_sharing), in a single round with broadcast_decode.
+
+    args:
+      secret_shares: packed share values, as a list of GFElements or a GFArray
+      p: field modulus
+      t: faults tolerated
+      ell: number of secrets per packed share
+      n: total number of nodes n >= degree + 2t + 1
+      myid: id of the specific node running batch_reconstruction function
+      degree: degree of the packed shares (defaults to t + ell - 1)
+      codecs: optional CodecCache to take the encoder and decoders from
+
+    output:
+      GFArray of the len(secret_shares) * ell opened secrets, or None on failure
+
+    Objects sent/received are of the form ('O', shares)
+    """
+    if degree is None:
+        degree = t + ell - 1
+
+    fp = GF(p)
+    if isinstance(secret_shares, GFArray):
+        values = secret_shares.values
+    else:
+        values = [v.value for v in secret_shares]
+
+    if len(values) == 0:
+        return GFArray([], fp)
+
+    if codecs is not None:
+        _, enc, dec, robust_dec = codecs.get(degree)
+    else:
+        point = EvalPoint(fp, n)
+        enc = EncoderFactory.get(point, Algorithm.VANDERMONDE)
+        dec = DecoderFactory.get(point, Algorithm.VANDERMONDE)
+        robust_dec = RobustDecoderFactory.get(degree, point)
+
+    subscribe_task, subscribe = subscribe_recv(recv)
+    del recv
+
+    try:
+        recons = await broadcast_decode(
+            values, send, subscribe("O"), n, t, degree, enc, dec, robust_dec
+        )
+    finally:
+        subscribe_task.cancel()
+
+    if recons is None:
+        logging.error("[BatchReconstruct] Packed reconstruction failed!")
+        return None
 
-    # Get back result as GFElement type
-    return list(map(fp, result[: len(secret_shares)]))
+    return GFArray(unpack_secrets(fp, recons, ell), fp, reduced=True)
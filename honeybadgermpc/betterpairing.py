@@ -5,6 +5,9 @@ from hashlib import sha256
 
 from pypairing import PyFq, PyFq12, PyFq2, PyFqRepr, PyFr, PyG1, PyG2
 
+from .lagrange import lagrange_coefficients
+from .utils.serialization import register_type
+
 # Order of BLS group
 bls12_381_r = 52435875175126190479447740508185965837690552500527637822603658699938581184513  # (# noqa: E501)
 
@@ -40,6 +43,7 @@ def dupe_pyfq12(pyfq12):
     return out
 
 
+@register_type
 class G1:
     def __init__(self, other=None):
         if other is None:
@@ -229,6 +233,7 @@ class G1:
         return out
 
 
+@register_type
 class G2:
     def __init__(self, other=None):
         if other is None:
@@ -433,6 +438,7 @@ class G2:
         return out
 
 
+@register_type
 class GT:
     def __init__(self, other=None):
         if other is None:
@@ -572,6 +578,7 @@ class GT:
         return out
 
 
+@register_type
 class ZR:
     def __init__(self, val=None):
         if val is None:
@@ -787,14 +794,10 @@ class ZR:
 def lagrange_at_x(s, j, x):
     s = sorted(s)
     assert j in s
-    l1 = [x - jj for jj in s if jj != j]
-    l2 = [j - jj for jj in s if jj != j]
-    (num, den) = (ZR(1), ZR(1))
-    for item in l1:
-        num *= item
-    for item in l2:
-        den *= item
-    return num / den
+    # ZR is the scalar field of BLS12-381, so the coefficients can be taken from
+    # the shared coefficient cache
+    coefficients = lagrange_coefficients(bls12_381_r, s, int(x))
+    return ZR(coefficients[s.index(j)])
 
 
 def interpolate_g1_at_x(coords, x, order=-1):
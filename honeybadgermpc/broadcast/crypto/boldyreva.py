@@ -12,6 +12,8 @@ from operator import mul
 
 from charm.toolbox.pairinggroup import G1, G2, PairingGroup, ZR, pair
 
+from honeybadgermpc.lagrange import lagrange_coefficients
+
 
 # group = PairingGroup('SS512')
 # group = PairingGroup('MNT159')
@@ -102,10 +104,9 @@ class TBLSPublicKey(object):
 
         assert j in s
         assert 0 <= j < self.l
-        num = reduce(mul, [0 - jj - 1 for jj in s if jj != j], ONE)
-        den = reduce(mul, [j - jj for jj in s if jj != j], ONE)  # noqa: E272
-        # assert num % den == 0
-        return num / den
+        # Player jj holds the evaluation at jj + 1, interpolate at 0
+        coefficients = lagrange_coefficients(group.order(), [jj + 1 for jj in s], 0)
+        return group.init(ZR, coefficients[s.index(j)])
 
     def hash_message(self, m):
         """ """
@@ -14,6 +14,7 @@ import json
 from argparse import ArgumentParser
 
 from honeybadgermpc.reed_solomon import Algorithm as RSAlgorithm
+from honeybadgermpc.reed_solomon import CalibrationProfile
 
 
 # NOTE About `# noqa B903`. B903 is an opinionated warning.
@@ -36,9 +37,16 @@ class ConfigVars(object):
 
 
 class ReconstructionConfig(object):
-    def __init__(self, induce_faults, decoding_algorithm):
+    def __init__(
+        self, induce_faults, decoding_algorithm, optimistic=False, rs_profile=None
+    ):
         self.induce_faults = induce_faults
         self.decoding_algorithm = decoding_algorithm
+        # Open share arrays in a single round (see batch_reconstruct)
+        self.optimistic = optimistic
+        # Path of the calibration profile to select encoders and decoders with (see
+        # reed_solomon.CalibrationProfile), or None to use the built-in heuristics
+        self.rs_profile = rs_profile
 
     @classmethod
     def default(cls):
@@ -58,6 +66,92 @@ class ReconstructionConfig(object):
             ), f"decoding_algorithm must be in {decoding_algorithms}"
             res.decoding_algorithm = json_config["decoding_algorithm"]
 
+        if "optimistic" in json_config:
+            res.optimistic = json_config["optimistic"]
+        if "rs_profile" in json_config:
+            res.rs_profile = json_config["rs_profile"]
+
+        return res
+
+
+class Transport(object):
+    TCP = "tcp"
+    # Only for parties running on the same host
+    SHARED_MEMORY = "shm"
+
+
+class CommunicationConfig(object):
+    def __init__(
+        self,
+        flush_bytes,
+        flush_delay,
+        transport=Transport.TCP,
+        shm_dir="/dev/shm/hbmpc",
+        ring_size=2 ** 24,
+        window=2 ** 12,
+        high_water=2 ** 14,
+        max_queued=2 ** 16,
+        auth_keys=None,
+        resend_timeout=1.0,
+    ):
+        # Messages to a node are coalesced into a single frame of up to flush_bytes,
+        # waiting for at most flush_delay seconds for more messages to be queued
+        self.flush_bytes = flush_bytes
+        self.flush_delay = flush_delay
+        self.transport = transport
+        # Directory holding the ring buffers of the shared memory transport, which
+        # should not be shared between concurrent runs
+        self.shm_dir = shm_dir
+        self.ring_size = ring_size
+        # Number of messages a node may send to a peer before the peer consumes
+        # them, or 0 to disable flow control
+        self.window = window
+        # Number of messages queued for a node above which NodeCommunicator.drain
+        # waits
+        self.high_water = high_water
+        # Number of messages queued for a node above which NodeCommunicator.send
+        # buffers them aside until the queue has room, for producers which do not
+        # wait for drain
+        self.max_queued = max_queued
+        # Hex encoded keys shared with each node, by node id, to authenticate the
+        # messages of each peer, or None to trust the zmq identity of the sender.
+        # Authentication needs a flow control window.
+        self.auth_keys = auth_keys
+        # Seconds after which messages which were not acked are sent again
+        self.resend_timeout = resend_timeout
+
+    @classmethod
+    def default(cls):
+        return cls(flush_bytes=2 ** 20, flush_delay=0)
+
+    @classmethod
+    def from_json(cls, json_config):
+        res = cls.default()
+        if "flush_bytes" in json_config:
+            res.flush_bytes = json_config["flush_bytes"]
+        if "flush_delay" in json_config:
+            res.flush_delay = json_config["flush_delay"]
+
+        transports = [Transport.TCP, Transport.SHARED_MEMORY]
+        if "transport" in json_config:
+            transport = json_config["transport"]
+            assert transport in transports, f"transport must be in {transports}"
+            res.transport = transport
+        if "shm_dir" in json_config:
+            res.shm_dir = json_config["shm_dir"]
+        if "ring_size" in json_config:
+            res.ring_size = json_config["ring_size"]
+        if "window" in json_config:
+            res.window = json_config["window"]
+        if "high_water" in json_config:
+            res.high_water = json_config["high_water"]
+        if "max_queued" in json_config:
+            res.max_queued = json_config["max_queued"]
+        if "auth_keys" in json_config:
+            res.auth_keys = json_config["auth_keys"]
+        if "resend_timeout" in json_config:
+            res.resend_timeout = json_config["resend_timeout"]
+
         return res
 
 
@@ -69,6 +163,7 @@ class HbmpcConfig(object):
     skip_preprocessing = False
     extras = None
     reconstruction = None
+    communication = None
 
     @staticmethod
     def load_config():
@@ -116,6 +211,13 @@ class HbmpcConfig(object):
             HbmpcConfig.reconstruction = ReconstructionConfig.from_json(
                 reconstruction_data
             )
+            rs_profile = HbmpcConfig.reconstruction.rs_profile
+            if rs_profile is not None:
+                CalibrationProfile.set_default(CalibrationProfile.load(rs_profile))
+
+            HbmpcConfig.communication = CommunicationConfig.from_json(
+                config.get("communication", {})
+            )
 
             # Ensure the required values are set before this method terminates
             assert HbmpcConfig.my_id is not None, "Node Id: missing"
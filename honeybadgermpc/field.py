@@ -20,9 +20,11 @@
 #
 # You should have received a copy of the GNU Lesser General Public
 # License along with VIFF. If not, see <http://www.gnu.org/licenses/>.
+from itertools import repeat
 from random import Random
+from struct import unpack_from
 
-from gmpy2 import is_prime, mpz
+from gmpy2 import invert, is_prime, mpz
 
 
 class FieldsNotIdentical(Exception):
@@ -32,12 +34,17 @@ class FieldsNotIdentical(Exception):
 class FieldElement(object):
     """Common base class for elements."""
 
+    __slots__ = ()
+
     def __int__(self):
         return self.value
 
     __long__ = __int__
 
 
+_object_new = object.__new__
+
+
 class GF(object):
     # Class is implemented following the 'multiton' design pattern
     # When the constructor is called with a value that's been used
@@ -49,11 +56,23 @@ class GF(object):
         # Creates a new field if not present in the cache
         return GF._field_cache.setdefault(modulus, super(GF, cls).__new__(cls))
 
+    # Inverses of values within this distance of 0 (i.e. small positive and
+    # negative integers) are cached per field, as they keep reappearing in
+    # interpolation (e.g. x_i - x_j, or dividing by the number of points)
+    SMALL_CONSTANT_BOUND = 1 << 10
+
     def __init__(self, modulus):
+        # __init__ runs again each time a cached field is returned from __new__
+        if getattr(self, "modulus", None) == modulus:
+            return
+
         if not is_prime(mpz(modulus)):
             raise ValueError(f"{modulus} is not a prime")
 
         self.modulus = modulus
+        # Number of bytes needed to store an element, see pack_ints
+        self.byte_width = (modulus.bit_length() + 7) // 8
+        self._small_inverses = {}
 
     def __call__(self, value):
         return GFElement(value, self)
@@ -64,39 +83,177 @@ class GF(object):
     def random(self, seed=None):
         return GFElement(Random(seed).randint(0, self.modulus - 1), self)
 
+    def inverse(self, value):
+        """Returns the inverse of value (an int) as an int in [0, modulus).
+
+        Raises a ZeroDivisionError if value is zero. Inverses of small constants
+        are looked up from a per-field table.
+        """
+        modulus = self.modulus
+        value %= modulus
+        small = (
+            value < GF.SMALL_CONSTANT_BOUND or modulus - value < GF.SMALL_CONSTANT_BOUND
+        )
+        if small:
+            inverse = self._small_inverses.get(value)
+            if inverse is not None:
+                return inverse
+
+        if value == 0:
+            raise ZeroDivisionError("Cannot invert zero")
+
+        inverse = int(invert(value, modulus))
+        if small:
+            self._small_inverses[value] = inverse
+        return inverse
+
+    def batch_inverse(self, values):
+        """Inverts a list of elements (or ints) of this field at once.
+
+        Uses Montgomery's trick: a single inversion of the product of all
+        values, plus 3(n-1) multiplications to recover the individual inverses.
+        Raises a ZeroDivisionError if any of the values is zero.
+
+        >>> gf = GF(17)
+        >>> gf.batch_inverse([gf(2), gf(3), 5])
+        [{9}, {6}, {7}]
+        """
+        inverses = _batch_inverse_ints([int(v) for v in values], self.modulus)
+        return [GFElement(v, self) for v in inverses]
+
+
+def _batch_inverse_ints(values, modulus):
+    """Montgomery batch inversion over a list of python ints, returning a list
+    of python ints in [0, modulus).
+    """
+    if not values:
+        return []
+
+    # prefix[i] holds the product of values[0..i]
+    prefix = []
+    acc = 1
+    for v in values:
+        v %= modulus
+        if v == 0:
+            raise ZeroDivisionError("Cannot invert zero")
+        acc = acc * v % modulus
+        prefix.append(acc)
+
+    inv = int(invert(acc, modulus))
+    result = [0] * len(values)
+    for i in range(len(values) - 1, 0, -1):
+        result[i] = inv * prefix[i - 1] % modulus
+        inv = inv * values[i] % modulus
+    result[0] = inv
+
+    return result
+
+
+def pack_ints(values, width):
+    """Packs non-negative ints into a buffer of fixed-width little-endian words,
+    which is the layout the NTL bindings read and write in bulk.
+
+    >>> pack_ints([1, 258], 2)
+    b'\\x01\\x00\\x02\\x01'
+    """
+    return b"".join(map(int.to_bytes, values, repeat(width), repeat("little")))
+
+
+def unpack_ints(buf, width):
+    """Inverse of pack_ints: reads a buffer of fixed-width little-endian words
+    back into a list of ints. Accepts any object supporting the buffer protocol.
+    """
+    view = memoryview(buf).cast("B")
+    # Splitting the buffer with struct is much cheaper than slicing it per word
+    words = unpack_from(f"{width}s" * (len(view) // width), view)
+    return list(map(int.from_bytes, words, repeat("little")))
+
+
+def _new_element(value, gf):
+    """Builds a GFElement from a value which is already reduced, skipping the
+    modular reduction done by the constructor.
+    """
+    element = _object_new(GFElement)
+    element.value = value
+    element.field = gf
+    return element
+
 
 class GFElement(FieldElement):
+    # The value is always kept reduced in [0, modulus), which lets additions and
+    # subtractions of two elements reduce with a conditional subtraction.
+    __slots__ = ("value", "field")
+
     def __init__(self, value, gf):
-        self.modulus = gf.modulus
         self.field = gf
-        self.value = value % self.modulus
+        self.value = value % gf.modulus
 
-    def __add__(self, other):
-        """Addition."""
-        if not isinstance(other, (GFElement, int)):
-            return NotImplemented
-        try:
+    @property
+    def modulus(self):
+        return self.field.modulus
+
+    def __reduce__(self):
+        return (GFElement, (self.value, self.field))
+
+    def _other_value(self, other):
+        """Returns the value of other as an int, or None if other is neither an
+        element of this field nor an int.
+        """
+        if type(other) is GFElement:
             # We can do a quick test using 'is' here since
             # there will only be one class representing this
             # field.
             if self.field is not other.field:
                 raise FieldsNotIdentical
-            return GFElement(self.value + other.value, self.field)
-        except AttributeError:
-            return GFElement(self.value + other, self.field)
+            return other.value
+        if isinstance(other, int):
+            return other % self.field.modulus
+        if isinstance(other, GFElement):
+            if self.field is not other.field:
+                raise FieldsNotIdentical
+            return other.value
+        return None
+
+    def __add__(self, other):
+        """Addition."""
+        field = self.field
+        if type(other) is GFElement and other.field is field:
+            value = self.value + other.value
+        else:
+            value = self._other_value(other)
+            if value is None:
+                return NotImplemented
+            value += self.value
+
+        if value >= field.modulus:
+            value -= field.modulus
+
+        # Allocation is inlined, this is the hottest path in most programs
+        result = _object_new(GFElement)
+        result.value = value
+        result.field = field
+        return result
 
     __radd__ = __add__
 
     def __sub__(self, other):
         """Subtraction."""
-        if not isinstance(other, (GFElement, int)):
-            return NotImplemented
-        try:
-            if self.field is not other.field:
-                raise FieldsNotIdentical
-            return GFElement(self.value - other.value, self.field)
-        except AttributeError:
-            return GFElement(self.value - other, self.field)
+        field = self.field
+        if type(other) is GFElement and other.field is field:
+            value = self.value - other.value
+        else:
+            value = self._other_value(other)
+            if value is None:
+                return NotImplemented
+            value = self.value - value
+
+        if value < 0:
+            value += field.modulus
+
+        result = _object_new(GFElement)
+        result.value = value
+        result.field = field
+        return result
 
     def __rsub__(self, other):
         """Subtraction (reflected argument version)."""
@@ -104,24 +261,66 @@ class GFElement(FieldElement):
 
     def __mul__(self, other):
         """Multiplication."""
-        if not isinstance(other, (GFElement, int)):
-            return NotImplemented
-        try:
-            if self.field is not other.field:
-                raise FieldsNotIdentical
-            return GFElement(self.value * other.value, self.field)
-        except AttributeError:
-            return GFElement(self.value * other, self.field)
+        field = self.field
+        if type(other) is GFElement and other.field is field:
+            value = self.value * other.value
+        else:
+            value = self._other_value(other)
+            if value is None:
+                return NotImplemented
+            value *= self.value
+
+        result = _object_new(GFElement)
+        result.value = value % field.modulus
+        result.field = field
+        return result
 
     __rmul__ = __mul__
 
+    # Elements are values, so += and friends return new elements like the other
+    # operators. The methods below update the element itself instead, for hot
+    # loops which accumulate into an element nothing else refers to, such as one
+    # they created for the purpose. They must never be called on elements which
+    # may be shared, e.g. stored in a dict or passed in by a caller.
+
+    def add_in_place(self, other):
+        """In-place addition, returns self."""
+        value = self._other_value(other)
+        if value is None:
+            raise TypeError(f"Cannot add {type(other).__name__} to GFElement")
+
+        value += self.value
+        modulus = self.field.modulus
+        self.value = value - modulus if value >= modulus else value
+        return self
+
+    def sub_in_place(self, other):
+        """In-place subtraction, returns self."""
+        value = self._other_value(other)
+        if value is None:
+            raise TypeError(f"Cannot subtract {type(other).__name__} from GFElement")
+
+        value = self.value - value
+        self.value = value + self.field.modulus if value < 0 else value
+        return self
+
+    def mul_in_place(self, other):
+        """In-place multiplication, returns self."""
+        value = self._other_value(other)
+        if value is None:
+            raise TypeError(f"Cannot multiply GFElement by {type(other).__name__}")
+
+        self.value = self.value * value % self.field.modulus
+        return self
+
     def __pow__(self, exponent):
         """Exponentiation."""
-        return GFElement(pow(self.value, exponent, self.modulus), self.field)
+        return GFElement(pow(self.value, exponent, self.field.modulus), self.field)
 
     def __neg__(self):
         """Negation."""
-        return GFElement(-self.value, self.field)
+        value = self.value
+        return _new_element(self.field.modulus - value if value else 0, self.field)
 
     def __invert__(self):
         """Inversion.
@@ -129,33 +328,16 @@ class GFElement(FieldElement):
         Note that zero cannot be inverted, trying to do so
         will raise a ZeroDivisionError.
         """
-        if self.value == 0:
-            raise ZeroDivisionError("Cannot invert zero")
-
-        def extended_gcd(a, b):
-            """The extended Euclidean algorithm."""
-            x = 0
-            lastx = 1
-            y = 1
-            lasty = 0
-            while b != 0:
-                quotient = a // b
-                a, b = b, a % b
-                x, lastx = lastx - quotient * x, x
-                y, lasty = lasty - quotient * y, y
-            return (lastx, lasty, a)
-
-        inverse = extended_gcd(self.value, self.modulus)[0]
-        return GFElement(inverse, self.field)
+        return _new_element(self.field.inverse(self.value), self.field)
 
     def __div__(self, other):
         """Division."""
-        try:
-            if self.field is not other.field:
-                raise FieldsNotIdentical
-            return self * ~other
-        except AttributeError:
-            return self * ~GFElement(other, self.field)
+        value = self._other_value(other)
+        if value is None:
+            value = GFElement(other, self.field).value
+
+        inverse = self.field.inverse(value)
+        return _new_element(self.value * inverse % self.field.modulus, self.field)
 
     __truediv__ = __div__
     __floordiv__ = __div__
@@ -289,6 +471,212 @@ class GFElement(FieldElement):
         return self.value != 0
 
 
+class GFArray(object):
+    """Packed array of elements of a single field.
+
+    The elements are stored as a flat list of reduced python ints rather than
+    as individual GFElement objects, so element-wise operations over a whole
+    array are a single comprehension instead of one object allocation (plus
+    type and field checks) per element. The int representation is also what
+    the NTL bindings consume, so arrays can be handed to them without
+    conversion.
+
+    Operands of the arithmetic operators can be another GFArray of the same
+    length and field, a GFElement or an int; scalars are broadcast.
+
+    >>> gf = GF(17)
+    >>> a = GFArray([1, 2, 3], gf)
+    >>> a + a
+    GFArray([2, 4, 6])
+    >>> a * 6
+    GFArray([6, 12, 1])
+    """
+
+    __slots__ = ("field", "values")
+
+    def __init__(self, values, gf, reduced=False):
+        """
+        args:
+            values: iterable of ints or GFElements
+            gf: field the elements belong to
+            reduced: set to True when values is a list of ints which are
+                already in [0, modulus), to skip the reduction
+        """
+        self.field = gf
+        if reduced:
+            self.values = values
+        else:
+            p = gf.modulus
+            self.values = [int(v) % p for v in values]
+
+    @staticmethod
+    def from_elements(elements, gf=None):
+        """Packs a list of GFElements. The field is taken from the first element
+        unless one is given explicitly.
+        """
+        if gf is None:
+            gf = elements[0].field
+        for e in elements:
+            if isinstance(e, GFElement) and e.field is not gf:
+                raise FieldsNotIdentical
+        return GFArray(elements, gf)
+
+    @staticmethod
+    def from_bytes(buf, gf, reduced=False):
+        """Unpacks a buffer written by to_bytes into an array over gf.
+        """
+        return GFArray(unpack_ints(buf, gf.byte_width), gf, reduced)
+
+    def to_bytes(self):
+        """Packs the array as fixed-width little-endian words of
+        field.byte_width bytes each.
+        """
+        return pack_ints(self.values, self.field.byte_width)
+
+    @property
+    def modulus(self):
+        return self.field.modulus
+
+    def _operand(self, other):
+        """Returns either an int (for scalars) or the list of values of other,
+        or None if the operand is unsupported.
+        """
+        if isinstance(other, GFArray):
+            if self.field is not other.field:
+                raise FieldsNotIdentical
+            if len(self.values) != len(other.values):
+                raise ValueError(
+                    f"Length mismatch: {len(self.values)} != {len(other.values)}"
+                )
+            return other.values
+        if isinstance(other, GFElement):
+            if self.field is not other.field:
+                raise FieldsNotIdentical
+            return other.value
+        if isinstance(other, int):
+            return other % self.field.modulus
+        return None
+
+    def __add__(self, other):
+        o = self._operand(other)
+        if o is None:
+            return NotImplemented
+
+        p = self.field.modulus
+        if isinstance(o, int):
+            return GFArray([(v + o) % p for v in self.values], self.field, True)
+        return GFArray([(a + b) % p for a, b in zip(self.values, o)], self.field, True)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        o = self._operand(other)
+        if o is None:
+            return NotImplemented
+
+        p = self.field.modulus
+        if isinstance(o, int):
+            return GFArray([(v - o) % p for v in self.values], self.field, True)
+        return GFArray([(a - b) % p for a, b in zip(self.values, o)], self.field, True)
+
+    def __rsub__(self, other):
+        o = self._operand(other)
+        if o is None:
+            return NotImplemented
+
+        p = self.field.modulus
+        return GFArray([(o - v) % p for v in self.values], self.field, True)
+
+    def __mul__(self, other):
+        o = self._operand(other)
+        if o is None:
+            return NotImplemented
+
+        p = self.field.modulus
+        if isinstance(o, int):
+            return GFArray([v * o % p for v in self.values], self.field, True)
+        return GFArray([a * b % p for a, b in zip(self.values, o)], self.field, True)
+
+    __rmul__ = __mul__
+
+    def __neg__(self):
+        p = self.field.modulus
+        return GFArray([(p - v) % p for v in self.values], self.field, True)
+
+    def __pow__(self, exponent):
+        p = self.field.modulus
+        return GFArray([pow(v, exponent, p) for v in self.values], self.field, True)
+
+    def __invert__(self):
+        """Element-wise inversion. Raises ZeroDivisionError if any element is
+        zero.
+        """
+        return GFArray(
+            _batch_inverse_ints(self.values, self.field.modulus), self.field, True
+        )
+
+    def __truediv__(self, other):
+        if isinstance(other, GFArray):
+            return self * ~other
+        if isinstance(other, (GFElement, int)):
+            return self * ~self.field(other)
+        return NotImplemented
+
+    __floordiv__ = __truediv__
+
+    def __rtruediv__(self, other):
+        if not isinstance(other, (GFElement, int)):
+            return NotImplemented
+        return ~self * other
+
+    __rfloordiv__ = __rtruediv__
+
+    def dot(self, other):
+        """Inner product of two arrays, reduced only once at the end."""
+        o = self._operand(other)
+        if not isinstance(o, list):
+            raise TypeError("dot requires a GFArray operand")
+        return GFElement(sum(a * b for a, b in zip(self.values, o)), self.field)
+
+    def sum(self):
+        return GFElement(sum(self.values), self.field)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return GFArray(self.values[key], self.field, True)
+        return GFElement(self.values[key], self.field)
+
+    def __iter__(self):
+        gf = self.field
+        return (GFElement(v, gf) for v in self.values)
+
+    def __eq__(self, other):
+        if isinstance(other, GFArray):
+            return self.field is other.field and self.values == other.values
+        if isinstance(other, (list, tuple)):
+            return len(self.values) == len(other) and all(
+                a == b for a, b in zip(self, other)
+            )
+        return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"GFArray({self.values})"
+
+    def __reduce__(self):
+        return (GFArray, (self.values, self.field, True))
+
+
 def fake_gf(modulus):
     """Construct a fake field.
 
@@ -326,7 +326,18 @@ class HbAvssLight:
 
 class HbAvssBatch:
     def __init__(
-        self, public_keys, private_key, crs, n, t, my_id, send, recv, pc=None, field=ZR
+        self,
+        public_keys,
+        private_key,
+        crs,
+        n,
+        t,
+        my_id,
+        send,
+        recv,
+        pc=None,
+        field=ZR,
+        drain=None,
     ):  # (# noqa: E501)
         self.public_keys, self.private_key = public_keys, private_key
         self.n, self.t, self.my_id = n, t, my_id
@@ -343,6 +354,10 @@ class HbAvssBatch:
 
         self.get_send = _send
 
+        # Waits for the messages queued for slow nodes to be sent out, such as
+        # ProcessProgramRunner.drain, before the dealer queues more
+        self.drain = drain
+
         self.field = field
         self.poly = polynomials_over(self.field)
         if pc is not None:
@@ -360,10 +375,15 @@ class HbAvssBatch:
     async def _recv_loop(self, q):
         while True:
             avid, tag, dispersal_msg_list = await q.get()
+            await self._drain()
             self.tasks.append(
                 asyncio.create_task(avid.disperse(tag, self.my_id, dispersal_msg_list))
             )
 
+    async def _drain(self):
+        if self.drain is not None:
+            await self.drain()
+
     def __enter__(self):
         self.avid_recv_task = asyncio.create_task(self._recv_loop(self.avid_msg_queue))
         return self
@@ -629,6 +649,7 @@ class HbAvssBatch:
         broadcast_msg = None
         dispersal_msg_list = None
         if self.my_id == dealer_id:
+            await self._drain()
             # broadcast_msg: phi & public key for reliable broadcast
             # dispersal_msg_list: the list of payload z
             broadcast_msg, dispersal_msg_list = self._get_dealer_msg(values, n)
@@ -1,29 +1,86 @@
 import asyncio
+import errno
 import logging
-from pickle import dumps, loads
+import os
+import time
+from collections import deque
+from functools import partial
 
 from psutil import cpu_count
 
-from zmq import DEALER, IDENTITY, ROUTER
+from zmq import (
+    DEALER,
+    IDENTITY,
+    RECONNECT_IVL,
+    RECONNECT_IVL_MAX,
+    ROUTER,
+    ROUTER_HANDOVER,
+)
 from zmq.asyncio import Context
 
-from honeybadgermpc.config import ConfigVars, HbmpcConfig
+from honeybadgermpc.config import (
+    CommunicationConfig,
+    ConfigVars,
+    HbmpcConfig,
+    Transport,
+)
 from honeybadgermpc.mpc import Mpc
+from honeybadgermpc.utils.channel import ACK_CLOSING, CONTROL_FRAME, PeerChannel
 from honeybadgermpc.utils.misc import (
+    MonitoredQueue,
     print_exception_callback,
     subscribe_recv,
     wrap_send,
 )
+from honeybadgermpc.utils.serialization import MessageCodec
+from honeybadgermpc.utils.shm_ring import (
+    RingBuffer,
+    Wakeup,
+    drain_wakeup_pipe,
+    open_wakeup_pipe,
+)
 
 
 class NodeCommunicator(object):
     LAST_MSG = None
+    # Whether the flow control window of the config applies to this transport
+    FLOW_CONTROL = True
 
-    def __init__(self, peers_config, my_id, linger_timeout):
+    def __init__(
+        self, peers_config, my_id, linger_timeout, comm_config=None, field=None
+    ):
         self.peers_config = peers_config
         self.my_id = my_id
+        # Messages are serialized for the field of the computation, which defaults
+        # to the one of Mpc
+        self._codec = MessageCodec(field)
+
+        # All messages queued for a node are sent as the frames of a single zmq
+        # message, of up to flush_bytes. A flush_bytes of 0 sends messages one by
+        # one, and a positive flush_delay waits that many seconds for more messages
+        # before sending a frame which is not full.
+        if comm_config is None:
+            comm_config = CommunicationConfig.default()
+        self.flush_bytes = comm_config.flush_bytes
+        self.flush_delay = comm_config.flush_delay
+
+        # Credit based flow control: a node sends at most window messages to a peer
+        # before the peer acks them as consumed, see consumed. This bounds the memory
+        # used for the messages of a peer on the receiving side, and the messages
+        # kept to be sent again, while drain lets producers wait for the queues of
+        # the sending side to go under high_water. At most max_queued messages are
+        # queued for a node, and the receiver queue holds at most max_received;
+        # messages sent beyond that wait in an overflow buffer, see send.
+        self.window = comm_config.window if self.FLOW_CONTROL else 0
+        self.high_water = comm_config.high_water
+        self.max_queued = comm_config.max_queued
+        self.resend_timeout = comm_config.resend_timeout
+        # Messages from an earlier run of a node, with a smaller epoch, are dropped
+        self.epoch = time.time_ns()
 
         self.bytes_sent = 0
+        self.msgs_sent = 0
+        self.frames_sent = 0
         self.benchmark_logger = logging.LoggerAdapter(
             logging.getLogger("benchmark_logger"), {"node_id": my_id}
         )
@@ -31,44 +88,180 @@ class NodeCommunicator(object):
         self._dealer_tasks = []
         self._router_task = None
         self.linger_timeout = linger_timeout
-        self.zmq_context = Context(io_threads=cpu_count())
+        self.zmq_context = None
 
         n = len(peers_config)
-        self._receiver_queue = asyncio.Queue()
-        self._sender_queues = [None] * n
-        for i in range(n):
-            if i == self.my_id:
-                self._sender_queues[i] = self._receiver_queue
-            else:
-                self._sender_queues[i] = asyncio.Queue()
+        self.max_received = self.window * (n - 1) + self.max_queued
+        self._overflow = [deque() for _ in range(n)]
+        self._sender_queues = [
+            MonitoredQueue(
+                self.max_received if i == self.my_id else self.max_queued,
+                partial(self._refill, i),
+            )
+            for i in range(n)
+        ]
+        self._receiver_queue = self._sender_queues[self.my_id]
+
+        # Channels only carry the messages of transports with flow control
+        keys = comm_config.auth_keys if self.FLOW_CONTROL else None
+        self._channels = [
+            PeerChannel(
+                my_id,
+                i,
+                self.epoch,
+                self.window,
+                None if keys is None else bytes.fromhex(keys[i]),
+            )
+            for i in range(n)
+        ]
+        self._dealers = [None] * n
+        self._credit_events = [asyncio.Event() for _ in range(n)]
+        self._drained = asyncio.Condition()
+        self._heartbeat_task = None
+        self._closing = False
 
     def send(self, node_id, msg):
-        msg = (self.my_id, msg) if node_id == self.my_id else msg
-        self._sender_queues[node_id].put_nowait(msg)
+        """ Queues msg to be sent to node_id. Once the queue of the node is full,
+        messages are buffered until it has room again, so producers of many messages
+        should await drain to keep the memory used bounded.
+        """
+        if node_id == self.my_id:
+            msg = (self.my_id, msg)
+        self._enqueue(node_id, msg)
+
+    def _enqueue(self, node_id, msg):
+        queue, overflow = self._sender_queues[node_id], self._overflow[node_id]
+        if overflow or queue.full():
+            overflow.append(msg)
+        else:
+            queue.put_nowait(msg)
+
+    def _refill(self, node_id, _):
+        # Called with each message taken out of the queue of node_id, which leaves
+        # room for the next buffered one
+        overflow = self._overflow[node_id]
+        if overflow:
+            self._sender_queues[node_id].put_nowait(overflow.popleft())
 
     async def recv(self):
+        sender_id, msg = await self.recv_unconsumed()
+        self.consumed(sender_id)
+        return sender_id, msg
+
+    async def recv_unconsumed(self):
+        """ Receives a message like recv, without acking it as consumed, for the
+        caller to call consumed once the message is actually consumed.
+        """
         return await self._receiver_queue.get()
 
+    def consumed(self, sender_id):
+        """ Acks a message from sender_id as consumed, giving the sender a credit
+        back.
+        """
+        if self.window and sender_id != self.my_id and not self._closing:
+            self._channels[sender_id].consumed += 1
+            self._send_ack(sender_id)
+
+    async def drain(self):
+        """ Waits until at most high_water messages are queued for each node, for
+        producers of many messages to wait for slow peers.
+        """
+
+        def _drained():
+            return all(
+                q.qsize() + len(self._overflow[i]) <= self.high_water
+                for i, q in enumerate(self._sender_queues)
+                if i != self.my_id
+            )
+
+        async with self._drained:
+            await self._drained.wait_for(_drained)
+
+    def queue_high_water(self):
+        """ Returns the high-water marks of the receiver queue and of the sender
+        queue of each node, in number of messages.
+        """
+        return (
+            self._receiver_queue.high_water,
+            [
+                q.high_water
+                for i, q in enumerate(self._sender_queues)
+                if i != self.my_id
+            ],
+        )
+
+    def _send_ack(self, node_id, flags=0, force=False):
+        frames = self._channels[node_id].ack_frames(flags, force)
+        if frames is not None:
+            self._dealers[node_id].send_multipart(frames)
+
+    def _resend(self, node_id):
+        frames = self._channels[node_id].resend_frames()
+        if frames is not None:
+            logging.debug("Sending %d messages to %d again", len(frames) - 2, node_id)
+            self._dealers[node_id].send_multipart(frames)
+
+    async def _heartbeat(self):
+        """ Acks the messages of every peer periodically, which also tells restarted
+        peers about the epoch of this node, and sends the messages which were not
+        acked again if a peer made no progress since the last period.
+        """
+        last_acked = [None] * len(self._channels)
+        while True:
+            await asyncio.sleep(self.resend_timeout)
+            for i, channel in enumerate(self._channels):
+                if i == self.my_id:
+                    continue
+                self._send_ack(i, force=True)
+                if channel.unacked and channel.acked == last_acked[i]:
+                    self._resend(i)
+                last_acked[i] = channel.acked
+
     async def __aenter__(self):
         await self._setup()
         return self
 
     async def __aexit__(self, exc_type, exc, tb):
+        # Messages received from now on are not consumed, so let the other nodes
+        # send out everything they have queued.
+        self._closing = True
+        if self.window:
+            for i in range(len(self._sender_queues)):
+                if i != self.my_id:
+                    self._send_ack(i, ACK_CLOSING)
+
         # Add None to the sender queues and drain out all the messages.
         for i in range(len(self._sender_queues)):
             if i != self.my_id:
-                self._sender_queues[i].put_nowait(NodeCommunicator.LAST_MSG)
+                self._enqueue(i, NodeCommunicator.LAST_MSG)
         await asyncio.gather(*self._dealer_tasks)
         logging.debug("Dealer tasks finished.")
         self._router_task.cancel()
         logging.debug("Router task cancelled.")
-        self.zmq_context.destroy(linger=self.linger_timeout * 1000)
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+        self._teardown()
         self.benchmark_logger.info("Total bytes sent out: %d", self.bytes_sent)
+        self.benchmark_logger.info(
+            "Total messages sent out: %d in %d frames",
+            self.msgs_sent,
+            self.frames_sent,
+        )
+        receiver_high_water, sender_high_water = self.queue_high_water()
+        self.benchmark_logger.info(
+            "Queue high-water marks: %d received, %d to send",
+            receiver_high_water,
+            max(sender_high_water, default=0),
+        )
 
     async def _setup(self):
+        self.zmq_context = Context(io_threads=cpu_count())
+
         # Setup one router for a party, this acts as a
         # server for receiving messages from other parties.
         router = self.zmq_context.socket(ROUTER)
+        # Let a restarted node take over the identity of its previous run
+        router.setsockopt(ROUTER_HANDOVER, 1)
         router.bind(f"tcp://*:{self.peers_config[self.my_id].port}")
         # Start a task to receive messages on this node.
         self._router_task = asyncio.create_task(self._recv_loop(router))
@@ -80,38 +273,274 @@ class NodeCommunicator(object):
             if i != self.my_id:
                 dealer = self.zmq_context.socket(DEALER)
                 # This identity is sent with each message. Setting it to my_id, this is
-                # used to appropriately route the message. This is not a good idea since
-                # a node can pretend to send messages on behalf of other nodes.
+                # used to appropriately route the message. Unless auth_keys are
+                # configured, a node can pretend to send messages on behalf of other
+                # nodes.
                 dealer.setsockopt(IDENTITY, str(self.my_id).encode())
+                # Reconnect quickly after transient failures, backing off up to 5s
+                dealer.setsockopt(RECONNECT_IVL, 100)
+                dealer.setsockopt(RECONNECT_IVL_MAX, 5000)
                 dealer.connect(
                     f"tcp://{self.peers_config[i].ip}:{self.peers_config[i].port}"
                 )
+                self._dealers[i] = dealer
                 # Setup a task which reads messages intended for this
                 # party from a queue and then sends them to this node.
                 task = asyncio.create_task(
                     self._process_node_messages(
-                        i, self._sender_queues[i], dealer.send_multipart
+                        i, self._sender_queues[i], self._make_dealer_send(i)
                     )
                 )
                 self._dealer_tasks.append(task)
 
+        if self.window:
+            self._heartbeat_task = asyncio.create_task(self._heartbeat())
+            self._heartbeat_task.add_done_callback(print_exception_callback)
+
+    def _make_dealer_send(self, node_id):
+        channel, dealer = self._channels[node_id], self._dealers[node_id]
+
+        async def _send(raw_msgs):
+            await dealer.send_multipart(channel.frame(raw_msgs))
+
+        return _send
+
+    def _teardown(self):
+        self.zmq_context.destroy(linger=self.linger_timeout * 1000)
+
     async def _recv_loop(self, router):
         while True:
-            sender_id, raw_msg = await router.recv_multipart()
-            msg = loads(raw_msg)
-            # logging.debug("[RECV] FROM: %s, MSG: %s,", sender_id, msg)
-            self._receiver_queue.put_nowait((int(sender_id), msg))
+            identity, *frames = await router.recv_multipart()
+            sender_id = int(identity) if identity.isdigit() else -1
+            if not 0 <= sender_id < len(self._channels) or not frames:
+                logging.warning("Dropping message from unknown node %s", identity)
+                continue
+
+            channel = self._channels[sender_id]
+            if frames[0] == CONTROL_FRAME:
+                if channel.receive_ack(frames):
+                    self._resend(sender_id)
+                self._credit_events[sender_id].set()
+                continue
+
+            # The frames after the header and mac are the messages of a batch
+            raw_msgs = channel.receive(frames)
+            if raw_msgs is None:
+                logging.debug("Dropping batch from %d", sender_id)
+                if self.window:
+                    self._send_ack(sender_id)
+                continue
+            if self.window:
+                self._send_ack(sender_id)
+            if self._closing:
+                # The messages are no longer consumed, so do not wait for room for
+                # them in the queue, which would hold up the acks of the peers
+                continue
+
+            for raw_msg in raw_msgs:
+                msg = self._codec.loads(raw_msg)
+                # logging.debug("[RECV] FROM: %s, MSG: %s,", sender_id, msg)
+                await self._receiver_queue.put((sender_id, msg))
+
+    async def _next_batch(self, node_msg_queue, max_msgs):
+        """ Waits for a message to be queued, then drains the queue into a batch of
+        serialized messages of up to flush_bytes and max_msgs messages, waiting up
+        to flush_delay seconds for more messages if the batch is not full.
+
+        Returns the batch and whether LAST_MSG was reached.
+        """
+        msg = await node_msg_queue.get()
+        if msg is NodeCommunicator.LAST_MSG:
+            return [], True
+
+        batch = [self._codec.dumps(msg)]
+        size = len(batch[0])
+        deadline = asyncio.get_event_loop().time() + self.flush_delay
+        while size < self.flush_bytes and len(batch) < max_msgs:
+            if not node_msg_queue.empty():
+                msg = node_msg_queue.get_nowait()
+            else:
+                timeout = deadline - asyncio.get_event_loop().time()
+                if timeout <= 0:
+                    break
+                try:
+                    msg = await asyncio.wait_for(node_msg_queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+
+            if msg is NodeCommunicator.LAST_MSG:
+                return batch, True
+            batch.append(self._codec.dumps(msg))
+            size += len(batch[-1])
+
+        return batch, False
 
     async def _process_node_messages(self, node_id, node_msg_queue, send_to_node):
+        done = False
+        while not done:
+            channel = self._channels[node_id]
+            while channel.credits() <= 0:
+                self._credit_events[node_id].clear()
+                await self._credit_events[node_id].wait()
+
+            raw_msgs, done = await self._next_batch(node_msg_queue, channel.credits())
+            if raw_msgs:
+                self.bytes_sent += sum(map(len, raw_msgs))
+                self.msgs_sent += len(raw_msgs)
+                self.frames_sent += 1
+                # logging.debug("[SEND] TO: %d, MSGS: %d", node_id, len(raw_msgs))
+                await send_to_node(raw_msgs)
+
+            async with self._drained:
+                self._drained.notify_all()
+
+        logging.debug("No more messages to Node: %d can be sent.", node_id)
+
+
+class SharedMemoryCommunicator(NodeCommunicator):
+    """ NodeCommunicator for parties running as processes on the same host, which
+    passes messages through ring buffers in shared memory instead of zmq sockets.
+
+    Each node creates, in the shm_dir of the config, one ring per other node for the
+    messages that node sends to it, and a named pipe through which the other nodes
+    wake it up after writing to a ring.
+    """
+
+    # Seconds to wait between checks for the ring of a node to be created, or to
+    # have room for more messages
+    POLL_INTERVAL = 0.001
+    # The rings already bound the messages in flight between two nodes
+    FLOW_CONTROL = False
+
+    def __init__(
+        self, peers_config, my_id, linger_timeout, comm_config=None, field=None
+    ):
+        super().__init__(peers_config, my_id, linger_timeout, comm_config, field)
+        if comm_config is None:
+            comm_config = CommunicationConfig.default()
+        self.shm_dir = comm_config.shm_dir
+        self.ring_size = comm_config.ring_size
+
+        self._wakeup_fd = None
+        self._in_rings = []
+        self._out_rings = []
+
+    def _ring_path(self, sender_id, receiver_id):
+        return os.path.join(self.shm_dir, f"ring_{sender_id}_{receiver_id}")
+
+    def _wakeup_path(self, node_id):
+        return os.path.join(self.shm_dir, f"wakeup_{node_id}")
+
+    async def _setup(self):
+        os.makedirs(self.shm_dir, exist_ok=True)
+        # Remove the wakeup pipe left behind by a run which crashed first, so that no
+        # node writes to the rings it is about to replace
+        wakeup_path = self._wakeup_path(self.my_id)
+        if os.path.exists(wakeup_path):
+            os.unlink(wakeup_path)
+
+        for i in range(len(self.peers_config)):
+            if i != self.my_id:
+                path = self._ring_path(i, self.my_id)
+                ring = RingBuffer(path, self.ring_size, create=True)
+                self._in_rings.append((i, ring))
+        # Created last, since other nodes start writing once it exists
+        self._wakeup_fd = open_wakeup_pipe(wakeup_path)
+
+        self._router_task = asyncio.create_task(self._recv_loop())
+        self._router_task.add_done_callback(print_exception_callback)
+
+        for i in range(len(self.peers_config)):
+            if i != self.my_id:
+                task = asyncio.create_task(
+                    self._process_node_messages(
+                        i, self._sender_queues[i], self._make_ring_send(i)
+                    )
+                )
+                self._dealer_tasks.append(task)
+
+    def _make_ring_send(self, node_id):
+        ring, wakeup = None, None
+
+        async def _connect():
+            # Only a running node holds its wakeup pipe open, and it creates its
+            # rings before the pipe, so the rings are those of the current run of the
+            # node once the pipe can be opened. Files left behind by a run which
+            # crashed are replaced when the node starts again.
+            nonlocal ring, wakeup
+            while True:
+                try:
+                    wakeup = Wakeup(self._wakeup_path(node_id))
+                    break
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    if e.errno != errno.ENXIO:
+                        raise
+                await asyncio.sleep(SharedMemoryCommunicator.POLL_INTERVAL)
+            ring = RingBuffer(self._ring_path(self.my_id, node_id))
+            self._out_rings.append((ring, wakeup))
+
+        def _disconnect():
+            nonlocal ring, wakeup
+            self._out_rings.remove((ring, wakeup))
+            ring.close()
+            wakeup.close()
+            ring, wakeup = None, None
+
+        async def _send(raw_msgs):
+            pending = raw_msgs
+            while True:
+                if ring is None:
+                    await _connect()
+                pending = pending[ring.write(pending) :]
+                try:
+                    wakeup.notify()
+                except BrokenPipeError:
+                    # The node stopped and lost what is in its rings, so write the
+                    # batch again once it restarts
+                    logging.debug("Node %d restarted, reconnecting", node_id)
+                    _disconnect()
+                    pending = raw_msgs
+                    continue
+
+                if not pending:
+                    break
+                # The ring is full, wait for the node to read from it
+                await asyncio.sleep(SharedMemoryCommunicator.POLL_INTERVAL)
+
+        return _send
+
+    async def _recv_loop(self):
+        wakeup = asyncio.Event()
+        asyncio.get_event_loop().add_reader(self._wakeup_fd, wakeup.set)
         while True:
-            msg = await node_msg_queue.get()
-            if msg is NodeCommunicator.LAST_MSG:
-                logging.debug("No more messages to Node: %d can be sent.", node_id)
-                break
-            raw_msg = dumps(msg)
-            self.bytes_sent += len(raw_msg)
-            # logging.debug("[SEND] TO: %d, MSG: %s", node_id, msg)
-            await send_to_node([raw_msg])
+            await wakeup.wait()
+            wakeup.clear()
+            # Drain the pipe before reading, so that messages written after this
+            # point wake the loop up again
+            drain_wakeup_pipe(self._wakeup_fd)
+            for sender_id, ring in self._in_rings:
+                raw_msgs = ring.read()
+                if self._closing:
+                    continue
+                for raw_msg in raw_msgs:
+                    # Waiting for room in the queue stops the reading of the rings,
+                    # which makes the senders wait once their ring is full
+                    await self._receiver_queue.put(
+                        (sender_id, self._codec.loads(raw_msg))
+                    )
+
+    def _teardown(self):
+        asyncio.get_event_loop().remove_reader(self._wakeup_fd)
+        os.close(self._wakeup_fd)
+        os.unlink(self._wakeup_path(self.my_id))
+        for _, ring in self._in_rings:
+            ring.close()
+            os.unlink(ring.path)
+        for ring, wakeup in self._out_rings:
+            ring.close()
+            wakeup.close()
 
 
 class ProcessProgramRunner(object):
@@ -123,7 +552,13 @@ class ProcessProgramRunner(object):
         self.mpc_config = mpc_config if mpc_config is not None else {}
         self.mpc_config[ConfigVars.Reconstruction] = HbmpcConfig.reconstruction
 
-        self.node_communicator = NodeCommunicator(peers_config, my_id, linger_timeout)
+        comm_config = HbmpcConfig.communication
+        communicator_class = NodeCommunicator
+        if comm_config is not None and comm_config.transport == Transport.SHARED_MEMORY:
+            communicator_class = SharedMemoryCommunicator
+        self.node_communicator = communicator_class(
+            peers_config, my_id, linger_timeout, comm_config
+        )
         self.progs = []
 
     def execute(self, sid, program, **kwargs):
@@ -155,10 +590,14 @@ class ProcessProgramRunner(object):
 
     async def __aenter__(self):
         await self.node_communicator.__aenter__()
+        # Messages are acked as consumed once taken out of the queue of their tag
         self.subscribe_task, self.subscribe = subscribe_recv(
-            self.node_communicator.recv
+            self.node_communicator.recv_unconsumed,
+            self.node_communicator.consumed,
+            self.node_communicator.max_received,
         )
         self.send = self.node_communicator.send
+        self.drain = self.node_communicator.drain
         return self
 
     async def __aexit__(self, exc_type, exc, tb):
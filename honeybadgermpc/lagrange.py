@@ -0,0 +1,108 @@
+from collections import OrderedDict
+
+from .field import GF
+
+
+class LagrangeCoefficientCache(object):
+    """ LRU-bounded cache of Lagrange coefficient vectors.
+
+    For a set of points xs and an evaluation point x, the Lagrange coefficients are
+    the values c_i such that f(x) = sum(c_i * f(xs[i])) for every polynomial f of
+    degree < len(xs). Computing them costs O(k^2) field operations, but in steady
+    state the same set of parties responds over and over, so the vectors are kept
+    around and shared between all of the call sites which need them.
+
+    Coefficients are stored as tuples of python ints, so that callers can convert
+    them to whatever element type they work with (GFElement, ZR, charm ZR).
+    """
+
+    DEFAULT_MAXSIZE = 1024
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE):
+        assert maxsize > 0
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+
+    def __len__(self):
+        return len(self._cache)
+
+    def clear(self):
+        """ Removes all cached coefficients and resets the counters.
+        """
+        self._cache.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, field, xs, x=0):
+        """ Returns the Lagrange coefficients of the points xs at x.
+
+        args:
+            field (GF): field to compute the coefficients in
+            xs (list): evaluation points (ints or elements of field), which must be
+                distinct
+            x (int or GFElement): point to evaluate the interpolated polynomial at
+
+        outputs:
+            Tuple of ints, where the ith entry is the coefficient of f(xs[i])
+        """
+        p = field.modulus
+        key = (field, tuple(int(xi) % p for xi in xs), int(x) % p)
+
+        coefficients = self._cache.get(key)
+        if coefficients is not None:
+            self.hits += 1
+            self._cache.move_to_end(key)
+            return coefficients
+
+        self.misses += 1
+        coefficients = _compute_coefficients(field, key[1], key[2])
+
+        self._cache[key] = coefficients
+        if len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+
+        return coefficients
+
+
+def _compute_coefficients(field, xs, x):
+    p = field.modulus
+    k = len(xs)
+
+    # Numerators: products of (x - xs[j]) for j != i, from prefix and suffix products
+    diffs = [(x - xj) % p for xj in xs]
+    suffix = [1] * (k + 1)
+    for i in range(k - 1, -1, -1):
+        suffix[i] = suffix[i + 1] * diffs[i] % p
+
+    numerators = []
+    prefix = 1
+    for i in range(k):
+        numerators.append(prefix * suffix[i + 1] % p)
+        prefix = prefix * diffs[i] % p
+
+    # Denominators: products of (xs[i] - xs[j]) for j != i, all inverted at once
+    denominators = []
+    for i, xi in enumerate(xs):
+        den = 1
+        for j, xj in enumerate(xs):
+            if i != j:
+                den = den * (xi - xj) % p
+        denominators.append(den)
+
+    inverses = field.batch_inverse(denominators)
+    return tuple(num * inv.value % p for num, inv in zip(numerators, inverses))
+
+
+# Cache shared by all callers of lagrange_coefficients
+lagrange_cache = LagrangeCoefficientCache()
+
+
+def lagrange_coefficients(field, xs, x=0):
+    """ Returns the (cached) Lagrange coefficients of the points xs at x over the
+    given field, as a tuple of ints. See LagrangeCoefficientCache.get.
+    """
+    if type(field) is not GF:
+        field = GF(field)
+    return lagrange_cache.get(field, xs, x)
@@ -1,23 +1,26 @@
 import asyncio
 import logging
+import random
 from collections import defaultdict
 
 from honeybadgermpc.progs.mixins.dataflow import (
     GFElementFuture,
+    PackedShareArray,
     Share,
     ShareArray,
     ShareFuture,
 )
 
-from .batch_reconstruction import batch_reconstruct
+from .batch_reconstruction import batch_reconstruct, batch_reconstruct_packed
 from .config import ConfigVars
 from .elliptic_curve import Subgroup
 from .exceptions import HoneyBadgerMPCError
-from .field import GF, GFElement
+from .field import GF
 from .polynomial import EvalPoint, polynomials_over
 from .preprocessing import PreProcessedElements
+from .reed_solomon import Algorithm, CodecCache
 from .program_runner import ProgramRunner
-from .robust_reconstruction import robust_reconstruct
+from .robust_reconstruction import robust_reconstruct_batch
 from .router import SimpleRouter
 from .utils.misc import print_exception_callback
 
@@ -59,6 +62,18 @@ class Mpc(object):
         # playerid => { [shareid => Future share] }
         self._share_buffers = tuple(defaultdict(asyncio.Future) for _ in range(n))
 
+        # Shares opened with open_share during the current event loop tick, which
+        # are sent and reconstructed together once the tick ends.
+        # [(shareid, share value, degree, Future)]
+        self._pending_opens = []
+        self._point = EvalPoint(self.field, n, use_omega_powers=False)
+
+        # Encoders and decoders shared by all openings in this context
+        decoding_algorithm = Algorithm.GAO
+        if ConfigVars.Reconstruction in config:
+            decoding_algorithm = config[ConfigVars.Reconstruction].decoding_algorithm
+        self.codecs = CodecCache(self.field, n, t, decoding_algorithm)
+
         # Batch reconstruction is handled slightly differently,
         # We'll create a separate queue for received values
         # { shareid => Queue() }
@@ -69,6 +84,9 @@ class Mpc(object):
         self.Share = type("Share", (Share,), {"context": self})
         self.ShareFuture = type("ShareFuture", (ShareFuture,), {"context": self})
         self.ShareArray = type("ShareArray", (ShareArray,), {"context": self})
+        self.PackedShareArray = type(
+            "PackedShareArray", (PackedShareArray,), {"context": self}
+        )
         self.GFElementFuture = type(
             "GFElementFuture", (GFElementFuture,), {"context": self}
         )
@@ -104,6 +122,10 @@ class Mpc(object):
         broadcasted local shares from other nodes, and finally reconstruct
         the secret shared value.
 
+        All of the shares opened during the same event loop tick are broadcast in
+        a single message to each party, and reconstructed with a single batched
+        decode (see _flush_opens).
+
         args:
             share (Share): Secret shared value to open
 
@@ -115,52 +137,91 @@ class Mpc(object):
 
         # Choose the shareid based on the order this is called
         shareid = self._get_share_id()
-        t = self.t
-        degree = t if share.t is None else share.t
+        degree = self.t if share.t is None else share.t
+
+        if not self._pending_opens:
+            asyncio.get_event_loop().call_soon(self._flush_opens)
+        self._pending_opens.append((shareid, share.v, degree, res))
 
-        # Broadcast share
+        # Return future that will resolve to reconstructed point
+        return res
+
+    def _flush_opens(self):
+        """ Broadcasts the shares opened with open_share since the last flush, and
+        starts reconstructing them with one batched decode per degree.
+        """
+        pending, self._pending_opens = self._pending_opens, []
+        shareids = [shareid for (shareid, _, _, _) in pending]
+        values = [v.value for (_, v, _, _) in pending]
+        p = self.field.modulus
+
+        # Broadcast shares
         for dest in range(self.N):
-            value_to_share = share.v
+            values_to_share = values
 
             # Send random data if meant to induce faults
             if (
                 ConfigVars.Reconstruction in self.config
                 and self.config[ConfigVars.Reconstruction].induce_faults
             ):
-                logging.debug("[FAULT][RobustReconstruct] Sending random share.")
-                value_to_share = self.field.random()
+                logging.debug("[FAULT][RobustReconstruct] Sending random shares.")
+                values_to_share = [random.randint(0, p - 1) for _ in values]
 
             # 'S' is for single shares
-            self.send(dest, ("S", shareid, value_to_share))
+            self.send(dest, ("S", shareids, values_to_share))
+
+        by_degree = defaultdict(list)
+        for (shareid, _, degree, res) in pending:
+            by_degree[degree].append((shareid, res))
 
-        # Set up the buffer of received shares
-        share_buffer = [self._share_buffers[i][shareid] for i in range(self.N)]
+        for degree, opens in by_degree.items():
+            self._reconstruct_opens(degree, opens)
+
+    def _reconstruct_opens(self, degree, opens):
+        """ Reconstructs the shares with the given ids and degree, and resolves
+        their futures.
+
+        args:
+            degree (int): degree of the shares
+            opens (list): list of (shareid, Future) tuples
+        """
+        shareids = [shareid for (shareid, _) in opens]
 
-        point = EvalPoint(self.field, self.N, use_omega_powers=False)
+        # One awaitable per party, which resolves to all of its shares in the batch
+        share_buffers = [
+            asyncio.gather(*[self._share_buffers[i][shareid] for shareid in shareids])
+            for i in range(self.N)
+        ]
 
-        # Create polynomial that reconstructs the shared value by evaluating at 0
         reconstruction = asyncio.create_task(
-            robust_reconstruct(share_buffer, self.field, self.N, t, point, degree)
+            robust_reconstruct_batch(
+                share_buffers,
+                self.field,
+                self.N,
+                self.t,
+                self._point,
+                degree,
+                codecs=self.codecs,
+            )
         )
 
         def cb(r):
-            p, errors = r.result()
-            if p is None:
+            polys, errors = r.result()
+            if polys is None:
                 logging.error(
-                    f"Robust reconstruction for share (id: {shareid}) "
+                    f"Robust reconstruction for shares (ids: {shareids}) "
                     f"failed with errors: {errors}!"
                 )
-                res.set_exception(
-                    HoneyBadgerMPCError(f"Failed to open share with id {shareid}!")
-                )
+                for (shareid, res) in opens:
+                    res.set_exception(
+                        HoneyBadgerMPCError(f"Failed to open share with id {shareid}!")
+                    )
             else:
-                res.set_result(p(self.field(0)))
+                for (_, res), poly in zip(opens, polys):
+                    res.set_result(self.field(poly[0]))
 
         reconstruction.add_done_callback(cb)
 
-        # Return future that will resolve to reconstructed point
-        return res
-
     def open_share_array(self, sharearray):
         """ Given array of secret shares, opens them in a batch
         and returns their plaintext values.
@@ -172,7 +233,7 @@ class Mpc(object):
             Future, which will resolve to an array of GFElements
         """
         res = asyncio.Future()
-        if not sharearray._shares:
+        if len(sharearray) == 0:
             res.set_result([])
             return res
 
@@ -184,7 +245,7 @@ class Mpc(object):
                 )
                 res.set_exception(HoneyBadgerMPCError("Batch reconstruction failed!"))
             else:
-                res.set_result(elements)
+                res.set_result(list(elements))
 
         shareid = self._get_share_id()
         t = self.t
@@ -199,9 +260,10 @@ class Mpc(object):
         _recv = self._sharearray_buffers[shareid].get
 
         # Generate reconstructed array of shares
+        values = sharearray.values
         reconstructed = asyncio.create_task(
             batch_reconstruct(
-                [s.v for s in sharearray._shares],
+                [s.v for s in sharearray._shares] if values is None else values,
                 self.field.modulus,
                 t,
                 self.N,
@@ -211,6 +273,58 @@ class Mpc(object):
                 config=self.config.get(ConfigVars.Reconstruction),
                 debug=True,
                 degree=degree,
+                codecs=self.codecs,
+            )
+        )
+
+        reconstructed.add_done_callback(cb)
+
+        return res
+
+    def open_packed_share_array(self, packedarray):
+        """ Given an array of packed secret shares, opens them in a batch
+        and returns the plaintext values of all of the secrets they hold.
+
+        args:
+            packedarray (PackedShareArray): packed shares to open
+
+        outputs:
+            Future, which will resolve to an array of the len(packedarray) * ell
+            secrets, as GFElements
+        """
+        res = asyncio.Future()
+        if len(packedarray) == 0:
+            res.set_result([])
+            return res
+
+        def cb(r):
+            elements = r.result()
+            if elements is None:
+                logging.error(
+                    f"Packed reconstruction for share_array (id: {shareid}) failed!"
+                )
+                res.set_exception(HoneyBadgerMPCError("Packed reconstruction failed!"))
+            else:
+                res.set_result(list(elements))
+
+        shareid = self._get_share_id()
+
+        def _send(dest, o):
+            (tag, share) = o
+            self.send(dest, (tag, shareid, share))
+
+        reconstructed = asyncio.create_task(
+            batch_reconstruct_packed(
+                packedarray.values,
+                self.field.modulus,
+                self.t,
+                packedarray.ell,
+                self.N,
+                self.myid,
+                _send,
+                self._sharearray_buffers[shareid].get,
+                degree=packedarray.t,
+                codecs=self.codecs,
             )
         )
 
@@ -239,6 +353,12 @@ class Mpc(object):
                 raise bg_exception
 
         bgtask.cancel()
+
+        codecs = self.codecs
+        logging.info(
+            f"[{self.myid}] Built {codecs.misses} codecs in {codecs.setup_time:.6f}s, "
+            f"reused them {codecs.hits} times, saving ~{codecs.saved_time:.6f}s"
+        )
         return result.result()
 
     async def _recvloop(self):
@@ -252,20 +372,22 @@ class Mpc(object):
 
             # Sort into single or batch
             if tag == "S":
-                assert type(share) is GFElement, "?"
+                # Single shares arrive in batches of the ones opened in a tick
+                assert type(share) is list, "?"
                 buf = self._share_buffers[j]
 
-                # Assert there is not an R1 or R2 value either
-                assert shareid not in self._sharearray_buffers
+                for (sid, value) in zip(shareid, share):
+                    # Assert there is not an R1 or R2 value either
+                    assert sid not in self._sharearray_buffers
 
-                # Assert that there is not an element already
-                if buf[shareid].done():
-                    logging.info(f"redundant share: {j} {(tag, shareid)}")
-                    raise AssertionError(f"Received a redundant share: {shareid}")
+                    # Assert that there is not an element already
+                    if buf[sid].done():
+                        logging.info(f"redundant share: {j} {(tag, sid)}")
+                        raise AssertionError(f"Received a redundant share: {sid}")
 
-                buf[shareid].set_result(share)
+                    buf[sid].set_result(self.field(value))
 
-            elif tag in ("R1", "R2"):
+            elif tag in ("R1", "R2", "O"):
                 assert type(share) is list
 
                 # Assert there is not an 'S' value here
@@ -3,12 +3,18 @@
 # The data validation and checking must be done in python in all cases!
 # PEP8 standards are observed wherever possible but ignored in cases whether NTL
 # classes are used (like ZZ, mat_ZZ_p, etc) and also for NTL function names
+# The GIL is released around the native math (everything between converting the
+# inputs to NTL types and converting the outputs back), so that these functions
+# can run on a thread pool without stalling the asyncio event loop. NTL keeps the
+# ZZ_p modulus per thread, so every function sets it on the thread it runs on.
 from .ntlwrapper cimport ZZ, ZZ_p, mat_ZZ_p, vec_ZZ_p, ZZ_pX_c
 from .ntlwrapper cimport mat_ZZ_p_mul, ZZ_p_init, SqrRootMod
 from .ntlwrapper cimport ZZFromBytes, bytesFromZZ, to_ZZ_p, to_ZZ, ZZNumBytes
 from .ntlwrapper cimport SetNTLNumThreads_c, AvailableThreads
 from .ntlwrapper cimport ZZ_pX_get_coeff, ZZ_pX_set_coeff, ZZ_pX_eval
 from .rsdecode cimport interpolate_c, vandermonde_inverse_c, set_vm_matrix_c, fft_c, fft_partial_c, fnt_decode_step1_c, fnt_decode_step2_c, gao_interpolate_c, gao_interpolate_fft_c
+from .rsdecode cimport vandermonde_interpolate_cached_c, vandermonde_evaluate_cached_c
+from .rsdecode cimport vandermonde_cache_clear_c, vandermonde_cache_size_c, vandermonde_cache_set_max_size_c
 from .ccobject cimport ccrepr, ccreadstr
 from cpython.int cimport PyInt_AS_LONG
 from cython.parallel import parallel, prange
@@ -91,7 +97,8 @@ cpdef lagrange_interpolate(x, y, modulus):
         y_vec.push_back(py_obj_to_ZZ(y[i]))
 
     cdef ZZ zz_modulus = py_obj_to_ZZ(modulus)
-    interpolate_c(r_vec, x_vec, y_vec, zz_modulus)
+    with nogil:
+        interpolate_c(r_vec, x_vec, y_vec, zz_modulus)
 
     result = []
     for i in range(r_vec.size()):
@@ -148,6 +155,10 @@ cpdef vandermonde_batch_interpolate(x, data_list, modulus):
     More on the math behind this here
     http://pages.cs.wisc.edu/~sifakis/courses/cs412-s13/lecture_notes/CS412_12_Feb_2013.pdf
 
+    The inverse of `A` only depends on the points and the modulus, so it is kept
+    in a bounded cache on the native side (see `vandermonde_cache_size`) and
+    repeated calls with the same points only cost a single matrix multiply.
+
     :param x: list of evaluation points
     :type x: list of integers
     :param data_list: evaluations of polynomials
@@ -163,10 +174,7 @@ cpdef vandermonde_batch_interpolate(x, data_list, modulus):
         x_vec.push_back(py_obj_to_ZZ(xi))
 
     cdef ZZ zz_modulus = py_obj_to_ZZ(modulus)
-    cdef mat_ZZ_p r
-    d = vandermonde_inverse_c(r, x_vec, zz_modulus)
-    if d is False:
-        raise InterpolationError("Interpolation failed")
+    ZZ_p_init(zz_modulus)
 
     cdef mat_ZZ_p m
     cdef int k = max([len(d) for d in data_list])
@@ -179,26 +187,29 @@ cpdef vandermonde_batch_interpolate(x, data_list, modulus):
             m[j][i] = intToZZp(data_list[i][j])
         for j in range(l, k):
             m[j][i] = intToZZp(0)
+
     cdef mat_ZZ_p reconstructions
-    mat_ZZ_p_mul(reconstructions, r, m)
+    cdef int success
+    with nogil:
+        success = vandermonde_interpolate_cached_c(reconstructions, x_vec, m,
+                                                   zz_modulus)
+    if not success:
+        raise InterpolationError("Interpolation failed")
 
     polynomials = [[None] * k for _ in range(n_chunks)]
-
-    for i in range(n_chunks):
-        for j in range(k):
-            polynomials[i][j] = 0
-
     for i in range(n_chunks):
         for j in range(k):
             polynomials[i][j] = ZZpToInt(reconstructions[j][i])
     reconstructions.kill()
     m.kill()
-    r.kill()
     return polynomials
 
 cpdef vandermonde_batch_evaluate(x, polynomials, modulus):
     """Evaluate polynomials at given points x using vandermonde matrices
 
+    The vandermonde matrix is cached on the native side, keyed by the points,
+    the number of coefficients and the modulus.
+
     :param x: evaluation points
     :type x: list of integers
     :param polynomials: polynomial coefficients. polynomials[i] = coefficients of the
@@ -208,7 +219,7 @@ cpdef vandermonde_batch_evaluate(x, polynomials, modulus):
     :type modulus: integer
     :return:
     """
-    cdef mat_ZZ_p vm_matrix, poly_matrix, res_matrix
+    cdef mat_ZZ_p poly_matrix, res_matrix
     cdef int n = len(x)
     cdef int i, j
     # Number of chunks
@@ -219,9 +230,7 @@ cpdef vandermonde_batch_evaluate(x, polynomials, modulus):
     cdef ZZ zz_modulus = py_obj_to_ZZ(modulus)
     ZZ_p_init(zz_modulus)
 
-    # Set vm_matrix
     cdef vec_ZZ_p x_vec = py_list_to_vec_ZZ_p(x)
-    set_vm_matrix_c(vm_matrix, x_vec, d)
 
     # Set matrix with polynomial coefficients
     poly_matrix.SetDims(d, k)
@@ -232,9 +241,10 @@ cpdef vandermonde_batch_evaluate(x, polynomials, modulus):
         for j in range(l, d):
             poly_matrix[j][i] = intToZZp(0)
 
-    # Finally multiply matrices. This gives evaluation of polynomials at
-    # all points chosen
-    mat_ZZ_p_mul(res_matrix, vm_matrix, poly_matrix)
+    # Finally multiply by the (cached) vandermonde matrix. This gives evaluation
+    # of polynomials at all points chosen
+    with nogil:
+        vandermonde_evaluate_cached_c(res_matrix, x_vec, d, poly_matrix)
 
     # Convert back to python friendly formats
     result = [[None] * n for _ in range(k)]
@@ -243,6 +253,21 @@ cpdef vandermonde_batch_evaluate(x, polynomials, modulus):
             result[j][i] = ZZpToInt(res_matrix[i][j])
     return result
 
+cpdef clear_vandermonde_cache():
+    """Drop all cached vandermonde and inverse vandermonde matrices"""
+    vandermonde_cache_clear_c()
+
+cpdef int vandermonde_cache_size():
+    """Number of matrices currently held in the vandermonde matrix cache"""
+    return vandermonde_cache_size_c()
+
+cpdef set_vandermonde_cache_max_size(int max_size):
+    """Bound the number of cached vandermonde matrices, evicting the least
+    recently used ones if there are more than `max_size` already.
+    Passing 0 disables caching.
+    """
+    vandermonde_cache_set_max_size_c(max_size)
+
 cpdef fft(coeffs, omega, modulus, int n):
     cdef int i, d;
     cdef vec_ZZ_p coeffs_vec, result_vec;
@@ -255,7 +280,8 @@ cpdef fft(coeffs, omega, modulus, int n):
         coeffs_vec[i] = intToZZp(coeffs[i])
 
     cdef ZZ_p zz_omega = intToZZp(omega)
-    fft_c(result_vec, coeffs_vec, zz_omega, n)
+    with nogil:
+        fft_c(result_vec, coeffs_vec, zz_omega, n)
 
     result = [None] * n
     for i in range(n):
@@ -275,7 +301,8 @@ cpdef partial_fft(coeffs, omega, modulus, int n, int k):
         coeffs_vec[i] = intToZZp(coeffs[i])
 
     cdef ZZ_p zz_omega = intToZZp(omega)
-    fft_partial_c(result_vec, coeffs_vec, zz_omega, n, k)
+    with nogil:
+        fft_partial_c(result_vec, coeffs_vec, zz_omega, n, k)
 
     result = [None] * k
     for i in range(k):
@@ -331,8 +358,9 @@ def fft_interpolate(zs, ys, omega, modulus, int n):
         z_vec[i] = PyInt_AS_LONG(zs[i])
         y_vec[i] = intToZZp(ys[i])
 
-    fnt_decode_step1_c(A, Ad_evals_vec, z_vec, zz_omega, n)
-    fnt_decode_step2_c(P_coeffs, A, Ad_evals_vec, z_vec, y_vec, zz_omega, n)
+    with nogil:
+        fnt_decode_step1_c(A, Ad_evals_vec, z_vec, zz_omega, n)
+        fnt_decode_step2_c(P_coeffs, A, Ad_evals_vec, z_vec, y_vec, zz_omega, n)
 
     result = [None] * k
     for i in range(k):
@@ -355,7 +383,8 @@ def fft_batch_interpolate(zs, ys_list, omega, modulus, int n):
     for i in range(k):
         z_vec[i] = PyInt_AS_LONG(zs[i])
 
-    fnt_decode_step1_c(A, Ad_evals_vec, z_vec, zz_omega, n)
+    with nogil:
+        fnt_decode_step1_c(A, Ad_evals_vec, z_vec, zz_omega, n)
 
     cdef vector[vec_ZZ_p] y_vec_list, result_vec_list;
     y_vec_list.resize(n_chunks)
@@ -421,10 +450,12 @@ cpdef gao_interpolate(x, y, int k, modulus, z=None, omega=None, order=None,
         for i in range(n):
             z_vec[i] = int(z[i])
 
-        success = gao_interpolate_fft_c(res_vec, err_vec, x_vec, z_vec, y_vec,
-                                        zz_omega, k, n, order)
+        with nogil:
+            success = gao_interpolate_fft_c(res_vec, err_vec, x_vec, z_vec, y_vec,
+                                            zz_omega, k, n, int_order)
     else:
-        success = gao_interpolate_c(res_vec, err_vec, x_vec, y_vec, k, n)
+        with nogil:
+            success = gao_interpolate_c(res_vec, err_vec, x_vec, y_vec, k, n)
 
     if success:
         result = [None] * res_vec.length()
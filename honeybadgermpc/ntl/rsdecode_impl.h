@@ -4,7 +4,9 @@
 #include <NTL/vec_ZZ_p.h>
 #include <vector>
 #include <iostream>
+#include <list>
 #include <map>
+#include <memory>
 #include <omp.h>
 #include <mutex>
 
@@ -15,10 +17,6 @@ using namespace std;
 // Determined experimentally based on minimising time taken by fft
 #define FFT_VAN_THRESHOLD 16
 
-map <pair<int, ZZ>, mat_ZZ_p> _fft_van_matrices;
-ZZ _fft_van_modulus;
-mutex _interp_mutex;
-
 
 void set_vm_matrix(mat_ZZ_p &result, vec_ZZ_p &x_list, int d)
 {
@@ -35,35 +33,6 @@ void set_vm_matrix(mat_ZZ_p &result, vec_ZZ_p &x_list, int d)
     }
 }
 
-void _set_fft_vandermonde_matrix(ZZ_p omega, int n)
-{
-    vec_ZZ_p x;
-    x.SetLength(n);
-    set(x[0]);
-    for (int i=1; i < n; i++) {
-        mul(x[i], x[i-1], omega);
-    }
-    mat_ZZ_p interpolator;
-    set_vm_matrix(interpolator, x, n);
-
-    _fft_van_matrices.emplace(make_pair(make_pair(n, rep(omega)), interpolator));
-}
-
-mat_ZZ_p& get_fft_vandermonde_matrix(ZZ_p omega, int n)
-{
-    lock_guard<mutex> lock(_interp_mutex);
-    if (ZZ_p::modulus() != _fft_van_modulus) {
-        _fft_van_modulus = ZZ_p::modulus();
-        _fft_van_matrices.clear();
-    }
-
-    if (_fft_van_matrices.find(make_pair(n, rep(omega))) == _fft_van_matrices.end()) {
-        _set_fft_vandermonde_matrix(omega, n);
-    }
-
-    return (_fft_van_matrices.find(make_pair(n, rep(omega))))->second;
-}
-
 void interpolate(vector<ZZ> &result, vector<ZZ> &x, vector<ZZ> &y, ZZ &modulus)
 {
     // Converting types to what we need
@@ -121,6 +90,173 @@ bool vandermonde_inverse(mat_ZZ_p &result, vector<ZZ> &x, ZZ &modulus)
     return !IsZero(det);
 }
 
+/*
+ * Bounded LRU cache of Vandermonde matrices (for evaluation) and inverse
+ * Vandermonde matrices (for interpolation).
+ *
+ * For a fixed set of evaluation points these matrices never change, so
+ * building and inverting them on every batch is wasted work. Entries are
+ * keyed by (modulus, number of columns, points). Inverse matrices use -1 as the
+ * number of columns so that they never collide with evaluation matrices.
+ *
+ * Matrices are handed out as shared_ptrs, so an entry evicted by another thread
+ * stays alive until the multiplication using it has finished.
+ */
+#define VM_CACHE_DEFAULT_SIZE 256
+
+struct VmCacheKey {
+    ZZ modulus;
+    int d;
+    vector<ZZ> x;
+
+    bool operator<(const VmCacheKey &other) const {
+        if (d != other.d) return d < other.d;
+        if (modulus != other.modulus) return modulus < other.modulus;
+        return x < other.x;
+    }
+};
+
+typedef list<pair<VmCacheKey, shared_ptr<mat_ZZ_p> > > VmCacheList;
+
+VmCacheList _vm_cache_list;
+map<VmCacheKey, VmCacheList::iterator> _vm_cache_index;
+size_t _vm_cache_max_size = VM_CACHE_DEFAULT_SIZE;
+mutex _vm_cache_mutex;
+
+void _vm_cache_trim()
+{
+    while (_vm_cache_list.size() > _vm_cache_max_size) {
+        _vm_cache_index.erase(_vm_cache_list.back().first);
+        _vm_cache_list.pop_back();
+    }
+}
+
+shared_ptr<mat_ZZ_p> _vm_cache_get(const VmCacheKey &key)
+{
+    lock_guard<mutex> lock(_vm_cache_mutex);
+    auto it = _vm_cache_index.find(key);
+    if (it == _vm_cache_index.end()) {
+        return shared_ptr<mat_ZZ_p>();
+    }
+
+    // Move the entry to the front of the list, marking it most recently used
+    _vm_cache_list.splice(_vm_cache_list.begin(), _vm_cache_list, it->second);
+    return it->second->second;
+}
+
+void _vm_cache_put(const VmCacheKey &key, shared_ptr<mat_ZZ_p> matrix)
+{
+    lock_guard<mutex> lock(_vm_cache_mutex);
+    if (_vm_cache_index.find(key) != _vm_cache_index.end()) {
+        // Another thread computed the same matrix in the meantime
+        return;
+    }
+
+    _vm_cache_list.push_front(make_pair(key, matrix));
+    _vm_cache_index[key] = _vm_cache_list.begin();
+    _vm_cache_trim();
+}
+
+void vandermonde_cache_clear()
+{
+    lock_guard<mutex> lock(_vm_cache_mutex);
+    _vm_cache_index.clear();
+    _vm_cache_list.clear();
+}
+
+int vandermonde_cache_size()
+{
+    lock_guard<mutex> lock(_vm_cache_mutex);
+    return _vm_cache_list.size();
+}
+
+void vandermonde_cache_set_max_size(int max_size)
+{
+    lock_guard<mutex> lock(_vm_cache_mutex);
+    _vm_cache_max_size = (max_size > 0) ? max_size : 0;
+    _vm_cache_trim();
+}
+
+/*
+ * Vandermonde matrix used by _fft for the n powers of omega. It is the
+ * evaluation matrix of those points, so it is kept in the same LRU cache as the
+ * matrices of vandermonde_evaluate_cached, under the same key.
+ * Must be called with the ZZ_p modulus already set
+ */
+shared_ptr<mat_ZZ_p> get_fft_vandermonde_matrix(ZZ_p omega, int n)
+{
+    vec_ZZ_p x;
+    x.SetLength(n);
+    set(x[0]);
+    for (int i=1; i < n; i++) {
+        mul(x[i], x[i-1], omega);
+    }
+
+    VmCacheKey key = {ZZ_p::modulus(), n, vector<ZZ>()};
+    key.x.reserve(n);
+    for (int i=0; i < n; i++) {
+        key.x.push_back(rep(x[i]));
+    }
+
+    shared_ptr<mat_ZZ_p> matrix = _vm_cache_get(key);
+    if (!matrix) {
+        matrix = make_shared<mat_ZZ_p>();
+        set_vm_matrix(*matrix, x, n);
+        _vm_cache_put(key, matrix);
+    }
+    return matrix;
+}
+
+/*
+ * Interpolate a batch of polynomials from their evaluations at points x.
+ * Column i of `evals` holds the evaluations of polynomial i, and column i of
+ * `result` receives its coefficients.
+ * Return value is whether or not the Vandermonde matrix was invertible
+ */
+bool vandermonde_interpolate_cached(mat_ZZ_p &result, vector<ZZ> &x,
+                                    mat_ZZ_p &evals, ZZ &modulus)
+{
+    ZZ_p::init(modulus);
+
+    VmCacheKey key = {modulus, -1, x};
+    shared_ptr<mat_ZZ_p> inverse = _vm_cache_get(key);
+    if (!inverse) {
+        inverse = make_shared<mat_ZZ_p>();
+        if (!vandermonde_inverse(*inverse, x, modulus)) {
+            return false;
+        }
+        _vm_cache_put(key, inverse);
+    }
+
+    mul(result, *inverse, evals);
+    return true;
+}
+
+/*
+ * Evaluate a batch of polynomials with at most d coefficients at points x.
+ * Column i of `coeffs` holds the coefficients of polynomial i, and column i of
+ * `result` receives its evaluations.
+ * Must be called with the ZZ_p modulus already set
+ */
+void vandermonde_evaluate_cached(mat_ZZ_p &result, vec_ZZ_p &x_list, int d,
+                                 mat_ZZ_p &coeffs)
+{
+    VmCacheKey key = {ZZ_p::modulus(), d, vector<ZZ>()};
+    key.x.reserve(x_list.length());
+    for (int i=0; i < x_list.length(); i++) {
+        key.x.push_back(rep(x_list[i]));
+    }
+
+    shared_ptr<mat_ZZ_p> matrix = _vm_cache_get(key);
+    if (!matrix) {
+        matrix = make_shared<mat_ZZ_p>();
+        set_vm_matrix(*matrix, x_list, d);
+        _vm_cache_put(key, matrix);
+    }
+
+    mul(result, *matrix, coeffs);
+}
+
 
 void _fft(vec_ZZ_p &a, ZZ_p omega, int n, int m=-1,
           mat_ZZ_p *van_matrix=NULL, int van_threshold=-1) {
@@ -177,15 +313,16 @@ void fft(vec_ZZ_p &a, vec_ZZ_p &coeffs, ZZ_p &omega, int n, int k=-1) {
         clear(a[i]);
     }
 
-    mat_ZZ_p *van_matrix=NULL;
+    // The shared_ptr keeps the matrix alive until _fft is done with it
+    shared_ptr<mat_ZZ_p> van_matrix;
     int van_threshold = FFT_VAN_THRESHOLD;
     if (n >= van_threshold) {
         ZZ_p omega_pow;
         power(omega_pow, omega, n / van_threshold);
-        van_matrix = &get_fft_vandermonde_matrix(omega_pow, van_threshold);
+        van_matrix = get_fft_vandermonde_matrix(omega_pow, van_threshold);
     }
 
-    _fft(a, omega, n, k, van_matrix, van_threshold);
+    _fft(a, omega, n, k, van_matrix.get(), van_threshold);
     if (k != -1) {
         a.SetLength(k);
     }
@@ -0,0 +1,85 @@
+"""
+Helpers for packed (multi-secret) Shamir secret sharing.
+
+A packed share holds ell secrets at once: they are the values of a single
+polynomial of degree t + ell - 1 at the ell secret points 0, -1, ..., -(ell - 1),
+while party i holds the value of the polynomial at i + 1, as with regular shares.
+Any t shares reveal nothing about the secrets, and adding or multiplying packed
+shares acts on all of the ell secrets element-wise at once.
+
+Opening packed shares of degree d robustly requires n >= d + 2t + 1, so the number
+of secrets per share is limited to ell <= n - 3t for shares of degree t + ell - 1.
+"""
+
+from .lagrange import lagrange_coefficients
+from .polynomial import _horner, polynomials_over
+
+
+def secret_points(field, ell):
+    """ Returns the ell points, as ints, at which packed polynomials hold their
+    secrets.
+    """
+    return [-j % field.modulus for j in range(ell)]
+
+
+def random_packed_polynomial(field, secrets, degree):
+    """ Returns a random polynomial of the given degree whose values at the secret
+    points are the given secrets.
+
+    args:
+        field (GF): field to share the secrets in
+        secrets (list): ell secrets to pack
+        degree (int): degree of the polynomial, at least ell - 1
+
+    outputs:
+        Polynomial f such that f(secret_points(field, ell)[j]) == secrets[j]
+    """
+    ell = len(secrets)
+    assert degree >= ell - 1
+    poly = polynomials_over(field)
+    points = secret_points(field, ell)
+
+    # f = L + Z * R, where L interpolates the secrets, Z vanishes on the secret points
+    # and R is random, so that f is uniformly random among polynomials of the degree
+    # with the given secrets
+    f = poly.interpolate([(field(x), field(int(s))) for x, s in zip(points, secrets)])
+    if degree >= ell:
+        z = poly([1])
+        for x in points:
+            z *= poly([-x, 1])
+        f += z * poly.random(degree - ell)
+
+    return f
+
+
+def public_shares(field, values, ell, x):
+    """ Treats public values as packed shares of degree ell - 1, i.e. evaluates at x the
+    polynomial holding each group of ell consecutive values at the secret points.
+
+    args:
+        field (GF): field the values belong to
+        values (list): values to pack, whose length is a multiple of ell
+        ell (int): number of values per packed share
+        x (int): point to evaluate at, i.e. myid + 1
+
+    outputs:
+        List of len(values) // ell ints
+    """
+    assert len(values) % ell == 0
+    p = field.modulus
+    coefficients = lagrange_coefficients(field, secret_points(field, ell), x)
+
+    values = [int(v) for v in values]
+    return [
+        sum(c * v for c, v in zip(coefficients, values[i : i + ell])) % p
+        for i in range(0, len(values), ell)
+    ]
+
+
+def unpack_secrets(field, polys, ell):
+    """ Given the coefficients of reconstructed packed polynomials, returns the
+    secrets held by each of them, concatenated, as ints.
+    """
+    p = field.modulus
+    points = secret_points(field, ell)
+    return [_horner(coeffs, x, p) for coeffs in polys for x in points]
@@ -1,5 +1,6 @@
 import logging
 import operator
+from collections import OrderedDict
 from functools import reduce
 from itertools import zip_longest
 
@@ -8,7 +9,8 @@ from honeybadgermpc.ntl import fft_interpolate as fft_interpolate_cpp
 
 from .betterpairing import ZR
 from .elliptic_curve import Subgroup
-from .field import GF, GFElement
+from .field import GF, GFArray, GFElement
+from .lagrange import lagrange_coefficients
 
 
 def strip_trailing_zeros(a):
@@ -20,6 +22,111 @@ def strip_trailing_zeros(a):
     return a[:i]
 
 
+def _evaluate(coeffs, x, field):
+    """ Evaluates the polynomial over field with the given coefficients at x.
+    """
+    if type(field) is GF:
+        # Horner's rule over the packed coefficients
+        p, x, y = field.modulus, int(x), 0
+        for coeff in reversed(coeffs.values):
+            y = (y * x + coeff) % p
+        return field(y)
+
+    y = field(0)
+    xx = field(1)
+    for coeff in coeffs:
+        y += coeff * xx
+        xx *= x
+    return y
+
+
+def _lagrange_vector(field, xs, x_recomb):
+    """ Returns the Lagrange coefficients of the points xs at x_recomb, as
+    elements of field.
+    """
+    if type(field) is GF:
+        # Coefficients for a given set of points are cached across calls
+        return map(field, lagrange_coefficients(field, xs, x_recomb))
+
+    nums, dens = [], []
+    for i, x_i in enumerate(xs):
+        num, den = field(1), field(1)
+        for k, x_k in enumerate(xs):
+            if k != i:
+                num *= x_k - x_recomb
+                den *= x_k - x_i
+        nums.append(num)
+        dens.append(den)
+
+    # All denominators are inverted at once
+    return map(operator.mul, nums, _invert_all(field, dens))
+
+
+def _invert_all(field, values):
+    # Prime fields support batched inversion, other fields invert one by one
+    if type(field) is GF:
+        return field.batch_inverse(values)
+    return [1 / v for v in values]
+
+
+def _coerce_coeffs(coeffs, field, field_type):
+    """ Returns the coefficients of a polynomial over field without the trailing
+    zeros, given a GFArray or a list of elements or ints. Coefficients over a GF
+    are kept packed in a GFArray, others are returned as a list of elements.
+    """
+    if isinstance(coeffs, GFArray):
+        # Packed coefficients are already reduced elements of a field
+        assert coeffs.field is field
+        return coeffs[: len(strip_trailing_zeros(coeffs.values))]
+
+    if type(field) is GF:
+        p, values = field.modulus, []
+        for coeff in coeffs:
+            if type(coeff) is int:
+                values.append(coeff % p)
+            else:
+                assert type(coeff) is GFElement
+                values.append(coeff.value)
+        return GFArray(strip_trailing_zeros(values), field, reduced=True)
+
+    coeffs = list(strip_trailing_zeros(coeffs))
+    for i in range(len(coeffs)):
+        if type(coeffs[i]) is int:
+            coeffs[i] = field(coeffs[i])
+        assert type(coeffs[i]) is field_type
+    return coeffs
+
+
+def _add_gf(a, b, field):
+    """ Adds the polynomials over a GF with packed coefficients a and b.
+    """
+    a, b = a.values, b.values
+    if len(a) < len(b):
+        a, b = b, a
+    p = field.modulus
+    total = [(x + y) % p for x, y in zip(a, b)] + a[len(b) :]
+    return GFArray(total, field, reduced=True)
+
+
+def _mul_gf(a, b, field):
+    """ Multiplies the polynomials over a GF with packed coefficients a and b, see
+    poly_mul.
+    """
+    product = poly_mul(a.values, b.values, field.modulus)
+    return GFArray(product, field, reduced=True)
+
+
+def _divmod_gf(a, b, field):
+    """ Divides the polynomial over a GF with packed coefficients a by the one with
+    coefficients b, see poly_divmod.
+    """
+    quotient, remainder = poly_divmod(a.values, b.values, field.modulus)
+    return (
+        GFArray(quotient, field, reduced=True),
+        GFArray(remainder, field, reduced=True),
+    )
+
+
 _poly_cache = {}
 
 
@@ -33,15 +140,13 @@ def polynomials_over(field):
 
     class Polynomial(object):
         def __init__(self, coeffs):
-            self.coeffs = list(strip_trailing_zeros(coeffs))
-            for i in range(len(self.coeffs)):
-                if type(self.coeffs[i]) is int:
-                    self.coeffs[i] = field(self.coeffs[i])
-                assert type(self.coeffs[i]) is field_type
+            self.coeffs = _coerce_coeffs(coeffs, field, field_type)
             self.field = field
 
         def is_zero(self):
-            return self.coeffs == [] or (len(self.coeffs) == 1 and self.coeffs[0] == 0)
+            return len(self.coeffs) == 0 or (
+                len(self.coeffs) == 1 and self.coeffs[0] == 0
+            )
 
         def __repr__(self):
             if self.is_zero():
@@ -54,12 +159,7 @@ def polynomials_over(field):
             )
 
         def __call__(self, x):
-            y = field(0)
-            xx = field(1)
-            for coeff in self.coeffs:
-                y += coeff * xx
-                xx *= x
-            return y
+            return _evaluate(self.coeffs, x, field)
 
         def __eq__(self, other):
             return type(other) is Polynomial and other.coeffs == self.coeffs
@@ -71,12 +171,7 @@ def polynomials_over(field):
                 x_recomb = field(x_recomb)
             assert type(x_recomb) is field_type
             xs, ys = zip(*shares)
-            vector = []
-            for i, x_i in enumerate(xs):
-                factors = [
-                    (x_k - x_recomb) / (x_k - x_i) for k, x_k in enumerate(xs) if k != i
-                ]
-                vector.append(reduce(operator.mul, factors))
+            vector = _lagrange_vector(field, xs, x_recomb)
             return sum(map(operator.mul, ys, vector))
 
         _lagrange_cache = {}  # Cache lagrange polynomials
@@ -87,23 +182,23 @@ def polynomials_over(field):
             one = cls([field(1)])  # This is the polynomial f(x) = 1
             xs, ys = zip(*shares)
 
-            def lagrange(xi):
-                # Let's cache lagrange values
-                if (xs, xi) in cls._lagrange_cache:
-                    return cls._lagrange_cache[(xs, xi)]
-
-                def mul(a, b):
-                    return a * b
+            def mul(a, b):
+                return a * b
 
+            # Compute the lagrange polynomials which aren't cached yet, inverting
+            # all of their denominators at once
+            missing = [xi for xi in xs if (xs, xi) not in cls._lagrange_cache]
+            dens = [
+                reduce(mul, [xi - xj for xj in xs if xj != xi], field(1))
+                for xi in missing
+            ]
+            for xi, den_inv in zip(missing, _invert_all(field, dens)):
                 num = reduce(mul, [x - cls([xj]) for xj in xs if xj != xi], one)
-                den = reduce(mul, [xi - xj for xj in xs if xj != xi], field(1))
-                p = num * cls([1 / den])
-                cls._lagrange_cache[(xs, xi)] = p
-                return p
+                cls._lagrange_cache[(xs, xi)] = num * cls([den_inv])
 
             f = cls([0])
             for xi, yi in zip(xs, ys):
-                pi = lagrange(xi)
+                pi = cls._lagrange_cache[(xs, xi)]
                 f += cls([yi]) * pi
             return f
 
@@ -118,8 +213,9 @@ def polynomials_over(field):
             assert type(omega) is field_type
             assert omega ** n == 1, "must be an n'th root of unity"
             assert omega ** (n // 2) != 1, "must be a primitive n'th root of unity"
-            coeffs = [b / n for b in fft_helper(ys, 1 / omega, field)]
-            return cls(coeffs)
+            p = field.modulus
+            coeffs = intt([int(y) % p for y in ys], omega, p)
+            return cls(GFArray(coeffs, field, reduced=True))
 
         def evaluate_fft(self, omega, n):
             assert n & (n - 1) == 0, "n must be power of two"
@@ -188,12 +284,17 @@ def polynomials_over(field):
             return self + (-other)
 
         def __neg__(self):
+            if field_type is GFElement:
+                return Polynomial(-self.coeffs)
             return Polynomial([-a for a in self])
 
         def __len__(self):
             return len(self.coeffs)
 
         def __add__(self, other):
+            if field_type is GFElement:
+                return Polynomial(_add_gf(self.coeffs, other.coeffs, field))
+
             new_coefficients = [
                 sum(x) for x in zip_longest(self, other, fillvalue=self.field(0))
             ]
@@ -203,6 +304,9 @@ def polynomials_over(field):
             if self.is_zero() or other.is_zero():
                 return zero()
 
+            if field_type is GFElement:
+                return Polynomial(_mul_gf(self.coeffs, other.coeffs, field))
+
             new_coeffs = [self.field(0) for _ in range(len(self) + len(other) - 1)]
 
             for i, a in enumerate(self):
@@ -217,6 +321,13 @@ def polynomials_over(field):
             return self.coeffs[-1]
 
         def __divmod__(self, divisor):
+            if divisor.is_zero():
+                raise ZeroDivisionError
+
+            if field_type is GFElement:
+                quotient, remainder = _divmod_gf(self.coeffs, divisor.coeffs, field)
+                return Polynomial(quotient), Polynomial(remainder)
+
             quotient, remainder = zero(), self
             divisor_deg = divisor.degree()
             divisor_lc = divisor.leading_coefficient()
@@ -239,7 +350,7 @@ def polynomials_over(field):
             return divmod(self, divisor)[0]
 
         def __mod__(self, divisor):
-            if divisor.isZero():
+            if divisor.is_zero():
                 raise ZeroDivisionError
             return divmod(self, divisor)[1]
 
@@ -268,6 +379,564 @@ def get_omega(field, n, seed=None):
     return y
 
 
+# Twiddle factors [omega^0, ..., omega^(n/2 - 1)] for each (omega, n, modulus)
+# Twiddle factors for the most recently used roots of unity
+_twiddle_cache = OrderedDict()
+TWIDDLE_CACHE_SIZE = 64
+
+
+def _twiddles(omega, n, p):
+    key = (omega, n, p)
+    twiddles = _twiddle_cache.get(key)
+    if twiddles is None:
+        twiddles = [1] * (n // 2)
+        for i in range(1, n // 2):
+            twiddles[i] = twiddles[i - 1] * omega % p
+        _twiddle_cache[key] = twiddles
+        if len(_twiddle_cache) > TWIDDLE_CACHE_SIZE:
+            _twiddle_cache.popitem(last=False)
+    else:
+        _twiddle_cache.move_to_end(key)
+    return twiddles
+
+
+def _bit_reverse(a):
+    """ Permutes a in place, such that a[i] and a[rev(i)] are swapped, where rev
+    reverses the bits of an index.
+    """
+    n = len(a)
+    j = 0
+    for i in range(1, n):
+        bit = n >> 1
+        while j & bit:
+            j ^= bit
+            bit >>= 1
+        j |= bit
+        if i < j:
+            a[i], a[j] = a[j], a[i]
+
+
+def ntt(a, omega, p):
+    """ Iterative in-place radix-2 number theoretic transform.
+
+    Given the coefficients a (a list of ints, whose length n is a power of 2)
+    of a polynomial, overwrites a with the evaluations of the polynomial at
+    [omega^0, ..., omega^(n-1)], and returns it. omega must be a primitive n'th
+    root of unity modulo p.
+    """
+    n = len(a)
+    assert n & (n - 1) == 0, "n must be a power of 2"
+    if n == 1:
+        return a
+
+    omega = int(omega) % p
+    _bit_reverse(a)
+    _butterflies(a, n, _twiddles(omega, n, p), p)
+    return a
+
+
+def _butterflies(a, n, twiddles, p):
+    """ Runs the butterfly passes of ntt on a, which holds len(a) // n bit-reversed
+    transforms of length n back to back. Butterfly blocks never straddle two
+    transforms, so every pass processes all of them with the same slices.
+    """
+    total = len(a)
+    half = 1
+    while half < n:
+        length = 2 * half
+        ws = twiddles[:: n // length]
+        if half <= total // length:
+            # Few butterflies per block: iterate over the butterfly index, and
+            # process that butterfly of every block at once with strided slices
+            for k in range(half):
+                w = ws[k]
+                lo, hi = a[k::length], a[k + half :: length]
+                hi = [h * w % p for h in hi]
+                a[k::length] = [(u + v) % p for u, v in zip(lo, hi)]
+                a[k + half :: length] = [(u - v) % p for u, v in zip(lo, hi)]
+        else:
+            # Few blocks: iterate over the blocks
+            for start in range(0, total, length):
+                mid, end = start + half, start + length
+                lo = a[start:mid]
+                hi = [h * w % p for h, w in zip(a[mid:end], ws)]
+                a[start:mid] = [(u + v) % p for u, v in zip(lo, hi)]
+                a[mid:end] = [(u - v) % p for u, v in zip(lo, hi)]
+        half = length
+
+
+def intt(a, omega, p):
+    """ Inverse of ntt: given the evaluations a of a polynomial at the powers of
+    omega, overwrites a with its coefficients and returns it.
+    """
+    n = len(a)
+    omega = int(omega) % p
+    ntt(a, pow(omega, p - 2, p), p)
+    n_inv = pow(n, p - 2, p)
+    a[:] = [v * n_inv % p for v in a]
+    return a
+
+
+def ntt_batch(polys, omega, p):
+    """ Applies ntt to every list in polys (all of the same length). The lists are
+    transformed together in a single buffer, so that each butterfly pass goes over
+    the whole batch at once instead of once per list.
+    """
+    if not polys:
+        return polys
+
+    n = len(polys[0])
+    assert n & (n - 1) == 0, "n must be a power of 2"
+    assert all(len(a) == n for a in polys), "lists must have the same length"
+    if n == 1:
+        return polys
+
+    omega = int(omega) % p
+    rev = list(range(n))
+    _bit_reverse(rev)
+    buf = [a[i] for a in polys for i in rev]
+    _butterflies(buf, n, _twiddles(omega, n, p), p)
+    for j, a in enumerate(polys):
+        a[:] = buf[j * n : (j + 1) * n]
+    return polys
+
+
+def intt_batch(polys, omega, p):
+    """ Applies intt to every list in polys (all of the same length), see
+    ntt_batch.
+    """
+    if not polys:
+        return polys
+
+    omega = int(omega) % p
+    ntt_batch(polys, pow(omega, p - 2, p), p)
+    n_inv = pow(len(polys[0]), p - 2, p)
+    for a in polys:
+        a[:] = [v * n_inv % p for v in a]
+    return polys
+
+
+# Crossover points (in number of coefficients) of the polynomial arithmetic over
+# ints below, picked with the benchmarks in benchmark/test_benchmark_polynomial.py.
+# Operands shorter than the Karatsuba threshold are multiplied with the
+# schoolbook method, and products with at least NTT threshold coefficients are
+# computed with NTTs when the field has roots of unity of the required order
+# (for BLS12-381, Karatsuba wins at 128x128 and NTTs at 256x256).
+# Quotients with at least the Newton threshold coefficients are computed with a
+# Newton iteration for the inverse of the divisor instead of long division.
+KARATSUBA_THRESHOLD = 32
+NTT_THRESHOLD = 384
+NEWTON_DIVISION_THRESHOLD = 256
+
+# Primitive 2^k'th roots of unity for each (modulus, 2^k), or None if the
+# field has none
+_root_of_unity_cache = {}
+
+
+def _root_of_unity(n, p):
+    key = (p, n)
+    if key not in _root_of_unity_cache:
+        omega = None
+        if (p - 1) % n == 0:
+            # Any non-square raised to (p-1)/n is a primitive n'th root of unity,
+            # search deterministically so every party finds the same one
+            for g in range(2, 1000):
+                if pow(g, (p - 1) // 2, p) == p - 1:
+                    omega = pow(g, (p - 1) // n, p)
+                    break
+        _root_of_unity_cache[key] = omega
+    return _root_of_unity_cache[key]
+
+
+def _mul_schoolbook(a, b, p):
+    result = [0] * (len(a) + len(b) - 1)
+    for i, x in enumerate(a):
+        if x:
+            for j, y in enumerate(b):
+                result[i + j] += x * y
+    return [v % p for v in result]
+
+
+def _mul_karatsuba(a, b, p):
+    if len(a) < len(b):
+        a, b = b, a
+    if len(b) < KARATSUBA_THRESHOLD:
+        return _mul_schoolbook(a, b, p)
+
+    # Split both operands at m: a = a0 + a1 x^m, b = b0 + b1 x^m
+    m = len(a) // 2
+    a0, a1 = a[:m], a[m:]
+    b0, b1 = b[:m], b[m:]
+    if not b1:
+        # b is much shorter than a, multiply by the two halves of a separately
+        low, high = _mul_karatsuba(a0, b, p), _mul_karatsuba(a1, b, p)
+        result = low + [0] * (len(a) + len(b) - 1 - len(low))
+        for i, v in enumerate(high):
+            result[m + i] = (result[m + i] + v) % p
+        return result
+
+    z0 = _mul_karatsuba(a0, b0, p)
+    z2 = _mul_karatsuba(a1, b1, p)
+    sum_a = [x + y for x, y in zip_longest(a0, a1, fillvalue=0)]
+    sum_b = [x + y for x, y in zip_longest(b0, b1, fillvalue=0)]
+    z1 = _mul_karatsuba(sum_a, sum_b, p)
+
+    result = [0] * (len(a) + len(b) - 1)
+    for i, v in enumerate(z0):
+        result[i] += v
+        z1[i] -= v
+    for i, v in enumerate(z2):
+        result[i + 2 * m] += v
+        z1[i] -= v
+    for i, v in enumerate(z1):
+        if i + m < len(result):
+            result[i + m] += v
+    return [v % p for v in result]
+
+
+def _mul_ntt(a, b, p):
+    """ Multiplies with NTTs, or returns None if the field doesn't have roots of
+    unity of the required order.
+    """
+    size = len(a) + len(b) - 1
+    n = 1 << (size - 1).bit_length()
+    omega = _root_of_unity(n, p)
+    if omega is None:
+        return None
+
+    fa = ntt(a + [0] * (n - len(a)), omega, p)
+    fb = ntt(b + [0] * (n - len(b)), omega, p)
+    return intt([x * y % p for x, y in zip(fa, fb)], omega, p)[:size]
+
+
+def poly_mul(a, b, p):
+    """ Multiplies the polynomials with coefficient lists a and b (lists of ints
+    modulo p), using the schoolbook method, Karatsuba or NTTs depending on the
+    length of the operands.
+    """
+    if not a or not b:
+        return []
+    if min(len(a), len(b)) < KARATSUBA_THRESHOLD:
+        return _mul_schoolbook(a, b, p)
+    if len(a) + len(b) - 1 >= NTT_THRESHOLD:
+        result = _mul_ntt(a, b, p)
+        if result is not None:
+            return result
+    return _mul_karatsuba(a, b, p)
+
+
+def _divmod_long(a, b, p):
+    quotient = [0] * (len(a) - len(b) + 1)
+    remainder = list(a)
+    lc_inv = pow(b[-1], p - 2, p)
+    for i in range(len(quotient) - 1, -1, -1):
+        q = remainder[i + len(b) - 1] * lc_inv % p
+        quotient[i] = q
+        if q:
+            for j, y in enumerate(b):
+                remainder[i + j] = (remainder[i + j] - q * y) % p
+    return quotient, remainder[: len(b) - 1]
+
+
+def _inverse_series(f, k, p):
+    """ Returns g such that f * g = 1 mod x^k, using Newton iteration
+    g' = g * (2 - f * g), which doubles the number of correct terms every step.
+    """
+    g = [pow(f[0], p - 2, p)]
+    precision = 1
+    while precision < k:
+        precision = min(2 * precision, k)
+        fg = poly_mul(f[:precision], g, p)[:precision]
+        correction = [(-v) % p for v in fg]
+        correction[0] = (correction[0] + 2) % p
+        g = poly_mul(g, correction, p)[:precision]
+    return g
+
+
+def _divmod_newton(a, b, p):
+    # With rev(f) the polynomial with reversed coefficients, the quotient is
+    # rev(rev(a) / rev(b) mod x^(deg a - deg b + 1))
+    k = len(a) - len(b) + 1
+    inverse = _inverse_series(b[::-1], k, p)
+    quotient = poly_mul(a[::-1][:k], inverse, p)[:k][::-1]
+    quotient += [0] * (k - len(quotient))
+
+    # The remainder only has deg b terms, so only those need to be computed
+    n = len(b) - 1
+    product = poly_mul(quotient, b, p)
+    remainder = [(x - y) % p for x, y in zip(a[:n], product[:n])]
+    return quotient, remainder
+
+
+def poly_divmod(a, b, p):
+    """ Divides the polynomial with coefficient list a by the one with coefficient
+    list b (lists of ints modulo p, without trailing zeros). Returns the lists of
+    coefficients of the quotient and of the remainder, both possibly with
+    trailing zeros.
+    """
+    if not b:
+        raise ZeroDivisionError
+    if len(a) < len(b):
+        return [], list(a)
+    if len(a) - len(b) + 1 >= NEWTON_DIVISION_THRESHOLD:
+        return _divmod_newton(a, b, p)
+    return _divmod_long(a, b, p)
+
+
+def _horner(coeffs, x, p):
+    y = 0
+    for c in reversed(coeffs):
+        y = (y * x + c) % p
+    return y
+
+
+class SubproductTree(object):
+    """ Subproduct tree over a fixed set of distinct points xs modulo p, for fast
+    multipoint evaluation and interpolation at arbitrary (non root of unity)
+    points.
+
+    Leaf i holds the polynomial (X - xs[i]), and every inner node the product of
+    its children, so the root is M(X) = prod(X - xs[i]). With fast polynomial
+    arithmetic both evaluation and interpolation cost O(n log^2 n), and the tree
+    (as well as the interpolation weights) only depends on the points, so it is
+    built once and reused for every polynomial of a batch.
+    """
+
+    # Nodes with at most this many points are evaluated directly with Horner's rule
+    LEAF_SIZE = 8
+
+    def __init__(self, xs, p):
+        self.xs = [x % p for x in xs]
+        self.p = p
+        self.n = len(xs)
+        assert self.n > 0
+        assert len(set(self.xs)) == self.n, "Points must be distinct"
+
+        # levels[0] holds the leaves and levels[-1] the root. A node without
+        # a sibling is carried over to the next level as is.
+        level = [[(p - x) % p, 1] for x in self.xs]
+        self.levels = [level]
+        while len(level) > 1:
+            level = [
+                poly_mul(level[i], level[i + 1], p) if i + 1 < len(level) else level[i]
+                for i in range(0, len(level), 2)
+            ]
+            self.levels.append(level)
+
+        self._weights = None
+        self._inverses = {}
+
+    @property
+    def root(self):
+        return self.levels[-1][0]
+
+    def _evaluate_node(self, coeffs, depth, index):
+        """ Evaluates coeffs, already reduced modulo the polynomial of the node, at
+        the points below that node.
+        """
+        size = 1 << depth
+        start = index * size
+        points = self.xs[start : start + size]
+        if len(points) <= SubproductTree.LEAF_SIZE:
+            return [_horner(coeffs, x, self.p) for x in points]
+
+        children = self.levels[depth - 1]
+        left = 2 * index
+        if left + 1 >= len(children):
+            # Node carried over from a single child
+            return self._evaluate_node(coeffs, depth - 1, left)
+
+        result = []
+        for child in (left, left + 1):
+            remainder = self._remainder(coeffs, depth - 1, child)
+            result += self._evaluate_node(remainder, depth - 1, child)
+        return result
+
+    def _remainder(self, coeffs, depth, index):
+        """ Reduces coeffs, which has at most twice as many coefficients as there
+        are points below the node, modulo the polynomial of the node.
+        """
+        m = self.levels[depth][index]
+        k = len(coeffs) - len(m) + 1
+        if k <= 0:
+            return coeffs
+        if k < NEWTON_DIVISION_THRESHOLD // 4:
+            return _divmod_long(coeffs, m, self.p)[1]
+
+        # Quotient from the cached inverse of the reversed node polynomial, as in
+        # _divmod_newton, then remainder = coeffs - quotient * m
+        key = (depth, index)
+        inverse = self._inverses.get(key)
+        if inverse is None or len(inverse) < k:
+            inverse = _inverse_series(m[::-1], max(k, len(m) - 1), self.p)
+            self._inverses[key] = inverse
+
+        p = self.p
+        quotient = poly_mul(coeffs[::-1][:k], inverse[:k], p)[:k][::-1]
+        product = poly_mul(quotient, m, p)
+        n = len(m) - 1
+        return [(x - y) % p for x, y in zip(coeffs[:n], product[:n])]
+
+    def evaluate(self, coeffs):
+        """ Returns the evaluations at every point of the polynomial with the given
+        coefficients (ints modulo p).
+        """
+        coeffs = strip_trailing_zeros([c % self.p for c in coeffs])
+        if len(coeffs) > self.n:
+            _, coeffs = poly_divmod(coeffs, self.root, self.p)
+        return self._evaluate_node(coeffs, len(self.levels) - 1, 0)
+
+    def evaluate_batch(self, polys):
+        return [self.evaluate(coeffs) for coeffs in polys]
+
+    @property
+    def weights(self):
+        """ The barycentric weights 1 / M'(x_i) of the points.
+        """
+        if self._weights is None:
+            p = self.p
+            derivative = [i * c % p for i, c in enumerate(self.root)][1:]
+            values = self.evaluate(derivative)
+            self._weights = [v.value for v in GF(p).batch_inverse(values)]
+        return self._weights
+
+    def _combine(self, values, depth, index):
+        """ Returns the sum over the points x_i below the node of
+        values[i] * prod(X - x_j), where x_j ranges over the other points below
+        the node.
+        """
+        if depth == 0:
+            return [values[index]]
+
+        children = self.levels[depth - 1]
+        left = 2 * index
+        if left + 1 >= len(children):
+            return self._combine(values, depth - 1, left)
+
+        f_left = self._combine(values, depth - 1, left)
+        f_right = self._combine(values, depth - 1, left + 1)
+        a = poly_mul(f_left, children[left + 1], self.p)
+        b = poly_mul(f_right, children[left], self.p)
+        return [(x + y) % self.p for x, y in zip_longest(a, b, fillvalue=0)]
+
+    def interpolate(self, ys):
+        """ Returns the n coefficients of the polynomial of degree < n taking the
+        values ys at the points.
+        """
+        assert len(ys) == self.n
+        p = self.p
+        values = [y * w % p for y, w in zip(ys, self.weights)]
+        coeffs = self._combine(values, len(self.levels) - 1, 0)
+        return coeffs + [0] * (self.n - len(coeffs))
+
+    def interpolate_batch(self, ys_list):
+        return [self.interpolate(ys) for ys in ys_list]
+
+
+# Subproduct trees for the most recently used point sets
+_subproduct_tree_cache = OrderedDict()
+SUBPRODUCT_TREE_CACHE_SIZE = 64
+
+
+def get_subproduct_tree(xs, p):
+    """ Returns the (cached) SubproductTree for the points xs modulo p.
+    """
+    key = (tuple(xs), p)
+    tree = _subproduct_tree_cache.get(key)
+    if tree is None:
+        tree = SubproductTree(xs, p)
+        _subproduct_tree_cache[key] = tree
+        if len(_subproduct_tree_cache) > SUBPRODUCT_TREE_CACHE_SIZE:
+            _subproduct_tree_cache.popitem(last=False)
+    else:
+        _subproduct_tree_cache.move_to_end(key)
+    return tree
+
+
+class NewtonInterpolator(object):
+    """ Incrementally interpolates a batch of polynomials modulo p which are all
+    evaluated at the same points, one point at a time.
+
+    The polynomials are kept in Newton form, f(X) = sum c_i N_i(X) with
+    N_i(X) = prod_{j < i} (X - xs[j]), so adding a point only appends one
+    coefficient per polynomial: O(k) work each, plus a single inversion shared by
+    the whole batch. Evaluating at a new point (e.g. to check a share against the
+    interpolated polynomials) costs O(k) per polynomial as well, as the basis
+    values N_i(x) are computed once for the batch. Only converting to the usual
+    monomial coefficients costs O(k^2) per polynomial.
+    """
+
+    def __init__(self, p, batch_size):
+        self.p = p
+        self.xs = []
+        self.newton_coeffs = [[] for _ in range(batch_size)]
+
+    def __len__(self):
+        return len(self.xs)
+
+    def _basis(self, x):
+        """ Returns [N_0(x), ..., N_k(x)], where k is the number of points """
+        p = self.p
+        basis = [1]
+        acc = 1
+        for xj in self.xs:
+            acc = acc * (x - xj) % p
+            basis.append(acc)
+        return basis
+
+    def add(self, x, ys):
+        """ Adds the point x, where the ith polynomial takes the value ys[i].
+        Raises a ValueError if x was already added.
+        """
+        p = self.p
+        basis = self._basis(x)
+        if basis[-1] == 0:
+            raise ValueError(f"Point {x} was already added")
+
+        inverse = GF(p).inverse(basis[-1])
+        basis.pop()
+        for coeffs, y in zip(self.newton_coeffs, ys):
+            value = sum(c * b for c, b in zip(coeffs, basis))
+            coeffs.append((y - value) * inverse % p)
+        self.xs.append(x)
+
+    def evaluate(self, x):
+        """ Evaluates every polynomial of the batch at x """
+        p = self.p
+        basis = self._basis(x)
+        return [
+            sum(c * b for c, b in zip(coeffs, basis)) % p
+            for coeffs in self.newton_coeffs
+        ]
+
+    def coefficients(self):
+        """ Returns the monomial coefficients (lowest degree first) of every
+        polynomial of the batch, each padded to the number of points.
+        """
+        p = self.p
+        k = len(self.xs)
+
+        # Monomial coefficients of the basis polynomials, shared by the batch
+        basis = [[1]]
+        for xj in self.xs[:-1]:
+            prev = basis[-1]
+            current = [0] * (len(prev) + 1)
+            for i, c in enumerate(prev):
+                current[i] = (current[i] - c * xj) % p
+                current[i + 1] = c
+            basis.append(current)
+
+        result = []
+        for coeffs in self.newton_coeffs:
+            result.append(
+                [
+                    sum(coeffs[i] * basis[i][j] for i in range(j, k)) % p
+                    for j in range(k)
+                ]
+            )
+        return result
+
+
 def fft_helper(a, omega, field):
     """
     Given coefficients A of polynomial this method does FFT and returns
@@ -279,17 +948,9 @@ def fft_helper(a, omega, field):
     n = len(a)
     assert not (n & (n - 1)), "n must be a power of 2"
 
-    if n == 1:
-        return a
-
-    b, c = a[0::2], a[1::2]
-    b_bar = fft_helper(b, pow(omega, 2), field)
-    c_bar = fft_helper(c, pow(omega, 2), field)
-    a_bar = [field(1)] * (n)
-    for j in range(n):
-        k = j % (n // 2)
-        a_bar[j] = b_bar[k] + pow(omega, j) * c_bar[k]
-    return a_bar
+    p = field.modulus
+    values = ntt([int(v) % p for v in a], omega, p)
+    return [field(v) for v in values]
 
 
 def fft(poly, omega, n):
@@ -298,7 +959,10 @@ def fft(poly, omega, n):
     assert pow(omega, n) == 1
     assert pow(omega, n // 2) != 1
 
-    padded_coeffs = poly.coeffs + ([poly.field(0)] * (n - len(poly.coeffs)))
+    coeffs = poly.coeffs
+    if isinstance(coeffs, GFArray):
+        coeffs = coeffs.values
+    padded_coeffs = list(coeffs) + [0] * (n - len(coeffs))
     return fft_helper(padded_coeffs, omega, poly.field)
 
 
@@ -308,7 +972,7 @@ def fnt_decode_step1(poly, zs, omega2, n):
     It depends only on the x values (the points the polynomial is
     evaluated at, i.e. the IDs of the parties contributing shares) so
     it can be reused for multiple batches.
-    Complexity: O(n^2)
+    Complexity: O(k^2) to build A(X), O(n log n) for the evaluations
 
     args:
         zs is a subset of [0,n)
@@ -323,25 +987,30 @@ def fnt_decode_step1(poly, zs, omega2, n):
         where A(X) = prod( X - xj ) for each xj
         Ai(xi) = prod( xi - xj ) for j != i
     """
-    k = len(zs)
-    omega = omega2 ** 2
-    xs = [omega ** z for z in zs]
+    field = poly([1]).field
+    p = field.modulus
+    omega2 = int(omega2)
+    omega = omega2 * omega2 % p
+    xs = [pow(omega, z, p) for z in zs]
 
     # Compute A(X)
-    a_ = poly([1])
-    for i in range(k):
-        a_ *= poly([-xs[i], 1])
-    as_ = [a_(omega2 ** i) for i in range(2 * n)]
+    a_ = [1]
+    for x in xs:
+        shifted = [0] + a_
+        for i, c in enumerate(a_):
+            shifted[i] = (shifted[i] - x * c) % p
+        a_ = shifted
 
-    # Compute all Ai(Xi)
-    ais_ = []
-    for i in range(k):
-        ai = a_.field(1)
-        for j in range(k):
-            if i != j:
-                ai *= xs[i] - xs[j]
-        ais_.append(ai)
-    return as_, ais_
+    # Evaluate A(X) at all powers of omega2
+    as_ = ntt(a_ + [0] * (2 * n - len(a_)), omega2, p)
+
+    # Ai(xi) = A'(xi), so evaluate the derivative of A at all powers of omega and
+    # pick the values at the xi
+    da = [i * c % p for i, c in enumerate(a_)][1:]
+    das = ntt(da + [0] * (n - len(da)), omega, p)
+    ais_ = [das[z] for z in zs]
+
+    return [field(v) for v in as_], [field(v) for v in ais_]
 
 
 def fnt_decode_step2(poly, zs, ys, as_, ais_, omega2, n):
@@ -361,25 +1030,26 @@ def fnt_decode_step2(poly, zs, ys, as_, ais_, omega2, n):
     k = len(ys)
     assert len(ys) == len(ais_)
     assert len(as_) == 2 * n
-    omega = omega2 ** 2
+    field = poly([1]).field
+    p = field.modulus
+    omega2 = int(omega2)
+    omega = omega2 * omega2 % p
 
     # Compute N'(x)
-    nis = [ys[i] / ais_[i] for i in range(k)]
-    ncoeffs = [0 for _ in range(n)]
+    ais_inv = field.batch_inverse(ais_)
+    ncoeffs = [0] * n
     for i in range(k):
-        ncoeffs[zs[i]] = nis[i]
-    n_ = poly(ncoeffs)
+        ncoeffs[zs[i]] = int(ys[i]) * ais_inv[i].value % p
 
     # Compute P/A(X)
-    nevals = n_.evaluate_fft(omega, n)
-    power_a = -poly(nevals[::-1])
-    pas = power_a.evaluate_fft(omega2, 2 * n)
+    nevals = ntt(ncoeffs, omega, p)
+    power_a = [(p - v) % p for v in reversed(nevals)] + [0] * n
+    pas = ntt(power_a, omega2, p)
 
     # Recover P(X)
-    ps = [p * a for (p, a) in zip(pas, as_)]
-    prec = poly.interpolate_fft(ps, omega2)
-    prec.coeffs = prec.coeffs[:k]
-    return prec
+    ps = [pa * int(a) % p for (pa, a) in zip(pas, as_)]
+    prec = intt(ps, omega2, p)
+    return poly(prec[:k])
 
 
 class EvalPoint(object):
@@ -415,7 +1085,7 @@ class EvalPoint(object):
 
     def __call__(self, i):
         if self.use_omega_powers:
-            return self.field(self.omega2.value ** (2 * i))
+            return self.field(pow(self.omega2.value, 2 * i, self.field.modulus))
         else:
             return self.field(i + 1)
 
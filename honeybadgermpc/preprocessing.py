@@ -5,7 +5,7 @@ import re
 from abc import ABC, abstractmethod
 from collections import defaultdict
 from enum import Enum
-from itertools import chain
+from itertools import chain, islice
 from os import listdir, makedirs
 from os.path import isfile, join
 from random import randint
@@ -13,8 +13,9 @@ from shutil import rmtree
 from uuid import uuid4
 
 from .elliptic_curve import Subgroup
-from .field import GF
+from .field import GF, GFArray
 from .ntl import vandermonde_batch_evaluate
+from .packed_sharing import random_packed_polynomial
 from .polynomial import polynomials_over
 
 
@@ -31,6 +32,9 @@ class PreProcessingConstants(Enum):
     ONE_MINUS_ONES = "one_minus_ones"
     DOUBLE_SHARES = "double_shares"
     SHARE_BITS = "share_bits"
+    PACKED_RANDS = "packed_rands"
+    PACKED_TRIPLES = "packed_triples"
+    PACKED_DOUBLE_SHARES = "packed_double_shares"
 
     def __str__(self):
         return self.value
@@ -103,6 +107,29 @@ class PreProcessingMixin(ABC):
 
         return to_return
 
+    def get_array(self, context, k):
+        """ Given an MPC context, retrieve k preprocessing values at once as a
+        packed array of raw share values, without building a Share per element.
+
+        args:
+            context: MPC context to use when fetching the values
+            k: number of preprocessing values to fetch
+
+        outputs:
+            GFArray of length k * _preprocessing_stride holding the share values
+        """
+        key = (context.myid, context.N, context.t)
+        count = k * self._preprocessing_stride
+        assert self.count[key] >= count, (
+            f"Expected {count} elements of {self.preprocessing_name}, "
+            f"but found only {self.count[key]}"
+        )
+
+        values = GFArray(list(islice(self.cache[key], count)), self.field, True)
+        self.count[key] -= count
+
+        return values
+
     def _read_preprocessing_file(self, file_name):
         """ Given the filename of the preprocessing file to read, fetch all of the
         values stored in the preprocessing file.
@@ -119,8 +146,9 @@ class PreProcessingMixin(ABC):
             )
 
             # The second and third lines of the file contain the degree and context id
-            # correspondingly.
-            return values[3:]
+            # correspondingly. Values are kept as reduced ints, so that they can be
+            # handed out packed in a GFArray as they are.
+            return [v % modulus for v in values[3:]]
 
     def _write_preprocessing_file(
         self, file_name, degree, context_id, values, append=False
@@ -220,7 +248,7 @@ class PreProcessingMixin(ABC):
             append: Whether or not to append shares to an existing file, or
                 to overwrite.
         """
-        polys = [[coeff.value for coeff in poly.coeffs] for poly in polys]
+        polys = [poly.coeffs.values for poly in polys]
         all_values = vandermonde_batch_evaluate(
             list(range(1, n + 1)), polys, self.field.modulus
         )
@@ -495,6 +523,92 @@ class SignedBitPreProcessing(SimplePreProcessing):
         return [self.poly.random(t, randint(0, 1) * 2 - 1) for _ in range(k)]
 
 
+class PackedPreProcessing(PreProcessingMixin):
+    """ Base class of preprocessing for packed secret sharing, where every share value
+    holds ell secrets in a polynomial of degree t + ell - 1 (see
+    honeybadgermpc.packed_sharing). Preprocessing for each ell is kept in its own files.
+
+    Subclasses must define packed_name, _preprocessing_stride, _generate_secrets,
+    which returns the _preprocessing_stride vectors of ell secrets of one element, and
+    may override _degrees.
+    """
+
+    def __init__(self, field, poly, data_dir, ell):
+        self.ell = ell
+        super().__init__(field, poly, data_dir)
+
+    @property
+    def preprocessing_name(self):
+        return f"{self.packed_name}_{self.ell}"
+
+    def _degrees(self, t):
+        """ Degrees of the _preprocessing_stride share values of one element
+        """
+        return [t + self.ell - 1] * self._preprocessing_stride
+
+    def _generate_polys(self, k, n, t):
+        polys = []
+        for _ in range(k):
+            for secrets, degree in zip(self._generate_secrets(), self._degrees(t)):
+                polys.append(random_packed_polynomial(self.field, secrets, degree))
+
+        return polys
+
+    def _to_arrays(self, context, values):
+        """ Splits interleaved share values into one PackedShareArray per
+        stride position.
+        """
+        stride = self._preprocessing_stride
+        return tuple(
+            context.PackedShareArray(values[i::stride], self.ell, degree)
+            for i, degree in enumerate(self._degrees(context.t))
+        )
+
+    def get_arrays(self, context, k):
+        """ Retrieves k elements as _preprocessing_stride PackedShareArrays of length k
+        """
+        return self._to_arrays(context, self.get_array(context, k))
+
+    def _get_value(self, context, key):
+        assert self.count[key] >= self._preprocessing_stride
+        values = [next(self.cache[key]) for _ in range(self._preprocessing_stride)]
+        return self._to_arrays(context, values), self._preprocessing_stride
+
+
+class PackedRandomPreProcessing(PackedPreProcessing):
+    packed_name = PreProcessingConstants.PACKED_RANDS.value
+    _preprocessing_stride = 1
+
+    def _generate_secrets(self):
+        return [[self.field.random() for _ in range(self.ell)]]
+
+
+class PackedTriplePreProcessing(PackedPreProcessing):
+    packed_name = PreProcessingConstants.PACKED_TRIPLES.value
+    _preprocessing_stride = 3
+
+    def _generate_secrets(self):
+        a = [self.field.random() for _ in range(self.ell)]
+        b = [self.field.random() for _ in range(self.ell)]
+        return [a, b, [x * y for x, y in zip(a, b)]]
+
+
+class PackedDoubleSharingPreProcessing(PackedPreProcessing):
+    """ Random packed values shared both with degree t + ell - 1 and with degree
+    t + 2(ell - 1), the degree of the product of two packed shares.
+    """
+
+    packed_name = PreProcessingConstants.PACKED_DOUBLE_SHARES.value
+    _preprocessing_stride = 2
+
+    def _degrees(self, t):
+        return [t + self.ell - 1, t + 2 * (self.ell - 1)]
+
+    def _generate_secrets(self):
+        r = [self.field.random() for _ in range(self.ell)]
+        return [r, r]
+
+
 class PreProcessedElements:
     """ Main accessor of preprocessing
     This class is a singleton, that only has one object per field being
@@ -559,6 +673,9 @@ class PreProcessedElements:
             self.field, self.poly, self.data_directory
         )
 
+        # Packed preprocessing mixins, created on demand for each ell
+        self._packed = {}
+
     @classmethod
     def reset_cache(cls):
         """ Reset the class-wide cache of PreProcessedElements objects
@@ -636,6 +753,28 @@ class PreProcessedElements:
     def generate_share(self, n, t, *args, **kwargs):
         return self._generate(self._shares, 1, n, t, *args, **kwargs)
 
+    def _packed_mixin(self, cls, ell):
+        if (cls, ell) not in self._packed:
+            self._packed[cls, ell] = cls(
+                self.field, self.poly, self.data_directory, ell
+            )
+        return self._packed[cls, ell]
+
+    def generate_packed_rands(self, k, n, t, ell):
+        return self._generate(
+            self._packed_mixin(PackedRandomPreProcessing, ell), k, n, t
+        )
+
+    def generate_packed_triples(self, k, n, t, ell):
+        return self._generate(
+            self._packed_mixin(PackedTriplePreProcessing, ell), k, n, t
+        )
+
+    def generate_packed_double_shares(self, k, n, t, ell):
+        return self._generate(
+            self._packed_mixin(PackedDoubleSharingPreProcessing, ell), k, n, t
+        )
+
     ## Preprocessing retrieval methods:
 
     def get_triples(self, context):
@@ -650,6 +789,12 @@ class PreProcessedElements:
     def get_rand(self, context, t=None):
         return self._rands.get_value(context, t)
 
+    def get_rands(self, context, k, t=None):
+        return context.ShareArray(self._rands.get_array(context, k), t)
+
+    def get_zeros(self, context, k):
+        return context.ShareArray(self._zeros.get_array(context, k))
+
     def get_bit(self, context):
         return self._bits.get_value(context)
 
@@ -667,3 +812,17 @@ class PreProcessedElements:
 
     def get_share_bits(self, context):
         return self._share_bits.get_value(context)
+
+    def get_packed_rands(self, context, k, ell):
+        (rands,) = self._packed_mixin(PackedRandomPreProcessing, ell).get_arrays(
+            context, k
+        )
+        return rands
+
+    def get_packed_triples(self, context, k, ell):
+        return self._packed_mixin(PackedTriplePreProcessing, ell).get_arrays(context, k)
+
+    def get_packed_double_shares(self, context, k, ell):
+        return self._packed_mixin(PackedDoubleSharingPreProcessing, ell).get_arrays(
+            context, k
+        )
@@ -11,3 +11,5 @@ class MixinConstants(object):
     InvertShareArray = "invert_share_array"
     DivideShareArray = "divide_share_array"
     ShareEqualityArray = "share_equality_array"
+
+    MultiplyPackedShareArray = "multiply_packed_share_array"
@@ -4,7 +4,8 @@ import asyncio
 from abc import ABC, abstractmethod
 from typing import Callable
 
-from honeybadgermpc.field import GFElement
+from honeybadgermpc.field import GFArray, GFElement
+from honeybadgermpc.packed_sharing import public_shares
 from honeybadgermpc.progs.mixins.constants import MixinConstants
 from honeybadgermpc.utils.typecheck import TypeCheck
 
@@ -182,9 +183,18 @@ class ShareArray(ABC):
         return NotImplementedError
 
     def __init__(self, values, t=None):
-        # Initialized with a list of share objects
+        # Initialized with a list of share objects, or a GFArray (or list) of share
+        # values. Share values are kept packed, and Shares are only built on demand.
         self.t = self.context.t if t is None else t
+        self._values, self._share_list = None, None
+        if isinstance(values, GFArray):
+            self._values = values
+            return
+
         values = list(values)
+        if all(type(value) in (int, GFElement) for value in values):
+            self._values = GFArray(values, self.context.field)
+            return
 
         for i, value in enumerate(values):
             if isinstance(value, (int, GFElement)):
@@ -192,37 +202,86 @@ class ShareArray(ABC):
 
             assert isinstance(values[i], Share)
 
-        self._shares = values
+        self._share_list = values
+
+    @property
+    def _shares(self):
+        """ List of the shares of this array, built on first access when the array
+        only holds packed share values.
+        """
+        if self._share_list is None:
+            share, t = self.context.Share, self.t
+            self._share_list = [share(v, t) for v in self._values]
+        return self._share_list
 
     def open(self):
         # TODO: make a list of GFElementFutures?
         return self.context.open_share_array(self)
 
     def __len__(self):
-        return len(self._shares)
+        if self._values is not None:
+            return len(self._values)
+        return len(self._share_list)
 
-    @TypeCheck(arithmetic=True)
-    def __add__(self, other: (ShareArray, list)):
-        if isinstance(other, list):
-            other = self.context.ShareArray(other, self.t)
+    def __getitem__(self, key):
+        if self._share_list is not None:
+            shares = self._share_list[key]
+            if isinstance(key, slice):
+                return self.context.ShareArray(shares, self.t)
+            return shares
 
-        assert self.t == other.t
-        assert len(self) == len(other)
+        if isinstance(key, slice):
+            return self.context.ShareArray(self._values[key], self.t)
+        return self.context.Share(self._values[key], self.t)
 
-        result = [a + b for (a, b) in zip(self._shares, other._shares)]
-        return self.context.ShareArray(result, self.t)
+    def __iter__(self):
+        if self._share_list is not None:
+            return iter(self._share_list)
 
-    @TypeCheck(arithmetic=True)
-    def __sub__(self, other: (ShareArray, list)):
-        if isinstance(other, list):
+        share, t = self.context.Share, self.t
+        return (share(v, t) for v in self._values)
+
+    @property
+    def values(self):
+        """ Share values of this array packed in a GFArray, or None if some of the
+        shares have not been resolved yet (i.e. hold a GFElementFuture).
+        """
+        if self._values is None:
+            values = []
+            for share in self._share_list:
+                if type(share.v) is not GFElement:
+                    return None
+                values.append(share.v.value)
+
+            self._values = GFArray(values, self.context.field, reduced=True)
+
+        return self._values
+
+    def _linear_op(self, other, op):
+        """ Applies a linear element-wise op, using a single packed GFArray
+        operation when all of the share values are known.
+        """
+        if isinstance(other, (list, GFArray)):
             other = self.context.ShareArray(other, self.t)
 
         assert self.t == other.t
         assert len(self) == len(other)
 
-        result = [a - b for (a, b) in zip(self._shares, other._shares)]
+        a, b = self.values, other.values
+        if a is not None and b is not None:
+            return self.context.ShareArray(op(a, b), self.t)
+
+        result = [op(x, y) for (x, y) in zip(self._shares, other._shares)]
         return self.context.ShareArray(result, self.t)
 
+    @TypeCheck(arithmetic=True)
+    def __add__(self, other: (ShareArray, list, GFArray)):
+        return self._linear_op(other, lambda a, b: a + b)
+
+    @TypeCheck(arithmetic=True)
+    def __sub__(self, other: (ShareArray, list, GFArray)):
+        return self._linear_op(other, lambda a, b: a - b)
+
     @TypeCheck(arithmetic=True)
     def __mul__(self, other: ShareArray):
         return self.context.call_mixin(MixinConstants.MultiplyShareArray, self, other)
@@ -282,12 +341,80 @@ class ShareArray(ABC):
         """ Compute the product sum of values in this array such that this takes log(n)
         rounds
         """
-        if len(self._shares) == 0:
+        if len(self) == 0:
             return self.context.Share(1)
 
         return await self._tree_fold(ShareArray.__mul__)
 
 
+class PackedShareArray(ABC):
+    """ Array of packed secret shares, each of which holds ell secrets in a polynomial
+    of degree t, which is context.t + ell - 1 by default (see
+    honeybadgermpc.packed_sharing).
+    Operations act element-wise on all len(self) * ell secrets at once.
+
+    Public operands are lists (or GFArrays) of len(self) * ell values.
+    """
+
+    @property
+    @classmethod
+    @abstractmethod
+    def context(cls):
+        return NotImplementedError
+
+    def __init__(self, values, ell, t=None):
+        # Initialized with a GFArray or list of share values
+        self.ell = ell
+        self.t = self.context.t + ell - 1 if t is None else t
+        if not isinstance(values, GFArray):
+            values = GFArray(values, self.context.field)
+        self.values = values
+
+    def open(self):
+        return self.context.open_packed_share_array(self)
+
+    def __len__(self):
+        return len(self.values)
+
+    def _public(self, values):
+        """ Share values of degree ell - 1 holding the given public values
+        """
+        assert len(values) == len(self) * self.ell
+        context = self.context
+        shares = public_shares(context.field, values, self.ell, context.myid + 1)
+        return GFArray(shares, context.field, reduced=True)
+
+    def _linear_op(self, other, op):
+        if isinstance(other, PackedShareArray):
+            assert self.ell == other.ell
+            assert len(self) == len(other)
+            t, other = max(self.t, other.t), other.values
+        else:
+            t, other = self.t, self._public(other)
+
+        return self.context.PackedShareArray(op(self.values, other), self.ell, t)
+
+    @TypeCheck(arithmetic=True)
+    def __add__(self, other: (PackedShareArray, list, GFArray)):
+        return self._linear_op(other, lambda a, b: a + b)
+
+    @TypeCheck(arithmetic=True)
+    def __sub__(self, other: (PackedShareArray, list, GFArray)):
+        return self._linear_op(other, lambda a, b: a - b)
+
+    @TypeCheck(arithmetic=True)
+    def __mul__(self, other: (PackedShareArray, list, GFArray)):
+        if isinstance(other, PackedShareArray):
+            return self.context.call_mixin(
+                MixinConstants.MultiplyPackedShareArray, self, other
+            )
+
+        # Multiplying by public values raises the degree by ell - 1
+        return self.context.PackedShareArray(
+            self.values * self._public(other), self.ell, self.t + self.ell - 1
+        )
+
+
 class ShareFuture(ABC, asyncio.Future):
     @property
     @classmethod
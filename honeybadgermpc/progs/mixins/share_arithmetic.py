@@ -1,8 +1,9 @@
 from asyncio import gather
 
+from honeybadgermpc.field import GFArray
 from honeybadgermpc.progs.mixins.base import AsyncMixin
 from honeybadgermpc.progs.mixins.constants import MixinConstants
-from honeybadgermpc.progs.mixins.dataflow import Share, ShareArray
+from honeybadgermpc.progs.mixins.dataflow import PackedShareArray, Share, ShareArray
 from honeybadgermpc.utils.typecheck import TypeCheck
 
 
@@ -45,6 +46,33 @@ class BeaverMultiplyArrays(AsyncMixin):
         return context.ShareArray(xy)
 
 
+class PackedBeaverMultiply(AsyncMixin):
+    """ Beaver multiplication of packed share arrays with packed triples. The product
+    of the opened differences with the triple shares has degree t + 2(ell - 1), which is
+    reduced back to t + ell - 1 with a packed double sharing. Opening the product before
+    the reduction requires n >= 3t + 2l - 1.
+    """
+
+    from honeybadgermpc.mpc import Mpc
+
+    name = MixinConstants.MultiplyPackedShareArray
+
+    @staticmethod
+    @TypeCheck()
+    async def _prog(context: Mpc, x: PackedShareArray, y: PackedShareArray):
+        assert x.ell == y.ell and len(x) == len(y)
+        assert x.t == y.t == context.t + x.ell - 1
+
+        a, b, ab = context.preproc.get_packed_triples(context, len(x), x.ell)
+        d, e = await gather(*[(x - a).open(), (y - b).open()])
+        de = [p * q for (p, q) in zip(d, e)]
+        xy = ab + a * e + b * d + de
+
+        r, r_2 = context.preproc.get_packed_double_shares(context, len(x), x.ell)
+        diff = await (xy - r_2).open()
+        return r + list(diff)
+
+
 class DoubleSharingMultiply(AsyncMixin):
     from honeybadgermpc.mpc import Mpc
 
@@ -94,9 +122,13 @@ class DoubleSharingMultiplyArrays(AsyncMixin):
     async def _prog(context: Mpc, x: ShareArray, y: ShareArray):
         assert len(x) == len(y)
 
-        xy_2t = context.ShareArray(
-            [j.v * k.v for j, k in zip(x._shares, y._shares)], context.t * 2
-        )
+        xs, ys = x.values, y.values
+        if xs is not None and ys is not None:
+            xy = xs * ys
+        else:
+            xy = [j.v * k.v for j, k in zip(x._shares, y._shares)]
+
+        xy_2t = context.ShareArray(xy, context.t * 2)
         xy_t = await DoubleSharingMultiplyArrays.reduce_degree_share_array(
             context, xy_2t
         )
@@ -125,12 +157,10 @@ class InvertShareArray(AsyncMixin):
     @staticmethod
     @TypeCheck()
     async def _prog(context: Mpc, xs: ShareArray):
-        rs = context.ShareArray(
-            [context.preproc.get_rand(context) for _ in range(len(xs))]
-        )
+        rs = context.preproc.get_rands(context, len(xs))
 
         sigs = await (await (xs * rs)).open()
-        sig_invs = context.ShareArray([1 / sig for sig in sigs])
+        sig_invs = context.ShareArray(~GFArray(sigs, context.field))
 
         return await (rs * sig_invs)
 
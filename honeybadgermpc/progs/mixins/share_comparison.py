@@ -7,7 +7,8 @@ from honeybadgermpc.utils.typecheck import TypeCheck
 
 
 class Equality(AsyncMixin):
-    from honeybadgermpc.mpc import Mpc, GFElement
+    from honeybadgermpc.field import GFElement
+    from honeybadgermpc.mpc import Mpc
 
     name = MixinConstants.ShareEquality
 
@@ -1,5 +1,12 @@
+import asyncio
+import json
 import logging
+import math
+import os
+import time
 from abc import ABC, abstractmethod
+from collections import namedtuple
+from pathlib import Path
 
 import psutil
 
@@ -15,6 +22,11 @@ from honeybadgermpc.ntl import (
     vandermonde_batch_evaluate,
     vandermonde_batch_interpolate,
 )
+from honeybadgermpc.polynomial import (
+    EvalPoint,
+    NewtonInterpolator,
+    get_subproduct_tree,
+)
 from honeybadgermpc.reed_solomon_wb import make_wb_encoder_decoder
 
 
@@ -28,6 +40,15 @@ class Encoder(ABC):
             return self.encode_batch(data)
         return self.encode_one(data)
 
+    async def encode_async(self, data, executor=None):
+        """
+        Same as encode, but runs on executor (the event loop's default executor
+        if None) so that encoding a large batch does not block the event loop.
+        The NTL encoders release the GIL while they compute.
+        """
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(executor, self.encode, data)
+
     @abstractmethod
     def encode_one(self, data):
         """
@@ -55,6 +76,13 @@ class Decoder(ABC):
             return self.decode_batch(z, encoded)
         return self.decode_one(z, encoded)
 
+    async def decode_async(self, z, encoded, executor=None):
+        """
+        Same as decode, but runs on executor. See Encoder.encode_async
+        """
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(executor, self.decode, z, encoded)
+
     @abstractmethod
     def decode_one(self, z, encoded):
         """
@@ -84,6 +112,72 @@ class RobustDecoder(ABC):
         """
         raise NotImplementedError
 
+    def robust_decode_batch(self, z, encoded):
+        """
+        Robustly decodes a batch of codewords received from the same parties.
+
+        A faulty party usually corrupts all of its shares, so rather than running
+        the robust decoder on every codeword, the parties it blames on one codeword
+        are erased from all of them, and the following codewords are decoded with
+        the cheap (non-robust) decoder from d + 1 of the remaining points. Each
+        guess is checked against all remaining points, and the first codeword
+        which disagrees goes through the robust decoder again.
+
+        Subclasses must set `self.d` (degree) and `self.point`.
+
+        :type z: list of integers
+        :type encoded: list of lists of integers, encoded[i][j] is the evaluation
+            of the ith polynomial at z[j]
+        :return: Decoded values for the longest prefix of the batch which could be
+            decoded, and the union of the error locations found. Every point of z
+            outside of the error locations agrees with all of the decoded values.
+        """
+        k = self.d + 1
+        z = list(z)
+        pending = [list(row) for row in encoded]
+        decoded, errors = [], set()
+
+        encoder = VandermondeEncoder(self.point)
+        decoder = VandermondeDecoder(self.point)
+
+        while pending:
+            coeffs, found = self.robust_decode(z, pending[0])
+            if coeffs is None:
+                break
+
+            decoded.append(coeffs)
+            pending = pending[1:]
+
+            # Erase the parties found to be faulty from the remaining codewords
+            if found:
+                errors |= set(found)
+                keep = [i for i, zi in enumerate(z) if zi not in errors]
+                z = [z[i] for i in keep]
+                pending = [[row[i] for i in keep] for row in pending]
+
+            if not pending or len(z) < k:
+                continue
+
+            guesses = decoder.decode_batch(z[:k], [row[:k] for row in pending])
+            evaluations = encoder.encode_batch(guesses)
+
+            num_agreed = 0
+            for guess, evals, row in zip(guesses, evaluations, pending):
+                if any(evals[zi] != yi for zi, yi in zip(z, row)):
+                    break
+                decoded.append(guess)
+                num_agreed += 1
+            pending = pending[num_agreed:]
+
+        return decoded, sorted(errors)
+
+    async def robust_decode_async(self, z, encoded, executor=None):
+        """
+        Same as robust_decode, but runs on executor. See Encoder.encode_async
+        """
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(executor, self.robust_decode, z, encoded)
+
 
 class VandermondeEncoder(Encoder):
     def __init__(self, point):
@@ -148,6 +242,46 @@ class FFTDecoder(Decoder):
         return fft_batch_interpolate(z, encoded, self.omega, self.modulus, self.order)
 
 
+class SubproductTreeEncoder(Encoder):
+    """Evaluates at arbitrary points in O(n log^2 n) per polynomial using a
+    subproduct tree, which is built once for the evaluation points.
+    """
+
+    def __init__(self, point):
+        self.n = point.n
+        self.modulus = point.field.modulus
+        self.tree = get_subproduct_tree(
+            [point(i).value for i in range(self.n)], self.modulus
+        )
+
+    def encode_one(self, data):
+        return self.tree.evaluate(data)
+
+    def encode_batch(self, data):
+        return self.tree.evaluate_batch(data)
+
+
+class SubproductTreeDecoder(Decoder):
+    """Interpolates at arbitrary points in O(n log^2 n) per polynomial using a
+    subproduct tree. Trees are cached per set of points, so batches decoded from
+    the same set of parties reuse them.
+    """
+
+    def __init__(self, point):
+        self.n = point.n
+        self.modulus = point.field.modulus
+        self.point = point
+
+    def _tree(self, z):
+        return get_subproduct_tree([self.point(zi).value for zi in z], self.modulus)
+
+    def decode_one(self, z, encoded):
+        return self._tree(z).interpolate(encoded)
+
+    def decode_batch(self, z, encoded):
+        return self._tree(z).interpolate_batch(encoded)
+
+
 class GaoRobustDecoder(RobustDecoder):
     def __init__(self, d, point):
         self.d = d
@@ -235,12 +369,13 @@ class IncrementalDecoder(object):
     case where no error is present extremely fast.
 
     1) Validate that the data is indeed correct.
-    2) If at least d + 1 points are available (where d is the degree of the polynomial
-    we wish to reconstruct), then we can use a non-robust decoder
-       (which is usually faster) to decode available data and arrive at our first guess
-    3) As we get more data, validate it against the previous guess, if we find an
-    error now, then our guess is probably wrong. We then use robust decoding to arrive
-    at new guesses.
+    2) Interpolate the first d + 1 points (where d is the degree of the polynomial
+    we wish to reconstruct) incrementally as they arrive, in Newton form, which costs
+    O(d) per polynomial and point. This is our first guess.
+    3) As we get more data, check it against the guess (again O(d) per polynomial,
+    without decoding anything). If we find an error now, then our guess is probably
+    wrong. We then use robust decoding to arrive at new guesses, and check further
+    data against those in the same way, only decoding again if a check fails.
     4) We are done after at least (d + 1) + max_errors - confirmed_errors parties
     agree on every polynomial in the batch
     """
@@ -255,10 +390,13 @@ class IncrementalDecoder(object):
         max_errors,
         confirmed_errors=None,
         validator=None,
+        point=None,
     ):
         self.encoder = encoder
         self.decoder = decoder
         self.robust_decoder = robust_decoder
+        self.point = robust_decoder.point if point is None else point
+        self.modulus = self.point.field.modulus
 
         self.degree = degree
         self.batch_size = batch_size
@@ -274,13 +412,14 @@ class IncrementalDecoder(object):
         self._result = None
 
         # State specifically for optimistic run
-        self._guess_decoded = None
-        self._guess_encoded = None
+        self._interpolator = NewtonInterpolator(self.modulus, batch_size)
         self._optimistic = True
 
         # State for robust runs
         self._num_decoded = 0
         self._partial_result = []
+        # Last robust decoding which lacked agreement: (decoded, errors)
+        self._robust_guess = None
 
         # Final results
         self._result = None
@@ -303,51 +442,61 @@ class IncrementalDecoder(object):
         return self.degree + 1 + self.max_errors - len(self._confirmed_errors)
 
     def _optimistic_update(self, idx, data):
-        """Try to optimistically decode or check if guess is right"""
-        success = True
-        if len(self._available_points) == self.degree + 1:
-            # Optimistic decode
-            self._guess_decoded = self.decoder.decode_batch(
-                self._z, self._available_data
-            )
-            self._guess_encoded = self.encoder.encode_batch(self._guess_decoded)
-        else:
-            # We have a guess. It might be right. Check now
-            for i in range(self.batch_size):
-                if data[i] != self._guess_encoded[i][idx]:
-                    success = False
-                    break
-
-            if success is False:
-                # Guess was incorrect
-                logging.critical("Optimistic decoding failed")
-                self._guess_decoded = None
-                self._guess_encoded = None
-                self._optimistic = False
+        """Extend the optimistic guess with new data, or check it against the guess"""
+        x = self.point(idx).value
+        if len(self._interpolator) <= self.degree:
+            self._interpolator.add(x, data)
+        elif self._interpolator.evaluate(x) != [d % self.modulus for d in data]:
+            # Guess was incorrect
+            logging.critical("Optimistic decoding failed")
+            self._interpolator = None
+            self._optimistic = False
+            return False
 
-        if success and len(self._available_points) >= self._min_points_required():
+        if len(self._available_points) >= max(
+            self.degree + 1, self._min_points_required()
+        ):
             # Decoding successful
-            self._result = self._guess_decoded
+            self._result = self._interpolator.coefficients()
 
-        return success
+        return True
 
-    def _robust_update(self):
-        while self._num_decoded < self.batch_size:
-            decoded, errors = self.robust_decoder.robust_decode(
-                self._z, self._available_data[0]
-            )
+    def _check_robust_guess(self, idx):
+        """Whether the data just received from idx agrees with the robust guess"""
+        p = self.modulus
+        x = self.point(idx).value
+        decoded, _ = self._robust_guess
+        powers = [pow(x, i, p) for i in range(self.degree + 1)]
+        for coeffs, row in zip(decoded, self._available_data):
+            if sum(c * w for c, w in zip(coeffs, powers)) % p != row[-1] % p:
+                return False
+        return True
+
+    def _robust_update(self, idx):
+        if self._num_decoded < self.batch_size:
+            if self._robust_guess is not None and self._check_robust_guess(idx):
+                # The new data only adds to the agreement with the previous guess
+                decoded, errors = self._robust_guess
+            else:
+                decoded, errors = self.robust_decoder.robust_decode_batch(
+                    self._z, self._available_data
+                )
 
             # Need to wait for more data
-            if decoded is None:
-                break
+            if not decoded:
+                self._robust_guess = None
+                return
 
             num_agreement = len(self._available_points) - len(errors)
             if num_agreement < self._min_points_required():
-                break
+                self._robust_guess = decoded, errors
+                return
 
-            self._num_decoded += 1
-            self._available_data = self._available_data[1:]
-            self._partial_result.append(decoded)
+            self._robust_guess = None
+
+            self._num_decoded += len(decoded)
+            self._available_data = self._available_data[len(decoded) :]
+            self._partial_result.extend(decoded)
 
             # Errors detected considered to be confirmed errors
             self._confirmed_errors |= set(errors)
@@ -382,17 +531,22 @@ class IncrementalDecoder(object):
         for i in range(self._num_decoded, self.batch_size):
             self._available_data[i - self._num_decoded].append(data[i])
 
-        # Nothing to do
-        if len(self._available_points) <= self.degree:
-            return
-
-        # I'm still optimistic. Let's guess or validate guess
+        # I'm still optimistic. Let's extend or validate guess
         if self._optimistic and self._optimistic_update(idx, data):
             return
 
         # When optimism fails me
         if len(self._available_points) >= self._min_points_required():
-            self._robust_update()
+            self._robust_update(idx)
+
+    async def add_async(self, idx, data, executor=None):
+        """
+        Same as add, but runs on executor so that the (possibly robust) decoding
+        triggered by new data does not block the event loop. Calls must not
+        overlap, i.e. each one must be awaited before the next.
+        """
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(executor, self.add, idx, data)
 
     def done(self):
         return self._result is not None
@@ -403,6 +557,124 @@ class IncrementalDecoder(object):
         return None, None
 
 
+class CalibrationProfile(object):
+    """
+    Measured encoding and decoding times on this host, used by EncoderSelector
+    and DecoderSelector in place of their built-in heuristics.
+
+    A profile holds, for each of "encoder" and "decoder", a list of entries of the
+    form {"n": ..., "batch_size": ..., "algorithm": ..., "threads": ...} giving the
+    fastest algorithm and thread count measured for that (n, batch size). Queries
+    for other sizes use the nearest measured entry, comparing sizes on a log scale.
+    Profiles are written by `python -m honeybadgermpc.reed_solomon_calibration`.
+
+    No profile is used by default, so that selection does not depend on files
+    found on the host. A profile is only used once set with set_default, which
+    HbmpcConfig does when the "reconstruction" section of the config names one
+    with "rs_profile".
+    """
+
+    VERSION = 1
+    ENV_VAR = "HBMPC_RS_PROFILE"
+    DEFAULT_PATH = Path.home() / ".honeybadgermpc" / "rs_profile.json"
+
+    _default = None
+
+    def __init__(self, entries=None, cpu_count=None):
+        self.entries = {"encoder": [], "decoder": []}
+        if entries is not None:
+            self.entries.update(entries)
+        self.cpu_count = cpu_count
+
+    def add(self, kind, n, batch_size, algorithm, threads):
+        self.entries[kind].append(
+            {
+                "n": n,
+                "batch_size": batch_size,
+                "algorithm": algorithm,
+                "threads": threads,
+            }
+        )
+
+    def lookup(self, kind, n, batch_size):
+        """
+        :param kind: "encoder" or "decoder"
+        :return: the entry measured closest to (n, batch_size), or None if the
+            profile holds no entries of this kind
+        """
+
+        def distance(entry):
+            return abs(math.log2(entry["n"] / n)) + abs(
+                math.log2(entry["batch_size"] / max(batch_size, 1))
+            )
+
+        entries = self.entries.get(kind)
+        if not entries:
+            return None
+        return min(entries, key=distance)
+
+    def to_json(self):
+        return {
+            "version": CalibrationProfile.VERSION,
+            "cpu_count": self.cpu_count,
+            "entries": self.entries,
+        }
+
+    @classmethod
+    def from_json(cls, json_profile):
+        version = json_profile.get("version")
+        if version != CalibrationProfile.VERSION:
+            raise ValueError(f"Unsupported calibration profile version: {version}")
+        return cls(json_profile["entries"], json_profile.get("cpu_count"))
+
+    def save(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.to_json(), f, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            profile = cls.from_json(json.load(f))
+
+        cpu_count = psutil.cpu_count(logical=False)
+        if profile.cpu_count is not None and profile.cpu_count != cpu_count:
+            logging.warning(
+                "Calibration profile %s was measured with %d cores, this host has %d",
+                path,
+                profile.cpu_count,
+                cpu_count,
+            )
+        return profile
+
+    @staticmethod
+    def default_path():
+        """Path the calibration script writes profiles to by default"""
+        return Path(
+            os.environ.get(CalibrationProfile.ENV_VAR, CalibrationProfile.DEFAULT_PATH)
+        )
+
+    @staticmethod
+    def get_default():
+        """Returns the default profile, or None if there is none"""
+        return CalibrationProfile._default
+
+    @staticmethod
+    def set_default(profile):
+        """Replaces the default profile. Pass None to use the built-in heuristics"""
+        CalibrationProfile._default = profile
+
+
+def _set_thread_count(kind, n, k):
+    profile = CalibrationProfile.get_default()
+    entry = None if n is None or profile is None else profile.lookup(kind, n, k)
+    if entry is not None:
+        SetNumThreads(entry["threads"])
+    else:
+        SetNumThreads(min(k, psutil.cpu_count(logical=False)))
+
+
 class EncoderSelector(object):
     # If n is lesser than this value, always pick Vandermonde
     LOW_VAN_THRESHOLD = 8
@@ -410,13 +682,18 @@ class EncoderSelector(object):
     HIGH_VAN_THRESHOLD = 128
 
     @staticmethod
-    def set_optimal_thread_count(k):
-        SetNumThreads(min(k, psutil.cpu_count(logical=False)))
+    def set_optimal_thread_count(k, n=None):
+        _set_thread_count("encoder", n, k)
 
     @staticmethod
     def select(point, k):
         assert point.use_omega_powers is True
         n = point.n
+        profile = CalibrationProfile.get_default()
+        entry = None if profile is None else profile.lookup("encoder", n, k)
+        if entry is not None:
+            return EncoderFactory.get(point, entry["algorithm"])
+
         if n < EncoderSelector.LOW_VAN_THRESHOLD:
             return VandermondeEncoder(point)
         if n >= EncoderSelector.HIGH_VAN_THRESHOLD:
@@ -442,13 +719,18 @@ class DecoderSelector(object):
     BATCH_SIZE_THRESH_SLOPE = 0.5
 
     @staticmethod
-    def set_optimal_thread_count(k):
-        SetNumThreads(min(k, psutil.cpu_count(logical=False)))
+    def set_optimal_thread_count(k, n=None):
+        _set_thread_count("decoder", n, k)
 
     @staticmethod
     def select(point, k):
         assert point.use_omega_powers is True
         n = point.n
+        profile = CalibrationProfile.get_default()
+        entry = None if profile is None else profile.lookup("decoder", n, k)
+        if entry is not None:
+            return DecoderFactory.get(point, entry["algorithm"])
+
         if n < DecoderSelector.LOW_VAN_THRESHOLD:
             return VandermondeDecoder(point)
 
@@ -467,11 +749,11 @@ class OptimalEncoder(Encoder):
         self.point = point
 
     def encode_one(self, data):
-        EncoderSelector.set_optimal_thread_count(1)
+        EncoderSelector.set_optimal_thread_count(1, self.point.n)
         return EncoderSelector.select(self.point, 1).encode_one(data)
 
     def encode_batch(self, data):
-        EncoderSelector.set_optimal_thread_count(len(data))
+        EncoderSelector.set_optimal_thread_count(len(data), self.point.n)
         return EncoderSelector.select(self.point, len(data)).encode_batch(data)
 
 
@@ -483,11 +765,11 @@ class OptimalDecoder(Decoder):
         self.point = point
 
     def decode_one(self, z, data):
-        DecoderSelector.set_optimal_thread_count(1)
+        DecoderSelector.set_optimal_thread_count(1, self.point.n)
         return DecoderSelector.select(self.point, 1).decode_one(z, data)
 
     def decode_batch(self, z, data):
-        DecoderSelector.set_optimal_thread_count(len(data))
+        DecoderSelector.set_optimal_thread_count(len(data), self.point.n)
         return DecoderSelector.select(self.point, len(data)).decode_batch(z, data)
 
 
@@ -496,6 +778,7 @@ class Algorithm:
     FFT = "fft"
     GAO = "gao"
     WELCH_BERLEKAMP = "welch-berlekamp"
+    SUBPRODUCT_TREE = "subproduct-tree"
 
 
 class EncoderFactory:
@@ -505,6 +788,8 @@ class EncoderFactory:
             return VandermondeEncoder(point)
         elif algorithm == Algorithm.FFT:
             return FFTEncoder(point)
+        elif algorithm == Algorithm.SUBPRODUCT_TREE:
+            return SubproductTreeEncoder(point)
         elif algorithm is None:
             if point.use_omega_powers:
                 return OptimalEncoder(point)
@@ -514,7 +799,7 @@ class EncoderFactory:
         raise ValueError(
             f"Incorrect algorithm. "
             f"Supported algorithms are "
-            f"{[Algorithm.VANDERMONDE, Algorithm.FFT]}\n"
+            f"{[Algorithm.VANDERMONDE, Algorithm.FFT, Algorithm.SUBPRODUCT_TREE]}\n"
             f"Pass algorithm=None with FFT Enabled for automatic "
             f"selection of encoder"
         )
@@ -527,6 +812,8 @@ class DecoderFactory:
             return VandermondeDecoder(point)
         elif algorithm == Algorithm.FFT:
             return FFTDecoder(point)
+        elif algorithm == Algorithm.SUBPRODUCT_TREE:
+            return SubproductTreeDecoder(point)
         elif algorithm is None:
             if point.use_omega_powers:
                 return OptimalDecoder(point)
@@ -536,7 +823,7 @@ class DecoderFactory:
         raise ValueError(
             f"Incorrect algorithm. "
             f"Supported algorithms are "
-            f"{[Algorithm.VANDERMONDE, Algorithm.FFT]}\n"
+            f"{[Algorithm.VANDERMONDE, Algorithm.FFT, Algorithm.SUBPRODUCT_TREE]}\n"
             f"Pass algorithm=None with FFT Enabled for automatic "
             f"selection of decoder"
         )
@@ -556,3 +843,64 @@ class RobustDecoderFactory:
             f"[{Algorithm.GAO},"
             f" {Algorithm.WELCH_BERLEKAMP}]"
         )
+
+
+Codec = namedtuple("Codec", ["point", "encoder", "decoder", "robust_decoder"])
+
+
+class CodecCache(object):
+    """
+    Evaluation points, encoders and decoders shared by every opening of an Mpc
+    context, built the first time each (degree, use_omega_powers) combination is
+    needed instead of once per opening.
+
+    hits and misses count lookups, and setup_time is the total time spent building
+    codecs, so saved_time estimates the setup time avoided by reusing them.
+    """
+
+    def __init__(self, field, n, t, decoding_algorithm=Algorithm.GAO):
+        self.field = field
+        self.n = n
+        self.t = t
+        self.decoding_algorithm = decoding_algorithm
+        self.hits = 0
+        self.misses = 0
+        self.setup_time = 0.0
+        self._codecs = {}
+
+    def __len__(self):
+        return len(self._codecs)
+
+    @property
+    def saved_time(self):
+        if self.misses == 0:
+            return 0.0
+        return self.hits * self.setup_time / self.misses
+
+    def get(self, degree, use_omega_powers=False):
+        """
+        :type degree: int
+        :type use_omega_powers: bool
+        :return: Codec tuple of (point, encoder, decoder, robust_decoder)
+        """
+        key = (degree, use_omega_powers)
+        codec = self._codecs.get(key)
+        if codec is not None:
+            self.hits += 1
+            return codec
+
+        self.misses += 1
+        start_time = time.perf_counter()
+
+        point = EvalPoint(self.field, self.n, use_omega_powers=use_omega_powers)
+        algorithm = Algorithm.FFT if use_omega_powers else Algorithm.VANDERMONDE
+        codec = Codec(
+            point,
+            EncoderFactory.get(point, algorithm),
+            DecoderFactory.get(point, algorithm),
+            RobustDecoderFactory.get(degree, point, algorithm=self.decoding_algorithm),
+        )
+
+        self.setup_time += time.perf_counter() - start_time
+        self._codecs[key] = codec
+        return codec
@@ -0,0 +1,163 @@
+"""
+Benchmarks every encoding and decoding algorithm on this host and writes the
+fastest choices to a calibration profile, which EncoderSelector and
+DecoderSelector (and so OptimalEncoder and OptimalDecoder) then use instead of
+their built-in heuristics.
+
+Usage:
+    python -m honeybadgermpc.reed_solomon_calibration [-o PROFILE_PATH]
+
+By default the profile is written to the path which is read at startup, see
+`honeybadgermpc.reed_solomon.CalibrationProfile`.
+"""
+
+import logging
+import time
+from argparse import ArgumentParser
+from random import randint
+
+import psutil
+
+from honeybadgermpc.elliptic_curve import Subgroup
+from honeybadgermpc.field import GF
+from honeybadgermpc.ntl import SetNumThreads
+from honeybadgermpc.polynomial import EvalPoint
+from honeybadgermpc.reed_solomon import (
+    Algorithm,
+    CalibrationProfile,
+    DecoderFactory,
+    EncoderFactory,
+)
+
+DEFAULT_NS = [4, 8, 16, 32, 64, 128, 256]
+DEFAULT_BATCH_SIZES = [1, 16, 256, 4096]
+ALGORITHMS = [Algorithm.VANDERMONDE, Algorithm.FFT, Algorithm.SUBPRODUCT_TREE]
+
+
+def _time(f, repeat):
+    """Best wall clock time of `repeat` runs of f"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        f()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def _benchmark(point, algorithm, batch_size, repeat):
+    """
+    Times encoding and decoding a batch of batch_size polynomials of degree t,
+    where n = 3t + 1, as done in batch reconstruction.
+
+    outputs:
+        Tuple of (encoding time, decoding time) in seconds
+    """
+    p = point.field.modulus
+    t = (point.n - 1) // 3
+    coeffs = [[randint(0, p - 1) for _ in range(t + 1)] for _ in range(batch_size)]
+
+    enc = EncoderFactory.get(point, algorithm)
+    dec = DecoderFactory.get(point, algorithm)
+    encoded = enc.encode_batch(coeffs)
+
+    # Decode from the first t + 1 parties, as in the optimistic case
+    z = list(range(t + 1))
+    shares = [row[: t + 1] for row in encoded]
+
+    encode_time = _time(lambda: enc.encode_batch(coeffs), repeat)
+    decode_time = _time(lambda: dec.decode_batch(z, shares), repeat)
+    return encode_time, decode_time
+
+
+def calibrate(
+    field=None,
+    ns=DEFAULT_NS,
+    batch_sizes=DEFAULT_BATCH_SIZES,
+    thread_counts=None,
+    algorithms=ALGORITHMS,
+    repeat=3,
+):
+    """
+    Benchmarks every algorithm for every combination of n, batch size and thread
+    count, and returns a CalibrationProfile recording the fastest combination of
+    algorithm and thread count for each (n, batch size).
+
+    args:
+        field: field to benchmark in (defaults to the BLS12-381 scalar field)
+        ns: number of parties to calibrate for
+        batch_sizes: number of polynomials encoded or decoded at once
+        thread_counts: NTL/OpenMP thread counts to try (defaults to powers of two
+            up to the number of physical cores)
+        algorithms: algorithms to compare
+        repeat: number of runs per measurement, of which the fastest is kept
+    """
+    if field is None:
+        field = GF(Subgroup.BLS12_381)
+
+    cpu_count = psutil.cpu_count(logical=False)
+    if thread_counts is None:
+        thread_counts = [2 ** i for i in range(cpu_count.bit_length())]
+
+    profile = CalibrationProfile(cpu_count=cpu_count)
+    try:
+        for n in ns:
+            point = EvalPoint(field, n, use_omega_powers=True)
+            for k in batch_sizes:
+                best = {"encoder": None, "decoder": None}
+                for algorithm in algorithms:
+                    for threads in thread_counts:
+                        SetNumThreads(threads)
+                        times = _benchmark(point, algorithm, k, repeat)
+                        logging.info(
+                            "n=%d k=%d %s threads=%d: encode %.6fs decode %.6fs",
+                            n,
+                            k,
+                            algorithm,
+                            threads,
+                            *times,
+                        )
+                        for kind, elapsed in zip(["encoder", "decoder"], times):
+                            if best[kind] is None or elapsed < best[kind][0]:
+                                best[kind] = (elapsed, algorithm, threads)
+
+                for kind, (_, algorithm, threads) in best.items():
+                    profile.add(kind, n, k, algorithm, threads)
+    finally:
+        SetNumThreads(cpu_count)
+
+    return profile
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(
+        description="Calibrates Reed-Solomon encoder and decoder selection."
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=str,
+        default=None,
+        help="Path to write the profile to. Defaults to $HBMPC_RS_PROFILE, or "
+        "~/.honeybadgermpc/rs_profile.json",
+    )
+    parser.add_argument("-n", type=int, nargs="+", default=DEFAULT_NS)
+    parser.add_argument(
+        "-k", "--batch-sizes", type=int, nargs="+", default=DEFAULT_BATCH_SIZES
+    )
+    parser.add_argument("-t", "--threads", type=int, nargs="+", default=None)
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    output = args.output
+    if output is None:
+        output = CalibrationProfile.default_path()
+
+    logging.getLogger().setLevel(logging.INFO)
+    calibrate(
+        ns=args.n,
+        batch_sizes=args.batch_sizes,
+        thread_counts=args.threads,
+        repeat=args.repeat,
+    ).save(output)
+    logging.info("Calibration profile written to %s", output)
@@ -11,7 +11,11 @@ from honeybadgermpc.reed_solomon import IncrementalDecoder
 from honeybadgermpc.batch_reconstruction import fetch_one  # noqa I100
 
 
-async def robust_reconstruct(field_futures, field, n, t, point, degree):
+def _incremental_decoder(point, t, degree, batch_size, codecs=None):
+    if codecs is not None:
+        _, enc, dec, robust_dec = codecs.get(degree, point.use_omega_powers)
+        return IncrementalDecoder(enc, dec, robust_dec, degree, batch_size, t)
+
     use_omega_powers = point.use_omega_powers
     enc = EncoderFactory.get(
         point, Algorithm.FFT if use_omega_powers else Algorithm.VANDERMONDE
@@ -19,8 +23,12 @@ async def robust_reconstruct(field_futures, field, n, t, point, degree):
     dec = DecoderFactory.get(
         point, Algorithm.FFT if use_omega_powers else Algorithm.VANDERMONDE
     )
-    robust_dec = RobustDecoderFactory.get(t, point, algorithm=Algorithm.GAO)
-    incremental_decoder = IncrementalDecoder(enc, dec, robust_dec, degree, 1, t)
+    robust_dec = RobustDecoderFactory.get(degree, point, algorithm=Algorithm.GAO)
+    return IncrementalDecoder(enc, dec, robust_dec, degree, batch_size, t)
+
+
+async def robust_reconstruct(field_futures, field, n, t, point, degree, codecs=None):
+    incremental_decoder = _incremental_decoder(point, t, degree, 1, codecs)
 
     async for (idx, d) in fetch_one(field_futures):
         incremental_decoder.add(idx, [d.value])
@@ -28,3 +36,29 @@ async def robust_reconstruct(field_futures, field, n, t, point, degree):
             polys, errors = incremental_decoder.get_results()
             return polynomials_over(field)(polys[0]), errors
     return None, None
+
+
+async def robust_reconstruct_batch(
+    field_futures, field, n, t, point, degree, codecs=None
+):
+    """ Robustly reconstructs a batch of secrets at once.
+
+    args:
+        field_futures: one awaitable per party, resolving to the list of that
+            party's shares (GFElements) of each secret
+        field, n, t, point, degree: as in robust_reconstruct
+        codecs: optional CodecCache to take the encoders and decoders from
+
+    outputs:
+        Tuple of (list of the coefficients of each reconstructed polynomial, errors),
+        or (None, None) if reconstruction failed
+    """
+    incremental_decoder = None
+
+    async for (idx, d) in fetch_one(field_futures):
+        if incremental_decoder is None:
+            incremental_decoder = _incremental_decoder(point, t, degree, len(d), codecs)
+        incremental_decoder.add(idx, [v.value for v in d])
+        if incremental_decoder.done():
+            return incremental_decoder.get_results()
+    return None, None
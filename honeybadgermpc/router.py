@@ -1,8 +1,12 @@
 import asyncio
+import heapq
 import logging
+import random
 from abc import ABC, abstractmethod
 from functools import partial
 
+from honeybadgermpc.utils.misc import MonitoredQueue
+from honeybadgermpc.utils.serialization import MessageCodec
 from honeybadgermpc.utils.typecheck import TypeCheck
 
 
@@ -72,8 +76,10 @@ class SimpleRouter(Router):
     def __init__(self, num_parties: int):
         super().__init__(num_parties)
 
-        # Mailboxes for each party
-        self._queues = [asyncio.Queue() for _ in range(num_parties)]
+        # Mailboxes for each party. They are left unbounded: the parties share one
+        # process, so a queued message holds no memory beyond the object its sender
+        # built, and the synchronous send could only fail or buffer it aside.
+        self._queues = [MonitoredQueue() for _ in range(num_parties)]
 
     @TypeCheck()
     async def recv(self, player_id: int) -> object:
@@ -105,3 +111,121 @@ class SimpleRouter(Router):
 
         if self.debug:
             logging.debug(f"Sent {message} [{player_id}->{dest_id}]")
+
+
+class LinkConfig(object):  # noqa B903
+    def __init__(self, latency=0.0, bandwidth=None, drop_rate=0.0, reorder_rate=0.0):
+        """ Properties of the link from one player to another in a SimulatedRouter.
+
+        args:
+            latency (float or callable): one way delay of messages in seconds, or a
+                function drawing it from a random.Random, e.g.
+                lambda rnd: rnd.gauss(0.05, 0.01)
+            bandwidth (float): bytes per second the link can carry, or None for no
+                limit. Messages are sized by their serialized length.
+            drop_rate (float): probability for a message to be lost
+            reorder_rate (float): probability for a message to be delayed by one
+                more latency and overtaken by the messages sent after it
+        """
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.drop_rate = drop_rate
+        self.reorder_rate = reorder_rate
+
+
+class SimulatedRouter(SimpleRouter):
+    """ Router which simulates a network with the latency, bandwidth and losses of
+    its links, so that protocols can be run as over a WAN within a single process.
+
+    Messages on a link are sent one after the other at the bandwidth of the link,
+    then arrive after its latency, in order unless reordered. All the randomness
+    comes from the seed, so runs are reproducible. Run it on a VirtualTimeEventLoop
+    for the simulated delays not to take any real time.
+    """
+
+    def __init__(self, num_parties, link=None, links=None, seed=None, field=None):
+        """
+        args:
+            num_parties (int): number of players
+            link (LinkConfig): properties of all the links between two players
+            links (dict): LinkConfig of specific links, by (sender id, receiver id)
+            seed: seed of the random number generator
+            field (GF): field of the elements in the messages, used to size them
+        """
+        super().__init__(num_parties)
+        self.link = link if link is not None else LinkConfig()
+        self.links = links if links is not None else {}
+        self.rnd = random.Random(seed)
+        self._codec = MessageCodec(field)
+
+        self.bytes_sent = 0
+        self.msgs_dropped = 0
+        # Time at which each link is done sending the messages queued on it, and at
+        # which the last message sent on it in order arrives
+        self._link_free = {}
+        self._last_arrival = {}
+
+    def _latency(self, link):
+        if callable(link.latency):
+            return max(0.0, link.latency(self.rnd))
+        return link.latency
+
+    def send(self, player_id: int, dest_id: int, message: object):
+        """ Overridden to deliver the message after the delay of the link.
+        """
+        loop = asyncio.get_event_loop()
+        if player_id == dest_id:
+            loop.call_soon(super().send, player_id, dest_id, message)
+            return
+
+        key = (player_id, dest_id)
+        link = self.links.get(key, self.link)
+        if link.drop_rate and self.rnd.random() < link.drop_rate:
+            self.msgs_dropped += 1
+            return
+
+        now = loop.time()
+        sent = now
+        if link.bandwidth:
+            size = len(self._codec.dumps(message))
+            self.bytes_sent += size
+            sent = max(now, self._link_free.get(key, now)) + size / link.bandwidth
+            self._link_free[key] = sent
+
+        arrival = sent + self._latency(link)
+        if link.reorder_rate and self.rnd.random() < link.reorder_rate:
+            arrival += self._latency(link)
+        else:
+            arrival = max(arrival, self._last_arrival.get(key, arrival))
+            self._last_arrival[key] = arrival
+
+        loop.call_at(arrival, SimpleRouter.send, self, player_id, dest_id, message)
+
+
+class VirtualTimeEventLoop(asyncio.SelectorEventLoop):
+    """ Event loop whose clock only moves forward when every task is waiting, and
+    then jumps straight to the next scheduled callback, so that sleeps and the
+    delays of a SimulatedRouter take no real time.
+
+    It is only meant for simulations: waiting on sockets or threads while timers
+    are scheduled would let these timers fire early.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._virtual_time = 0.0
+
+    def time(self):
+        return self._virtual_time
+
+    def _run_once(self):
+        # Drop the cancelled callbacks first, as the base loop does, so that the
+        # clock jumps to the next live one rather than waiting for it in real time
+        while self._scheduled and self._scheduled[0]._cancelled:
+            self._timer_cancelled_count -= 1
+            handle = heapq.heappop(self._scheduled)
+            handle._scheduled = False
+
+        if not self._ready and self._scheduled:
+            self._virtual_time = max(self._virtual_time, self._scheduled[0]._when)
+        super()._run_once()
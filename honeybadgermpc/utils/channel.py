@@ -0,0 +1,249 @@
+"""
+Sequenced and authenticated channels between two nodes, on top of a transport
+which may drop, duplicate or reorder batches of messages, as zmq does when a
+connection is dropped or a node restarts.
+
+Each batch of messages is sent as the frames [header, mac, msg_1, ..., msg_k], where
+the header holds the epoch of the sender, picked when it starts, the sequence
+number of msg_1 and whether the batch is sent again. The receiver delivers messages
+in sequence order, drops duplicates and batches from older epochs, and acks with
+the control frames [b"", header, mac], whose header holds its own epoch, the
+sequence number of the next message it expects and of the next message to be
+consumed. The sender keeps the messages which were not acked yet, at most a flow
+control window of them, and sends them again when the receiver reports a gap,
+restarts, or stops acking.
+
+When the nodes share a key, the mac is an HMAC-SHA256 of the frames keyed with a
+key derived from it for the direction of the channel, which authenticates the
+sender of the messages. Without a key, the mac is empty.
+
+Since the key only depends on the ids of the nodes, each run of a node also picks a
+random nonce, sent in the headers of its batches and acks, which the peer includes
+in the macs of everything it sends back. A node thus only accepts batches and acks
+from peers which know the nonce of its current run, and rejects those replayed from
+earlier runs. Until a peer knows the nonce, its batches are rejected and acked with
+macs which do not include a nonce, which only tell the peer the nonce of the node,
+after which it sends the messages not acked yet again.
+"""
+
+import hmac
+import os
+from collections import deque
+from hashlib import sha256
+from struct import Struct
+
+# First frame of control messages, which is never the header of a batch
+CONTROL_FRAME = b""
+
+# Flag of batches of messages which are sent again
+RESENT = 1
+
+# Flags of control messages
+ACK_RESEND = 1  # The receiver saw a gap and needs the messages it did not ack again
+ACK_CLOSING = 2  # The receiver no longer consumes messages
+
+NONCE_SIZE = 16
+
+_data_header = Struct(f"<QQB{NONCE_SIZE}s")
+_control_header = Struct(f"<QQQB{NONCE_SIZE}s")
+
+
+def derive_key(key, sender_id, receiver_id):
+    """ Derives the key of the direction sender_id -> receiver_id of a channel from
+    the key shared by the two nodes.
+    """
+    return hmac.new(
+        key, f"hbmpc {sender_id} -> {receiver_id}".encode(), sha256
+    ).digest()
+
+
+class PeerChannel(object):
+    def __init__(self, my_id, peer_id, epoch, window, key=None):
+        """
+        args:
+            my_id (int): id of this node
+            peer_id (int): id of the other node of the channel
+            epoch (int): epoch of this node, larger than the one of any of its
+                previous runs
+            window (int): number of messages which may be sent before they are
+                consumed by the peer, or 0 to disable acks and resends
+            key (bytes): key shared with the peer, or None to not authenticate.
+                Authentication needs a window, as nonces are exchanged in acks.
+        """
+        if key is not None and not window:
+            raise ValueError("Authenticated channels need a flow control window")
+
+        self.peer_id = peer_id
+        self.epoch = epoch
+        self.window = window
+        self._send_key = None if key is None else derive_key(key, my_id, peer_id)
+        self._recv_key = None if key is None else derive_key(key, peer_id, my_id)
+        # Nonce of this run, and of the current run of the peer once it is known
+        self.nonce = bytes(NONCE_SIZE) if key is None else os.urandom(NONCE_SIZE)
+        self.peer_nonce = self.nonce if key is None else None
+
+        # Sending side
+        self.next_seq = 0
+        self.unacked = deque()  # (seq, msg) of the messages not acked yet
+        self.acked = 0  # The peer received all the messages before this one
+        self.consumed_ack = 0  # The peer consumed all the messages before this one
+        self.closing = False
+        self._ack_epoch = None  # Epoch of the peer, as seen in its acks
+
+        # Receiving side
+        self.peer_epoch = None
+        self.expected = 0
+        self.consumed = 0
+        self._last_ack = (0, 0)
+        # Whether messages were lost, and whether they were asked for already
+        self._gap = False
+        self._gap_reported = False
+
+    def _mac(self, key, frames):
+        if key is None:
+            return b""
+        h = hmac.new(key, digestmod=sha256)
+        for frame in frames:
+            h.update(frame)
+        return h.digest()
+
+    def _send_mac(self, frames):
+        peer_nonce = b"" if self.peer_nonce is None else self.peer_nonce
+        return self._mac(self._send_key, [peer_nonce, *frames])
+
+    def _verify(self, mac, frames, nonce):
+        return hmac.compare_digest(mac, self._mac(self._recv_key, [nonce, *frames]))
+
+    def credits(self):
+        """ Number of messages which may be sent to the peer now.
+        """
+        if not self.window or self.closing:
+            return float("inf")
+        return self.window - (self.next_seq - self.consumed_ack)
+
+    def frame(self, msgs):
+        """ Returns the frames of a new batch of serialized messages.
+        """
+        header = _data_header.pack(self.epoch, self.next_seq, 0, self.nonce)
+        if self.window:
+            self.unacked.extend(
+                zip(range(self.next_seq, self.next_seq + len(msgs)), msgs)
+            )
+        self.next_seq += len(msgs)
+        return [header, self._send_mac([header, *msgs]), *msgs]
+
+    def resend_frames(self):
+        """ Returns the frames of a batch of all the messages not acked yet, which
+        may be empty, to let a restarted peer know where to start from.
+        """
+        seq = self.unacked[0][0] if self.unacked else self.next_seq
+        msgs = [msg for _, msg in self.unacked]
+        header = _data_header.pack(self.epoch, seq, RESENT, self.nonce)
+        return [header, self._send_mac([header, *msgs]), *msgs]
+
+    def receive(self, frames):
+        """ Checks a batch received from the peer.
+
+        outputs:
+            The new messages of the batch, in order, or None if the batch is not
+            authentic, is from an older epoch or run, or comes after a gap
+        """
+        if len(frames) < 2 or len(frames[0]) != _data_header.size:
+            return None
+        header, mac, *msgs = frames
+        if not self._verify(mac, [header, *msgs], self.nonce):
+            # Ask for the batch again, which tells the peer the nonce of this run. If
+            # the peer does not know any nonce of this node, it may have restarted,
+            # so ack with macs it can check until it sends a valid batch.
+            if self._verify(mac, [header, *msgs], b""):
+                self.peer_nonce = None
+                self._gap_reported = False
+            self._gap = True
+            return None
+
+        epoch, seq, flags, nonce = _data_header.unpack(header)
+        if self.peer_epoch is None or epoch > self.peer_epoch:
+            # First batch from this run of the peer. If it does not start at 0, this
+            # node restarted, or the first batches were lost, so wait for the peer
+            # to send the messages which were not acked again.
+            self.peer_epoch = epoch
+            self.expected = None
+        elif epoch < self.peer_epoch:
+            return None
+        self.peer_nonce = nonce
+
+        if self.expected is None and (seq == 0 or flags & RESENT):
+            self.expected = self.consumed = seq
+            self._last_ack = (seq, seq)
+        if self.expected is None or seq > self.expected:
+            self._gap = True
+            return None
+
+        self._gap = self._gap_reported = False
+        new_msgs = msgs[self.expected - seq :]
+        self.expected += len(new_msgs)
+        return new_msgs
+
+    def ack_frames(self, flags=0, force=False):
+        """ Returns the frames of an ack of the messages received and consumed so
+        far, which asks for the messages after a gap once. Unless forced, returns
+        None if less than half a window of messages was received or consumed since
+        the last ack.
+        """
+        if self._gap and (force or not self._gap_reported):
+            self._gap_reported = True
+            flags |= ACK_RESEND
+
+        expected = 0 if self.expected is None else self.expected
+        if not force and not flags:
+            step = max(1, self.window // 2)
+            last_expected, last_consumed = self._last_ack
+            if expected - last_expected < step and self.consumed - last_consumed < step:
+                return None
+
+        self._last_ack = (expected, self.consumed)
+        header = _control_header.pack(
+            self.epoch, expected, self.consumed, flags, self.nonce
+        )
+        return [CONTROL_FRAME, header, self._send_mac([header])]
+
+    def receive_ack(self, frames):
+        """ Processes an ack from the peer.
+
+        outputs:
+            Whether the messages not acked yet need to be sent again, see
+            resend_frames
+        """
+        if len(frames) != 3 or len(frames[1]) != _control_header.size:
+            return False
+        _, header, mac = frames
+        epoch, expected, consumed, flags, nonce = _control_header.unpack(header)
+        if not self._verify(mac, [header], self.nonce):
+            # An ack from a peer which does not know the nonce of this run only tells
+            # the nonce of the peer, with which the messages not acked yet are sent
+            # again
+            if self._recv_key is None or not self._verify(mac, [header], b""):
+                return False
+            self.peer_nonce = nonce
+            return True
+
+        # Messages sent before the nonce of the peer was known are sent again
+        resend = bool(flags & ACK_RESEND) or nonce != self.peer_nonce
+        if self._ack_epoch is not None and epoch > self._ack_epoch:
+            # The peer restarted, and lost the messages it did not ack. Its counters
+            # start over from the first batch it receives.
+            self._ack_epoch = epoch
+            resend = True
+        elif self._ack_epoch is not None and epoch < self._ack_epoch:
+            return False
+        else:
+            self._ack_epoch = epoch
+            self.acked = max(self.acked, expected)
+            self.consumed_ack = max(self.consumed_ack, consumed)
+        self.peer_nonce = nonce
+
+        if flags & ACK_CLOSING:
+            self.closing = True
+        while self.unacked and self.unacked[0][0] < self.acked:
+            self.unacked.popleft()
+        return resend
@@ -2,7 +2,6 @@ import asyncio
 import logging
 import traceback
 from asyncio import Queue
-from collections import defaultdict
 from typing import Callable
 
 from .typecheck import TypeCheck
@@ -73,7 +72,136 @@ def transpose_lists(lists: list):
     return [[lists[j][i] for j in range(rows)] for i in range(cols)]
 
 
-def subscribe_recv(recv):
+class MonitoredQueue(Queue):
+    """ asyncio.Queue which records the largest number of items it held at once,
+    i.e. its high-water mark, and which calls on_get, if given, with every item
+    taken out of it.
+    """
+
+    def __init__(self, maxsize=0, on_get=None):
+        super().__init__(maxsize)
+        self.high_water = 0
+        self.on_get = on_get
+
+    def _put(self, item):
+        super()._put(item)
+        if len(self._queue) > self.high_water:
+            self.high_water = len(self._queue)
+
+    def _get(self):
+        item = super()._get()
+        if self.on_get is not None:
+            self.on_get(item)
+        return item
+
+
+class _TagNode(object):
+    """ Node of the tree of subscribed tags shared by nested calls to subscribe_recv.
+
+    A node is a leaf, which queues the messages for its tag, until subscribe_recv is
+    called on the recv returned for it. It then dispatches messages to its children
+    by their next tag instead, without any task in between.
+
+    Messages are consumed once taken out of the queue of a leaf, which calls
+    consumed(sender_id), if given, to let the sender send more. Messages nothing will
+    read anymore, queued for a subscription which was cancelled or for a leaf whose
+    recv was garbage collected, are dropped and consumed as well.
+    """
+
+    __slots__ = ("queue", "children", "taken", "consumed", "closed", "has_recv")
+
+    def __init__(self, maxsize=0, consumed=None):
+        self.queue = MonitoredQueue(maxsize, None if consumed is None else self._on_get)
+        self.children = None
+        self.taken = None
+        self.consumed = consumed
+        self.closed = False
+        self.has_recv = False
+
+    def _on_get(self, item):
+        self.consumed(item[0])
+
+    def route(self, j, msg):
+        """ Returns the leaf for msg, and msg without the tags leading to the leaf,
+        or None if it is to be dropped.
+        """
+        node = self
+        while node.children is not None:
+            try:
+                tag, msg = msg
+                child = node.children.get(tag)
+            except (TypeError, ValueError):
+                logging.warning("Dropping message without a tag from %s", j)
+                child = None
+            else:
+                if child is None:
+                    child = node.children[tag] = _TagNode(
+                        node.queue.maxsize, node.consumed
+                    )
+            if child is None or child.closed:
+                if node.consumed is not None:
+                    node.consumed(j)
+                return None
+            node = child
+        return node, msg
+
+    def dispatch(self, j, msg):
+        routed = self.route(j, msg)
+        if routed is not None:
+            node, msg = routed
+            node.queue.put_nowait((j, msg))
+
+    def make_router(self):
+        self.children = {}
+        self.taken = set()
+        # Messages received before subscribe_recv was called go to the children,
+        # which are consumed once they are taken out of the queues of the children
+        on_get, self.queue.on_get = self.queue.on_get, None
+        while not self.queue.empty():
+            self.dispatch(*self.queue.get_nowait())
+        self.queue.on_get = on_get
+
+    def make_leaf(self, _=None):
+        # Nodes of the subtree whose recv is still in use are closed once it is
+        # garbage collected instead
+        nodes, self.children = [self, *self.children.values()], None
+        while nodes:
+            node = nodes.pop()
+            if node.children is not None:
+                nodes.extend(node.children.values())
+            if not node.has_recv:
+                node.close()
+
+    def close(self):
+        """ Drops the messages queued for this node, and those which arrive later.
+        """
+        self.closed = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+
+
+class _TagRecv(object):
+    """ recv method returned by subscribe, which gets messages from a _TagNode.
+    """
+
+    __slots__ = ("node",)
+
+    def __init__(self, node):
+        self.node = node
+        node.has_recv = True
+
+    async def __call__(self):
+        # Awaited here, so that the recv is not garbage collected while it waits
+        return await self.node.queue.get()
+
+    def __del__(self):
+        # Once the recv of a leaf is gone, nothing reads the messages for its tag
+        self.node.has_recv = False
+        if self.node.children is None:
+            self.node.close()
+
+
+def subscribe_recv(recv, consumed=None, maxsize=0):
     """ Given the recv method for this batch reconstruction,
     create a background loop to put the received events into
     the appropriate queue for the tag
@@ -81,26 +209,50 @@ def subscribe_recv(recv):
     Returns _task and subscribe, where _task is to be run in
     the background to forward events to the associated queue,
     and subscribe, which is used to register a new tag/queue pair
+
+    When recv was itself returned by subscribe, no new loop is created: the tags
+    subscribed here are registered under the tag of recv, so that the loop at the
+    root dispatches messages directly to their final queue. _task is then a future
+    which stops the dispatching to these tags once cancelled.
+
+    Otherwise, consumed(sender_id), if given, is called for each message once it
+    is taken out of the queue of its tag, or dropped, and the queue of each tag holds
+    at most maxsize messages, the loop waiting for room in the queue beyond that.
     """
-    # Stores the queues for each subscribed tag
-    tag_table = defaultdict(Queue)
-    taken = set()  # Replace this with a bloom filter?
+    if isinstance(recv, _TagRecv):
+        root = recv.node
+        root.make_router()
+        _task = asyncio.get_event_loop().create_future()
+        _task.add_done_callback(root.make_leaf)
+    else:
+        root = _TagNode(maxsize, consumed)
+        root.make_router()
+
+        async def _recv_loop():
+            while True:
+                # Whenever we receive a share array, directly put it in the
+                # appropriate queue for that round
+                j, o = await recv()
+                routed = root.route(j, o)
+                if routed is not None:
+                    node, msg = routed
+                    await node.queue.put((j, msg))
+                    # The leaf may have been closed while waiting for room
+                    if node.closed:
+                        node.close()
 
-    async def _recv_loop():
-        while True:
-            # Whenever we receive a share array, directly put it in the
-            # appropriate queue for that round
-            j, (tag, o) = await recv()
-            tag_table[tag].put_nowait((j, o))
+        _task = asyncio.create_task(_recv_loop())
 
     def subscribe(tag):
         # TODO: make this raise an exception
         # Ensure that this tag has not been subscribed to already
-        assert tag not in taken
-        taken.add(tag)
+        assert tag not in root.taken
+        root.taken.add(tag)
 
         # Return the getter of the queue for this tag
-        return tag_table[tag].get
+        child = root.children.get(tag)
+        if child is None:
+            child = root.children[tag] = _TagNode(root.queue.maxsize, root.consumed)
+        return _TagRecv(child)
 
-    _task = asyncio.create_task(_recv_loop())
     return _task, subscribe
@@ -0,0 +1,488 @@
+"""
+Compact binary wire format for the messages exchanged between nodes, used by
+NodeCommunicator.
+
+Messages are trees of tuples and lists holding tags, ids, share values, field
+elements and bytes, e.g. ("sid", ("R1", shareid, [v1, v2, ...])). A MessageCodec
+is bound to the field of the computation, picked by the communicator, so the
+modulus is never sent, and peers cannot make a node build new fields.
+
+The message types which make up the bulk of the traffic, the shares, the batch
+reconstruction, randousha, RBC and AVID messages, have schemas (see SCHEMAS): a
+one byte schema id followed by the items of the message, without a type code per
+item. Other values are written as a one byte type code followed by their payload.
+Lists of share values, either plain ints or elements of the field, are written as
+a single array of fixed-width little-endian words (32 bytes per element of the
+BLS12-381 scalar field), and lists of small ints as an array of int64.
+
+Unlike pickle, loads only ever builds the types listed above, and objects of the
+classes registered with register_type, so a peer cannot make a node run code.
+Values of any other type cannot be sent.
+"""
+
+from struct import Struct, error as StructError
+
+from honeybadgermpc.elliptic_curve import Subgroup
+from honeybadgermpc.field import (
+    GF,
+    GFArray,
+    GFElement,
+    _new_element,
+    pack_ints,
+    unpack_ints,
+)
+
+FORMAT_VERSION = 3
+
+# Type codes
+_NONE = 0
+_TRUE = 1
+_FALSE = 2
+_INT = 3
+_BIG_INT = 4
+_STR = 5
+_BYTES = 6
+_TUPLE = 7
+_LIST = 8
+_ELEMENT = 9
+_ELEMENT_ARRAY = 10
+_INT64_ARRAY = 11
+_SCHEMA = 12
+_WORD_ARRAY = 13
+_GF_ARRAY = 14
+_OBJECT = 15
+
+# Kinds of the items of a schema. Strings in a schema are literal tags, tuples of
+# kinds are tuples of items of these kinds, and a list of a single kind is a list
+# of items of that kind.
+INT = 0  # int64, such as a share id
+INTS = 1  # list of int64
+VALUES = 2  # list of share values, either plain ints or elements of the field
+BYTES = 3
+BYTES_LIST = 4
+ANY = 5  # any value, in the generic format
+
+SCHEMAS = [
+    # Mpc.open_share and Mpc.open_share_array, from batch_reconstruct and
+    # batch_reconstruct_packed
+    ("S", INTS, VALUES),
+    ("R1", INT, VALUES),
+    ("R2", INT, VALUES),
+    ("O", INT, VALUES),
+    # batch_reconstruct and broadcast_decode outside of an Mpc context
+    ("R1", VALUES),
+    ("R2", VALUES),
+    ("O", VALUES),
+    # randousha, whose H3 messages are a single tag
+    ("H1", (VALUES, VALUES)),
+    ("H2", (VALUES, VALUES)),
+    # reliablebroadcast
+    (ANY, "VAL", BYTES, BYTES_LIST, BYTES),
+    (ANY, "ECHO", BYTES, BYTES_LIST, BYTES),
+    (ANY, "READY", BYTES),
+    # AVID
+    (ANY, "VAL", BYTES_LIST, [BYTES_LIST], BYTES_LIST),
+    (ANY, "ECHO"),
+    (ANY, "READY"),
+    (ANY, "RETRIEVE", INT),
+    (ANY, "RESPONSE", INT, BYTES, BYTES),
+]
+
+_int64 = Struct("<q")
+_uint32 = Struct("<I")
+_INT64_MIN, _INT64_MAX = -(2 ** 63), 2 ** 63 - 1
+
+# Errors raised by the writers of schema items and arrays when a value does not
+# match
+_MISMATCH = (TypeError, ValueError, OverflowError, StructError)
+
+# Classes which may be sent, by name, see register_type
+_types = {}
+
+
+def register_type(cls):
+    """ Lets objects of cls be sent, as the state returned by their __getstate__,
+    which must itself be made of values which can be sent. Objects are rebuilt by
+    calling __setstate__ on an instance created without calling __init__.
+
+    The type is identified on the wire by its qualified name, and must be
+    registered on both sides.
+    """
+    _types[f"{cls.__module__}.{cls.__qualname__}"] = cls
+    return cls
+
+
+def _write_bytes(out, b):
+    out += _uint32.pack(len(b))
+    out += b
+
+
+def _read_bytes(view, i):
+    (length,) = _uint32.unpack_from(view, i)
+    i += 4
+    end = i + length
+    if end > len(view):
+        raise ValueError(f"Truncated message at offset {i}")
+    return view[i:end], end
+
+
+def _is_ints(values):
+    # Rules out bools, which would be read back as ints
+    return set(map(type, values)) == {int}
+
+
+def _index_schemas(schemas):
+    """ Indexes the schemas by (number of items, position of the tag, tag), trying
+    the tag at position 0 then at position 1.
+    """
+    index = {}
+    for schema_id, schema in enumerate(schemas):
+        position = 0 if type(schema[0]) is str else 1
+        key = (len(schema), position, schema[position])
+        index.setdefault(key, []).append(schema_id)
+    return index
+
+
+class MessageCodec(object):
+    def __init__(self, field=None, schemas=SCHEMAS):
+        """
+        args:
+            field (GF): field of the elements in the messages, which defaults to the
+                BLS12-381 scalar field used by Mpc
+            schemas (list): message schemas, which must be the same on all nodes
+        """
+        self.field = GF(Subgroup.BLS12_381) if field is None else field
+        self.schemas = schemas
+        self._schema_index = _index_schemas(schemas)
+        self._width = self.field.byte_width
+
+    def _write_elements(self, out, elements):
+        """ Writes a list of elements of the field as an array, without type code.
+        Raises a TypeError if it holds anything else.
+        """
+        field = self.field
+        for v in elements:
+            if type(v) is not GFElement or v.field is not field:
+                raise TypeError("Not an element of the field")
+        out += _uint32.pack(len(elements))
+        out += pack_ints([v.value for v in elements], self._width)
+
+    def _write_words(self, out, values):
+        """ Writes a list of ints as an array of words of the width of the field,
+        without type code. Raises an OverflowError if one of them is negative or
+        does not fit.
+        """
+        out += _uint32.pack(len(values))
+        out += pack_ints(values, self._width)
+
+    def _read_words(self, view, i):
+        (count,) = _uint32.unpack_from(view, i)
+        i += 4
+        end = i + count * self._width
+        if end > len(view):
+            raise ValueError(f"Truncated message at offset {i}")
+        return unpack_ints(view[i:end], self._width), end
+
+    def _read_elements(self, view, i):
+        values, i = self._read_words(view, i)
+        # Values from the network are only reduced, by the GFElement constructor, if
+        # some of them are out of range
+        field = self.field
+        if values and max(values) >= field.modulus:
+            return [GFElement(v, field) for v in values], i
+        return [_new_element(v, field) for v in values], i
+
+    def _write_int64s(self, out, values):
+        out += _uint32.pack(len(values))
+        out += Struct(f"<{len(values)}q").pack(*values)
+
+    def _read_int64s(self, view, i):
+        (count,) = _uint32.unpack_from(view, i)
+        i += 4
+        return list(Struct(f"<{count}q").unpack_from(view, i)), i + 8 * count
+
+    def _write_item(self, out, kind, item):
+        if kind == VALUES:
+            if type(item) is not list:
+                raise TypeError("Not a list")
+            if len(item) > 0 and type(item[0]) is GFElement:
+                out.append(_ELEMENT_ARRAY)
+                self._write_elements(out, item)
+            elif _is_ints(item) or not item:
+                out.append(_WORD_ARRAY)
+                self._write_words(out, item)
+            else:
+                raise TypeError("Not a list of share values")
+        elif kind == INT:
+            if type(item) is not int:
+                raise TypeError("Not an int")
+            out += _int64.pack(item)
+        elif kind == INTS:
+            if type(item) is not list or (item and not _is_ints(item)):
+                raise TypeError("Not a list of ints")
+            self._write_int64s(out, item)
+        elif kind == BYTES:
+            if type(item) is not bytes:
+                raise TypeError("Not bytes")
+            _write_bytes(out, item)
+        elif kind == BYTES_LIST:
+            if type(item) is not list or any(type(b) is not bytes for b in item):
+                raise TypeError("Not a list of bytes")
+            out += _uint32.pack(len(item))
+            for b in item:
+                _write_bytes(out, b)
+        elif type(kind) is tuple:
+            if type(item) is not tuple or len(item) != len(kind):
+                raise TypeError("Not a tuple of the schema")
+            for k, v in zip(kind, item):
+                self._write_item(out, k, v)
+        elif type(kind) is list:
+            if type(item) is not list:
+                raise TypeError("Not a list")
+            out += _uint32.pack(len(item))
+            for v in item:
+                self._write_item(out, kind[0], v)
+        else:
+            self._encode(item, out)
+
+    def _read_item(self, view, i, kind):
+        if kind == VALUES:
+            code = view[i]
+            if code == _ELEMENT_ARRAY:
+                return self._read_elements(view, i + 1)
+            if code == _WORD_ARRAY:
+                return self._read_words(view, i + 1)
+            raise ValueError(f"Unknown type code {code} for values at offset {i}")
+        if kind == INT:
+            return _int64.unpack_from(view, i)[0], i + 8
+        if kind == INTS:
+            return self._read_int64s(view, i)
+        if kind == BYTES:
+            b, i = _read_bytes(view, i)
+            return bytes(b), i
+        if kind == BYTES_LIST:
+            (count,) = _uint32.unpack_from(view, i)
+            i += 4
+            items = []
+            for _ in range(count):
+                b, i = _read_bytes(view, i)
+                items.append(bytes(b))
+            return items, i
+        if type(kind) is tuple:
+            items = []
+            for k in kind:
+                item, i = self._read_item(view, i, k)
+                items.append(item)
+            return tuple(items), i
+        if type(kind) is list:
+            (count,) = _uint32.unpack_from(view, i)
+            i += 4
+            items = []
+            for _ in range(count):
+                item, i = self._read_item(view, i, kind[0])
+                items.append(item)
+            return items, i
+        return self._decode(view, i)
+
+    def _encode_schema(self, obj, out):
+        """ Writes a tuple with the first schema it matches. Returns False if it
+        matches none.
+        """
+        index = self._schema_index
+        schema_ids = None
+        if type(obj[0]) is str:
+            schema_ids = index.get((len(obj), 0, obj[0]))
+        if schema_ids is None and len(obj) > 1 and type(obj[1]) is str:
+            schema_ids = index.get((len(obj), 1, obj[1]))
+        if schema_ids is None:
+            return False
+
+        start = len(out)
+        for schema_id in schema_ids:
+            out.append(_SCHEMA)
+            out.append(schema_id)
+            try:
+                for kind, item in zip(self.schemas[schema_id], obj):
+                    if type(kind) is not str:
+                        self._write_item(out, kind, item)
+                return True
+            except _MISMATCH:
+                del out[start:]
+        return False
+
+    def _encode_array(self, obj, out):
+        """ Writes a list or tuple of ints or of elements of the field as a single
+        array. Returns False if obj holds anything else, or ints which do not fit.
+        """
+        first = obj[0]
+        start = len(out)
+        if type(first) is int:
+            if not _is_ints(obj):
+                return False
+            out.append(_INT64_ARRAY)
+            out.append(_LIST if type(obj) is list else _TUPLE)
+            try:
+                self._write_int64s(out, obj)
+                return True
+            except StructError:
+                del out[start:]
+
+            out.append(_WORD_ARRAY)
+            out.append(_LIST if type(obj) is list else _TUPLE)
+            try:
+                self._write_words(out, obj)
+                return True
+            except OverflowError:
+                del out[start:]
+
+        elif type(first) is GFElement:
+            out.append(_ELEMENT_ARRAY)
+            out.append(_LIST if type(obj) is list else _TUPLE)
+            try:
+                self._write_elements(out, obj)
+                return True
+            except TypeError:
+                del out[start:]
+
+        return False
+
+    def _encode(self, obj, out):
+        t = type(obj)
+        if obj is None:
+            out.append(_NONE)
+        elif t is bool:
+            out.append(_TRUE if obj else _FALSE)
+        elif t is int:
+            if _INT64_MIN <= obj <= _INT64_MAX:
+                out.append(_INT)
+                out += _int64.pack(obj)
+            else:
+                out.append(_BIG_INT)
+                _write_bytes(
+                    out, obj.to_bytes(obj.bit_length() // 8 + 1, "little", signed=True)
+                )
+        elif t is str:
+            out.append(_STR)
+            _write_bytes(out, obj.encode())
+        elif t is bytes:
+            out.append(_BYTES)
+            _write_bytes(out, obj)
+        elif t is GFElement and obj.field is self.field:
+            out.append(_ELEMENT)
+            out += obj.value.to_bytes(self._width, "little")
+        elif t is GFArray and obj.field is self.field:
+            out.append(_GF_ARRAY)
+            self._write_words(out, obj.values)
+        elif t is list or t is tuple:
+            if len(obj) > 0:
+                if t is tuple and self._encode_schema(obj, out):
+                    return
+                if self._encode_array(obj, out):
+                    return
+
+            out.append(_LIST if t is list else _TUPLE)
+            out += _uint32.pack(len(obj))
+            for item in obj:
+                self._encode(item, out)
+        else:
+            name = f"{t.__module__}.{t.__qualname__}"
+            if _types.get(name) is not t:
+                raise TypeError(f"Cannot serialize values of type {name}")
+            out.append(_OBJECT)
+            _write_bytes(out, name.encode())
+            self._encode(obj.__getstate__(), out)
+
+    def dumps(self, obj):
+        """ Serializes obj into the binary wire format. Raises a TypeError if it
+        holds values which cannot be sent.
+        """
+        out = bytearray([FORMAT_VERSION])
+        self._encode(obj, out)
+        return bytes(out)
+
+    def _decode(self, view, i):
+        code = view[i]
+        i += 1
+
+        if code == _NONE:
+            return None, i
+        if code == _TRUE:
+            return True, i
+        if code == _FALSE:
+            return False, i
+        if code == _INT:
+            return _int64.unpack_from(view, i)[0], i + 8
+        if code == _BIG_INT:
+            b, i = _read_bytes(view, i)
+            return int.from_bytes(b, "little", signed=True), i
+        if code == _STR:
+            b, i = _read_bytes(view, i)
+            return str(b, "utf-8"), i
+        if code == _BYTES:
+            b, i = _read_bytes(view, i)
+            return bytes(b), i
+        if code == _LIST or code == _TUPLE:
+            (count,) = _uint32.unpack_from(view, i)
+            i += 4
+            items = []
+            for _ in range(count):
+                item, i = self._decode(view, i)
+                items.append(item)
+            return (items if code == _LIST else tuple(items)), i
+        if code == _ELEMENT:
+            end = i + self._width
+            return GFElement(int.from_bytes(view[i:end], "little"), self.field), end
+        if code == _ELEMENT_ARRAY or code == _WORD_ARRAY or code == _INT64_ARRAY:
+            kind = view[i]
+            if code == _ELEMENT_ARRAY:
+                items, i = self._read_elements(view, i + 1)
+            elif code == _WORD_ARRAY:
+                items, i = self._read_words(view, i + 1)
+            else:
+                items, i = self._read_int64s(view, i + 1)
+            return (items if kind == _LIST else tuple(items)), i
+        if code == _GF_ARRAY:
+            values, i = self._read_words(view, i)
+            field = self.field
+            reduced = not values or max(values) < field.modulus
+            return GFArray(values, field, reduced), i
+        if code == _SCHEMA:
+            schema_id = view[i]
+            if schema_id >= len(self.schemas):
+                raise ValueError(f"Unknown schema {schema_id} at offset {i}")
+            i += 1
+            items = []
+            for kind in self.schemas[schema_id]:
+                if type(kind) is str:
+                    items.append(kind)
+                else:
+                    item, i = self._read_item(view, i, kind)
+                    items.append(item)
+            return tuple(items), i
+        if code == _OBJECT:
+            name, i = _read_bytes(view, i)
+            cls = _types.get(str(name, "utf-8"))
+            if cls is None:
+                raise ValueError(f"Unknown type {str(name, 'utf-8')} at offset {i}")
+            state, i = self._decode(view, i)
+            obj = cls.__new__(cls)
+            obj.__setstate__(state)
+            return obj, i
+
+        raise ValueError(f"Unknown type code {code} at offset {i - 1}")
+
+    def loads(self, buf):
+        """ Deserializes a message written by dumps. Raises a ValueError if buf is
+        not a valid message.
+        """
+        view = bytes(buf)
+        if not view or view[0] != FORMAT_VERSION:
+            raise ValueError("Unsupported wire format version")
+
+        try:
+            obj, i = self._decode(view, 1)
+        except (StructError, IndexError, UnicodeDecodeError, RecursionError) as e:
+            raise ValueError(f"Malformed message: {e}") from e
+        if i != len(view):
+            raise ValueError(f"{len(view) - i} trailing bytes after message")
+        return obj
@@ -0,0 +1,171 @@
+"""
+Single producer, single consumer ring buffers of messages in shared memory, used to
+pass messages between processes running on the same host.
+
+A ring is a file, normally under /dev/shm, mapped into the memory of both the writer
+and the reader process. Its header holds two counters, of the bytes ever written and
+ever read, and each message is written after it as a 4 byte length followed by the
+message, wrapping around at the end of the buffer. Only the writer updates the first
+counter, after the message itself is written, and only the reader updates the second,
+so no locking is needed.
+
+Writers notify readers of new messages by writing a byte to a named pipe of the
+reader (see open_wakeup_pipe and Wakeup), which lets readers wait for messages in
+the event loop rather than polling the rings.
+"""
+
+import errno
+import mmap
+import os
+from struct import Struct
+
+_counter = Struct("<Q")
+_length = Struct("<I")
+
+# The counters are kept on different cache lines
+_WRITTEN_OFFSET = 0
+_READ_OFFSET = 64
+_HEADER_SIZE = 128
+
+DEFAULT_RING_SIZE = 2 ** 24
+
+
+class RingBuffer(object):
+    def __init__(self, path, size=DEFAULT_RING_SIZE, create=False):
+        """ Maps the ring at path. The reader creates the ring, with create=True,
+        while the writer waits for it to exist before opening it.
+
+        args:
+            path (str): path of the file holding the ring
+            size (int): capacity of the ring in bytes, used when creating it
+            create (bool): create the ring, replacing any existing one
+        """
+        self.path = path
+        if create:
+            # Write a new file then rename it, so that a writer never sees a
+            # partially initialized ring
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.truncate(_HEADER_SIZE + size)
+            os.rename(tmp_path, path)
+
+        with open(path, "r+b") as f:
+            self._mm = mmap.mmap(f.fileno(), 0)
+        self.size = len(self._mm) - _HEADER_SIZE
+
+    def _get(self, offset):
+        return _counter.unpack_from(self._mm, offset)[0]
+
+    def _copy_in(self, position, data):
+        start = position % self.size
+        first = min(len(data), self.size - start)
+        self._mm[_HEADER_SIZE + start : _HEADER_SIZE + start + first] = data[:first]
+        if first < len(data):
+            self._mm[_HEADER_SIZE : _HEADER_SIZE + len(data) - first] = data[first:]
+
+    def _copy_out(self, position, length):
+        start = position % self.size
+        first = min(length, self.size - start)
+        data = self._mm[_HEADER_SIZE + start : _HEADER_SIZE + start + first]
+        if first < length:
+            data += self._mm[_HEADER_SIZE : _HEADER_SIZE + length - first]
+        return data
+
+    def write(self, msgs):
+        """ Writes as many of the given messages (bytes) as fit in the ring.
+
+        outputs:
+            Number of messages written
+        """
+        written = self._get(_WRITTEN_OFFSET)
+        free = self.size - (written - self._get(_READ_OFFSET))
+
+        # Records are joined and copied at once, which is much cheaper than copying
+        # them one by one for small messages
+        records = []
+        for msg in msgs:
+            record_size = _length.size + len(msg)
+            if record_size > self.size:
+                raise ValueError(
+                    f"Message of {len(msg)} bytes does not fit in a ring of "
+                    f"{self.size} bytes"
+                )
+            if record_size > free:
+                break
+
+            records.append(_length.pack(len(msg)))
+            records.append(msg)
+            free -= record_size
+
+        data = b"".join(records)
+        self._copy_in(written, data)
+        # Publish the messages only once they are fully written
+        _counter.pack_into(self._mm, _WRITTEN_OFFSET, written + len(data))
+        return len(records) // 2
+
+    def read(self):
+        """ Reads all the messages available in the ring.
+
+        outputs:
+            List of messages, as bytes
+        """
+        written = self._get(_WRITTEN_OFFSET)
+        position = self._get(_READ_OFFSET)
+        data = self._copy_out(position, written - position)
+        _counter.pack_into(self._mm, _READ_OFFSET, written)
+
+        msgs = []
+        i = 0
+        while i < len(data):
+            (length,) = _length.unpack_from(data, i)
+            i += _length.size
+            msgs.append(data[i : i + length])
+            i += length
+        return msgs
+
+    def close(self):
+        self._mm.close()
+
+
+def open_wakeup_pipe(path):
+    """ Creates the named pipe at path and opens it for reading, without blocking.
+
+    outputs:
+        File descriptor of the pipe, to wait on with loop.add_reader
+    """
+    tmp_path = f"{path}.tmp"
+    if os.path.exists(tmp_path):
+        os.unlink(tmp_path)
+    os.mkfifo(tmp_path)
+    # Opening for both reading and writing keeps the pipe from ever reaching EOF
+    # when writers come and go
+    fd = os.open(tmp_path, os.O_RDWR | os.O_NONBLOCK)
+    os.rename(tmp_path, path)
+    return fd
+
+
+def drain_wakeup_pipe(fd):
+    try:
+        while os.read(fd, 4096):
+            pass
+    except BlockingIOError:
+        pass
+
+
+class Wakeup(object):
+    """ Writing end of the named pipe of a reader.
+    """
+
+    def __init__(self, path):
+        self._fd = os.open(path, os.O_WRONLY | os.O_NONBLOCK)
+
+    def notify(self):
+        try:
+            os.write(self._fd, b"\0")
+        except OSError as e:
+            # A full pipe already has a wakeup pending
+            if e.errno != errno.EAGAIN:
+                raise
+
+    def close(self):
+        os.close(self._fd)
@@ -30,7 +30,9 @@ async def _run(peers, n, t, my_id, batch_size):
         else:
             logger.info("Starting RECIPIENT: %d", my_id)
 
-        with HbAvssBatch(pks, sks[my_id], crs, n, t, my_id, send, recv) as hbavss:
+        with HbAvssBatch(
+            pks, sks[my_id], crs, n, t, my_id, send, recv, drain=runner.drain
+        ) as hbavss:
             begin_time = time.time()
             if my_id != dealer_id:
                 hbavss_task = asyncio.create_task(
@@ -1 +1,15 @@
+from pytest import fixture
+
+from honeybadgermpc.reed_solomon import CalibrationProfile
+
 from .fixtures import *  # noqa: F403 F401
+
+
+@fixture(autouse=True)
+def no_calibration_profile():
+    """Runs every test with the built-in encoder and decoder selection, whatever
+    calibration profile a previous test set.
+    """
+    CalibrationProfile.set_default(None)
+    yield
+    CalibrationProfile.set_default(None)
@@ -13,6 +13,7 @@ from honeybadgermpc.progs.mixins.share_arithmetic import (
     DoubleSharingMultiplyArrays,
     InvertShare,
     InvertShareArray,
+    PackedBeaverMultiply,
 )
 from honeybadgermpc.progs.mixins.share_comparison import Equality
 
@@ -288,3 +289,46 @@ async def test_share_array_multiplicative_product(length, test_runner):
 
     results = await run_test_program(_prog, test_runner)
     assert len(results) == n
+
+
+@mark.asyncio
+async def test_packed_open_and_linear_ops(test_runner):
+    n, t, ell, k = 7, 1, 3, 4
+    PreProcessedElements().generate_packed_rands(100, n, t, ell)
+
+    async def _prog(context):
+        x = context.preproc.get_packed_rands(context, k, ell)
+        y = context.preproc.get_packed_rands(context, k, ell)
+        c = [context.field(i) for i in range(k * ell)]
+
+        x_, y_, z_, w_ = await gather(
+            x.open(), y.open(), (x + y - c).open(), (x * c).open()
+        )
+        assert len(x_) == k * ell
+        assert z_ == [i + j - m for (i, j, m) in zip(x_, y_, c)]
+        assert w_ == [i * m for (i, m) in zip(x_, c)]
+        return x_
+
+    results = await run_test_program(_prog, test_runner, n, t)
+    assert all(res == results[0] for res in results)
+
+
+@mark.asyncio
+async def test_packed_beaver_multiply(test_runner):
+    n, t, ell, k = 7, 1, 2, 5
+    pp_elements = PreProcessedElements()
+    pp_elements.generate_packed_rands(100, n, t, ell)
+    pp_elements.generate_packed_triples(100, n, t, ell)
+    pp_elements.generate_packed_double_shares(100, n, t, ell)
+
+    async def _prog(context):
+        x = context.preproc.get_packed_rands(context, k, ell)
+        y = context.preproc.get_packed_rands(context, k, ell)
+
+        xy = await (x * y)
+        assert xy.t == t + ell - 1
+
+        x_, y_, xy_ = await gather(x.open(), y.open(), xy.open())
+        assert xy_ == [i * j for (i, j) in zip(x_, y_)]
+
+    await run_test_program(_prog, test_runner, n, t, mixins=[PackedBeaverMultiply()])
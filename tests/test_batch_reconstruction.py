@@ -3,8 +3,13 @@ import asyncio
 import pytest
 from pytest import mark
 
-from honeybadgermpc.batch_reconstruction import batch_reconstruct
-from honeybadgermpc.field import GFElement
+from honeybadgermpc import batch_reconstruction
+from honeybadgermpc.batch_reconstruction import (
+    batch_reconstruct,
+    batch_reconstruct_stream,
+)
+from honeybadgermpc.config import ReconstructionConfig
+from honeybadgermpc.field import GFArray, GFElement
 from honeybadgermpc.polynomial import EvalPoint
 
 
@@ -50,6 +55,7 @@ async def _get_reconstruction(
     use_omega_powers,
     skip_list=(),
     error_list=(),
+    config=None,
 ):
     """
     :param skip_list: Nodes to skip in reconstruction (Dont send/receive shares)
@@ -67,7 +73,15 @@ async def _get_reconstruction(
             ss = tuple(map(fp, secret_shares[i]))
         towait.append(
             batch_reconstruct(
-                ss, p, t, n, i, sends[i], recvs[i], use_omega_powers=use_omega_powers
+                ss,
+                p,
+                t,
+                n,
+                i,
+                sends[i],
+                recvs[i],
+                config=config,
+                use_omega_powers=use_omega_powers,
             )
         )
     results = await asyncio.gather(*towait)
@@ -110,6 +124,24 @@ async def test_reconstruction_with_errors(
         assert r == secrets
 
 
+@mark.asyncio
+async def test_reconstruction_offloaded(
+    test_router, galois_field, reconstruction_input, monkeypatch
+):
+    # Given
+    n, t, fp, p, secret_shares, secrets = reconstruction_input
+    monkeypatch.setattr(batch_reconstruction, "OFFLOAD_THRESHOLD", 1)
+
+    # When
+    results = await _get_reconstruction(
+        test_router, secret_shares, n, t, fp, p, use_omega_powers=False, error_list=[1]
+    )
+
+    # Then
+    for r in results:
+        assert [e.value for e in r] == secrets
+
+
 @mark.asyncio
 async def test_reconstruction_timeout(test_router, galois_field, reconstruction_input):
     """Test if reconstruction times out if one node is skipped in reconstruction"""
@@ -194,5 +226,118 @@ async def test_fft_reconstruction_timeout(
         await asyncio.wait_for(task, timeout=1)
 
 
+@mark.asyncio
+@mark.parametrize("error_list", [(), (1,)])
+async def test_optimistic_reconstruction(
+    test_router, galois_field, reconstruction_input, error_list
+):
+    # Given
+    n, t, fp, p, secret_shares, secrets = reconstruction_input
+    config = ReconstructionConfig.default()
+    config.optimistic = True
+
+    # When
+    results = await _get_reconstruction(
+        test_router,
+        secret_shares,
+        n,
+        t,
+        fp,
+        p,
+        False,
+        error_list=error_list,
+        config=config,
+    )
+
+    # Then
+    for r in results:
+        for elem in r:
+            assert type(elem) is GFElement
+        assert r == secrets
+
+
+@mark.asyncio
+async def test_optimistic_reconstruction_single_round(
+    test_router, galois_field, reconstruction_input
+):
+    # Given
+    n, t, fp, p, secret_shares, secrets = reconstruction_input
+    config = ReconstructionConfig.from_json({"optimistic": True})
+    sends, recvs, _ = test_router(n)
+    tags = []
+
+    def _send(i):
+        def _inner(dest, o):
+            tags.append(o[0])
+            sends[i](dest, o)
+
+        return _inner
+
+    # When
+    results = await asyncio.gather(
+        *[
+            batch_reconstruct(
+                tuple(map(fp, secret_shares[i])),
+                p,
+                t,
+                n,
+                i,
+                _send(i),
+                recvs[i],
+                config=config,
+            )
+            for i in range(n)
+        ]
+    )
+
+    # Then
+    assert all(r == secrets for r in results)
+    assert tags == ["O"] * n * n
+
+
+async def _collect_stream(stream):
+    return [window async for window in stream]
+
+
+@mark.asyncio
+@mark.parametrize("max_in_flight", [1, 3])
+async def test_reconstruction_stream(
+    test_router, galois_field, polynomial, max_in_flight
+):
+    # Given
+    n, t, fp, p = 4, 1, galois_field, galois_field.modulus
+    secrets = [fp.random() for _ in range(23)]
+    polys = [polynomial.random(t, s) for s in secrets]
+    shares = [GFArray([f(i + 1) for f in polys], fp) for i in range(n)]
+
+    # When
+    sends, recvs, _ = test_router(n)
+    results = await asyncio.gather(
+        *[
+            _collect_stream(
+                batch_reconstruct_stream(
+                    shares[i] * 0 if i == 1 else shares[i],
+                    p,
+                    t,
+                    n,
+                    i,
+                    sends[i],
+                    recvs[i],
+                    window_size=5,
+                    max_in_flight=max_in_flight,
+                )
+            )
+            for i in range(n)
+        ]
+    )
+
+    # Then
+    for windows in results:
+        # The window size is rounded down to a multiple of t + 1
+        assert [len(w) for w in windows] == [4] * 5 + [3]
+        assert all(type(w) is GFArray for w in windows)
+        assert [e for w in windows for e in w] == secrets
+
+
 # TODO: No erasure tests present
 # TODO: Test graceful exit (throw some Error) when reconstruction fails
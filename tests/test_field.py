@@ -3,7 +3,13 @@ import operator
 import pytest
 from pytest import raises
 
-from honeybadgermpc.field import FieldsNotIdentical, GF
+from honeybadgermpc.field import (
+    FieldsNotIdentical,
+    GF,
+    GFArray,
+    pack_ints,
+    unpack_ints,
+)
 
 
 def test_bool():
@@ -56,3 +62,111 @@ def test_singleton_pattern():
     assert gf_2.modulus == 19
     assert gf_1 is GF(19)
     assert GF(19).modulus == 19
+
+
+def test_gf_array_arithmetic(galois_field):
+    xs = [galois_field.random() for _ in range(20)]
+    ys = [galois_field.random() for _ in range(20)]
+    a, b = GFArray(xs, galois_field), GFArray(ys, galois_field)
+    c = galois_field.random()
+
+    assert a + b == [x + y for x, y in zip(xs, ys)]
+    assert a - b == [x - y for x, y in zip(xs, ys)]
+    assert a * b == [x * y for x, y in zip(xs, ys)]
+    assert a * c == [x * c for x in xs]
+    assert 3 - a == [3 - x for x in xs]
+    assert -a == [-x for x in xs]
+    assert a ** 5 == [x ** 5 for x in xs]
+    assert a.dot(b) == sum(x * y for x, y in zip(xs, ys))
+    assert a[3] == xs[3]
+    assert a[2:5] == xs[2:5]
+    assert len(a) == 20
+    assert list(a) == xs
+
+
+def test_gf_array_inverse(galois_field):
+    xs = [galois_field(i) for i in range(1, 30)]
+    a = GFArray(xs, galois_field)
+    assert ~a == [1 / x for x in xs]
+    assert a / a == [1] * len(xs)
+
+    with raises(ZeroDivisionError):
+        ~GFArray([1, 0, 2], galois_field)
+
+
+def test_gf_array_mismatch():
+    field1, field2 = GF(17), GF(7)
+    with raises(FieldsNotIdentical):
+        GFArray([1, 2], field1) + GFArray([1, 2], field2)
+    with raises(FieldsNotIdentical):
+        GFArray([1, 2], field1) * field2(3)
+    with raises(ValueError):
+        GFArray([1, 2], field1) + GFArray([1, 2, 3], field1)
+
+
+def test_batch_inverse(galois_field):
+    values = [galois_field.random() for _ in range(50)] + [galois_field(1), 7]
+    values = [v if v != 0 else galois_field(3) for v in values]
+    inverses = galois_field.batch_inverse(values)
+    assert inverses == [1 / galois_field(int(v)) for v in values]
+    assert galois_field.batch_inverse([]) == []
+
+    with raises(ZeroDivisionError):
+        galois_field.batch_inverse([galois_field(2), galois_field(0)])
+
+
+def test_augmented_assignment_returns_new_element(galois_field):
+    a = galois_field(5)
+    b = a
+    b += 1
+    b *= 2
+    b -= 3
+    assert a == 5 and b == 9
+
+    # Keys stay findable after an augmented assignment to a copy of them
+    d = {a: "a"}
+    key = a
+    key += 1
+    assert d[galois_field(5)] == "a"
+
+
+def test_in_place_operations(galois_field):
+    a, b = galois_field.random(), galois_field.random()
+    x = galois_field(0)
+    assert x.add_in_place(a).mul_in_place(b).sub_in_place(3) is x
+    assert x == a * b - 3
+
+    with raises(TypeError):
+        x.add_in_place("1")
+
+
+def test_operation_results_are_reduced(galois_field):
+    p = galois_field.modulus
+    a, b = galois_field(p - 1), galois_field(p - 2)
+    assert (a + b).value == p - 3
+    assert (galois_field(1) - a).value == 2
+    assert (-galois_field(0)).value == 0
+    assert (a * b).value == 2
+    assert (a / 2).value == (p - 1) * pow(2, p - 2, p) % p
+
+
+def test_element_pickling(galois_field):
+    import pickle
+
+    a = galois_field.random()
+    b = pickle.loads(pickle.dumps(a))
+    assert a == b
+    assert b.field is galois_field
+    assert b.modulus == galois_field.modulus
+
+
+def test_pack_ints(galois_field):
+    assert pack_ints([1, 258], 2) == b"\x01\x00\x02\x01"
+    assert unpack_ints(bytearray(b"\x01\x00\x02\x01"), 2) == [1, 258]
+    assert galois_field.byte_width == 32
+
+    values = GFArray([galois_field.random() for _ in range(10)], galois_field)
+    buf = values.to_bytes()
+    assert len(buf) == 10 * galois_field.byte_width
+    assert GFArray.from_bytes(buf, galois_field) == values
+    assert GFArray.from_bytes(memoryview(buf), galois_field) == values
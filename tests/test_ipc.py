@@ -0,0 +1,201 @@
+import asyncio
+import os
+import socket
+
+from pytest import mark
+
+from honeybadgermpc.config import CommunicationConfig, NodeDetails, Transport
+from honeybadgermpc.ipc import NodeCommunicator, SharedMemoryCommunicator
+from honeybadgermpc.utils.misc import subscribe_recv
+from honeybadgermpc.utils.shm_ring import RingBuffer, open_wakeup_pipe
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@mark.asyncio
+async def test_flow_control():
+    num_msgs, window, high_water = 100, 8, 10
+    peers = {i: NodeDetails("127.0.0.1", _free_port()) for i in range(2)}
+    comm_config = CommunicationConfig(
+        flush_bytes=2 ** 10, flush_delay=0, window=window, high_water=high_water
+    )
+    sender, receiver = [NodeCommunicator(peers, i, 0, comm_config) for i in range(2)]
+    await asyncio.gather(sender.__aenter__(), receiver.__aenter__())
+
+    for k in range(num_msgs):
+        sender.send(1, k)
+    await asyncio.sleep(0.2)
+
+    # Without consuming messages, the receiver only gets a window of them
+    assert receiver.queue_high_water()[0] == window
+    assert sender._sender_queues[1].qsize() == num_msgs - window
+
+    drained = asyncio.create_task(sender.drain())
+    assert [await receiver.recv() for _ in range(num_msgs)] == [
+        (0, k) for k in range(num_msgs)
+    ]
+    await drained
+    assert receiver.queue_high_water()[0] <= window
+
+    await asyncio.gather(
+        sender.__aexit__(None, None, None), receiver.__aexit__(None, None, None)
+    )
+
+
+@mark.asyncio
+async def test_flow_control_subscribed():
+    num_msgs, window, high_water, max_queued = 100, 8, 0, 50
+    peers = {i: NodeDetails("127.0.0.1", _free_port()) for i in range(2)}
+    comm_config = CommunicationConfig(
+        flush_bytes=2 ** 10,
+        flush_delay=0,
+        window=window,
+        high_water=high_water,
+        max_queued=max_queued,
+    )
+    sender, receiver = [NodeCommunicator(peers, i, 0, comm_config) for i in range(2)]
+    await asyncio.gather(sender.__aenter__(), receiver.__aenter__())
+    subscribe_task, subscribe = subscribe_recv(
+        receiver.recv_unconsumed, receiver.consumed, receiver.max_received
+    )
+    recv_a, recv_b = subscribe("a"), subscribe("b")
+
+    # Messages sent beyond max_queued, by producers which do not wait for drain,
+    # are buffered until the queue has room
+    for k in range(max_queued + window):
+        sender.send(1, ("a", k))
+    await asyncio.sleep(0.2)
+
+    # Messages dispatched to their tag are only consumed once taken out of its
+    # queue, so the receiver still only gets a window of them
+    assert receiver.queue_high_water()[0] <= window
+    assert sender._sender_queues[1].qsize() == max_queued
+    assert sender.queue_high_water()[1] == [max_queued]
+
+    assert [await recv_a() for _ in range(max_queued + window)] == [
+        (0, k) for k in range(max_queued + window)
+    ]
+    await sender.drain()
+    for k in range(max_queued, num_msgs):
+        sender.send(1, ("b", k))
+    assert [await recv_b() for _ in range(max_queued, num_msgs)] == [
+        (0, k) for k in range(max_queued, num_msgs)
+    ]
+
+    # Messages to self are buffered the same way once the receiver queue is full
+    for k in range(2 * sender.max_received):
+        sender.send(0, k)
+    assert sender.queue_high_water()[0] == sender.max_received
+    assert [await sender.recv() for _ in range(2 * sender.max_received)] == [
+        (0, k) for k in range(2 * sender.max_received)
+    ]
+
+    subscribe_task.cancel()
+    await asyncio.gather(
+        sender.__aexit__(None, None, None), receiver.__aexit__(None, None, None)
+    )
+
+
+@mark.asyncio
+async def test_shared_memory_communicator(tmp_path):
+    n, num_msgs = 4, 50
+    peers = {i: NodeDetails("127.0.0.1", 0) for i in range(n)}
+    # Small rings, so that senders have to wait for them to be read
+    comm_config = CommunicationConfig(
+        flush_bytes=2 ** 10,
+        flush_delay=0,
+        transport=Transport.SHARED_MEMORY,
+        shm_dir=str(tmp_path),
+        ring_size=2 ** 8,
+    )
+    nodes = [SharedMemoryCommunicator(peers, i, 0, comm_config) for i in range(n)]
+    await asyncio.gather(*[node.__aenter__() for node in nodes])
+
+    for node in nodes:
+        for k in range(num_msgs):
+            for j in range(n):
+                node.send(j, ("sid", (node.my_id, j, k)))
+
+    async def _recv_all(node):
+        return [await node.recv() for _ in range(n * num_msgs)]
+
+    received = await asyncio.gather(*[_recv_all(node) for node in nodes])
+    for j, msgs in enumerate(received):
+        for i in range(n):
+            # Messages from each node arrive in order
+            assert [msg for sender_id, msg in msgs if sender_id == i] == [
+                ("sid", (i, j, k)) for k in range(num_msgs)
+            ]
+
+    await asyncio.gather(*[node.__aexit__(None, None, None) for node in nodes])
+    assert list(tmp_path.iterdir()) == []
+
+
+@mark.asyncio
+async def test_shared_memory_stale_files(tmp_path):
+    peers = {i: NodeDetails("127.0.0.1", 0) for i in range(2)}
+    comm_config = CommunicationConfig(
+        flush_bytes=2 ** 10,
+        flush_delay=0,
+        transport=Transport.SHARED_MEMORY,
+        shm_dir=str(tmp_path),
+    )
+
+    # Files left behind by a run which crashed
+    for i, j in [(0, 1), (1, 0)]:
+        RingBuffer(str(tmp_path / f"ring_{i}_{j}"), 2 ** 8, create=True).close()
+    for i in range(2):
+        os.close(open_wakeup_pipe(str(tmp_path / f"wakeup_{i}")))
+
+    # Node 1 starts first, and waits for node 0 to start rather than sending to the
+    # rings of the crashed run
+    nodes = [SharedMemoryCommunicator(peers, i, 0, comm_config) for i in range(2)]
+    await nodes[1].__aenter__()
+    nodes[1].send(0, "hello")
+    await asyncio.sleep(0.05)
+    await nodes[0].__aenter__()
+    assert await asyncio.wait_for(nodes[0].recv(), 5) == (1, "hello")
+
+    # A restarted node gets the messages sent after it stopped
+    await nodes[0].__aexit__(None, None, None)
+    nodes[1].send(0, "world")
+    await asyncio.sleep(0.05)
+    nodes[0] = SharedMemoryCommunicator(peers, 0, 0, comm_config)
+    await nodes[0].__aenter__()
+    assert await asyncio.wait_for(nodes[0].recv(), 5) == (1, "world")
+
+    await asyncio.gather(*[node.__aexit__(None, None, None) for node in nodes])
+    assert list(tmp_path.iterdir()) == []
+
+
+@mark.asyncio
+async def test_authenticated_channels():
+    peers = {i: NodeDetails("127.0.0.1", _free_port()) for i in range(3)}
+    key, other_key = "00" * 32, "11" * 32
+
+    def _config(keys):
+        return CommunicationConfig(flush_bytes=2 ** 10, flush_delay=0, auth_keys=keys)
+
+    # Node 2 does not know the key node 0 shares with node 1
+    nodes = [
+        NodeCommunicator(peers, 0, 0, _config([key, key, key])),
+        NodeCommunicator(peers, 1, 0, _config([key, key, key])),
+        NodeCommunicator(peers, 2, 0, _config([other_key, key, key])),
+    ]
+    await asyncio.gather(*[node.__aenter__() for node in nodes])
+
+    nodes[0].send(1, "hello")
+    nodes[0].send(2, "hello")
+    nodes[2].send(1, "world")
+    assert {await nodes[1].recv(), await nodes[1].recv()} == {
+        (0, "hello"),
+        (2, "world"),
+    }
+    await asyncio.sleep(0.1)
+    assert nodes[2]._receiver_queue.empty()
+
+    await asyncio.gather(*[node.__aexit__(None, None, None) for node in nodes])
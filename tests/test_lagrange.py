@@ -0,0 +1,67 @@
+from random import randint
+
+from pytest import raises
+
+from honeybadgermpc.lagrange import LagrangeCoefficientCache, lagrange_cache
+
+
+def test_lagrange_coefficients(galois_field, polynomial):
+    cache = LagrangeCoefficientCache()
+    poly = polynomial.random(5)
+    xs = [3, 7, 1, 9, 4, 12]
+
+    for x in [0, 5, 7, randint(0, galois_field.modulus - 1)]:
+        coefficients = cache.get(galois_field, xs, x)
+        value = sum(c * poly(xi) for c, xi in zip(coefficients, xs))
+        assert value == poly(x)
+
+
+def test_lagrange_cache_counters(galois_field):
+    cache = LagrangeCoefficientCache()
+    xs = [1, 2, 3, 4]
+
+    first = cache.get(galois_field, xs, 0)
+    assert (cache.hits, cache.misses) == (0, 1)
+
+    # Elements and ints for the same points share a cache entry
+    second = cache.get(galois_field, [galois_field(x) for x in xs], galois_field(0))
+    assert first == second
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    cache.get(galois_field, xs, 1)
+    assert (cache.hits, cache.misses) == (1, 2)
+
+    cache.clear()
+    assert len(cache) == 0
+    assert (cache.hits, cache.misses) == (0, 0)
+
+
+def test_lagrange_cache_eviction(galois_field):
+    cache = LagrangeCoefficientCache(maxsize=2)
+    cache.get(galois_field, [1, 2], 0)
+    cache.get(galois_field, [1, 3], 0)
+    cache.get(galois_field, [1, 2], 0)
+    cache.get(galois_field, [1, 4], 0)
+    assert len(cache) == 2
+
+    # [1, 3] was the least recently used, so it has been evicted
+    cache.get(galois_field, [1, 2], 0)
+    assert cache.hits == 2
+    cache.get(galois_field, [1, 3], 0)
+    assert cache.misses == 4
+
+
+def test_lagrange_duplicate_points(galois_field):
+    cache = LagrangeCoefficientCache()
+    with raises(ZeroDivisionError):
+        cache.get(galois_field, [1, 2, 1], 0)
+
+
+def test_interpolate_at_uses_cache(galois_field, polynomial):
+    poly = polynomial.random(3)
+    shares = [(i, poly(i)) for i in range(1, 5)]
+
+    polynomial.interpolate_at(shares, 0)
+    hits = lagrange_cache.hits
+    assert polynomial.interpolate_at(shares, 0) == poly(0)
+    assert lagrange_cache.hits == hits + 1
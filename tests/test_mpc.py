@@ -59,3 +59,42 @@ async def test_open_future_shares():
     )
     program_runner.add(_prog)
     await program_runner.join()
+
+
+@mark.asyncio
+async def test_open_shares_coalesced():
+    n, t = 4, 1
+    number_of_secrets = 20
+    pp_elements = PreProcessedElements()
+    pp_elements.generate_rands(1000, n, t)
+
+    async def _prog(context):
+        sent = []
+        send = context.send
+
+        def _send(dest, o):
+            sent.append((dest, o))
+            send(dest, o)
+
+        context.send = _send
+
+        shares = [context.preproc.get_rand(context) for _ in range(number_of_secrets)]
+        opened = await asyncio.gather(*[s.open() for s in shares])
+
+        # Every share opened in the same tick goes out in one message per party
+        assert len(sent) == n
+        for (_, (tag, shareids, values)) in sent:
+            assert tag == "S"
+            assert shareids == list(range(number_of_secrets))
+            assert values == [s.v.value for s in shares]
+
+        # Opening again reconstructs the same values, reusing the same codecs
+        assert await asyncio.gather(*[s.open() for s in shares]) == opened
+        assert (context.codecs.misses, context.codecs.hits) == (1, 1)
+        return opened
+
+    program_runner = TaskProgramRunner(n, t)
+    program_runner.add(_prog)
+    results = await program_runner.join()
+    assert len(results) == n
+    assert all(opened == results[0] for opened in results)
@@ -1,6 +1,10 @@
 import random
 
+from pytest import raises
+
 from honeybadgermpc.ntl import (
+    InterpolationError,
+    clear_vandermonde_cache,
     evaluate,
     fft,
     fft_batch_evaluate,
@@ -9,9 +13,11 @@ from honeybadgermpc.ntl import (
     gao_interpolate,
     lagrange_interpolate,
     partial_fft,
+    set_vandermonde_cache_max_size,
     sqrt_mod,
     vandermonde_batch_evaluate,
     vandermonde_batch_interpolate,
+    vandermonde_cache_size,
 )
 
 
@@ -54,6 +60,61 @@ def test_batch_vandermonde_evaluate(galois_field):
     assert y == [[1, 2], [3, 5]]
 
 
+def test_vandermonde_matrix_cache(galois_field):
+    p = galois_field.modulus
+    x = [1, 2, 3]
+    clear_vandermonde_cache()
+
+    # Interpolation and evaluation matrices are cached separately
+    coeffs = vandermonde_batch_interpolate(x, [[1, 4, 9], [2, 3, 4]], p)
+    assert coeffs == [[0, 0, 1], [1, 1, 0]]
+    assert vandermonde_batch_evaluate(x, coeffs, p) == [[1, 4, 9], [2, 3, 4]]
+    assert vandermonde_cache_size() == 2
+
+    # Repeated calls with the same points reuse the cached matrices
+    assert vandermonde_batch_interpolate(x, [[5, 5, 5]], p) == [[5, 0, 0]]
+    assert vandermonde_batch_evaluate(x, [[5]], p) == [[5, 5, 5]]
+    assert vandermonde_cache_size() == 3
+
+    # Non-invertible matrices are not cached
+    with raises(InterpolationError):
+        vandermonde_batch_interpolate([1, 1], [[1, 2]], p)
+    assert vandermonde_cache_size() == 3
+
+    try:
+        set_vandermonde_cache_max_size(1)
+        assert vandermonde_cache_size() == 1
+        assert vandermonde_batch_interpolate(x, [[1, 4, 9]], p) == [[0, 0, 1]]
+    finally:
+        set_vandermonde_cache_max_size(256)
+        clear_vandermonde_cache()
+    assert vandermonde_cache_size() == 0
+
+
+def test_fft_vandermonde_cache(galois_field, galois_field_roots):
+    p = galois_field.modulus
+    n = 2 ** 5
+    omega = galois_field_roots[5]
+    coeffs = [galois_field.random().value for _ in range(n)]
+    expected = fft(coeffs, omega, p, n)
+
+    # Large ffts keep the vandermonde matrix of their base case in the same
+    # bounded cache as the batch functions
+    clear_vandermonde_cache()
+    assert fft(coeffs, omega, p, n) == expected
+    assert fft(coeffs, omega, p, n) == expected
+    assert vandermonde_cache_size() == 1
+
+    try:
+        set_vandermonde_cache_max_size(0)
+        assert vandermonde_cache_size() == 0
+        assert fft(coeffs, omega, p, n) == expected
+        assert vandermonde_cache_size() == 0
+    finally:
+        set_vandermonde_cache_max_size(256)
+        clear_vandermonde_cache()
+
+
 def test_fft():
     # Given
     coeffs = [0, 1]
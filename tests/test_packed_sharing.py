@@ -0,0 +1,85 @@
+import asyncio
+from random import randint
+
+from pytest import mark
+
+from honeybadgermpc.batch_reconstruction import batch_reconstruct_packed
+from honeybadgermpc.packed_sharing import (
+    public_shares,
+    random_packed_polynomial,
+    secret_points,
+    unpack_secrets,
+)
+
+
+def test_random_packed_polynomial(galois_field):
+    t, ell = 2, 3
+    secrets = [galois_field.random() for _ in range(ell)]
+    f = random_packed_polynomial(galois_field, secrets, t + ell - 1)
+
+    assert len(f.coeffs) == t + ell
+    assert [f(x) for x in secret_points(galois_field, ell)] == secrets
+
+
+def test_unpack_secrets(galois_field):
+    ell = 4
+    secrets = [[randint(0, 100) for _ in range(ell)] for _ in range(3)]
+    polys = [random_packed_polynomial(galois_field, s, ell + 1) for s in secrets]
+
+    coeffs = [[c.value for c in f.coeffs] for f in polys]
+    assert unpack_secrets(galois_field, coeffs, ell) == sum(secrets, [])
+
+
+def test_public_shares(galois_field, polynomial):
+    t, ell, x = 1, 3, 5
+    secrets = [galois_field.random() for _ in range(2 * ell)]
+    values = [galois_field.random() for _ in range(2 * ell)]
+    shares = [
+        random_packed_polynomial(galois_field, secrets[i : i + ell], t + ell - 1)
+        for i in range(0, 2 * ell, ell)
+    ]
+
+    # Public values act as shares of degree ell - 1, which can be added to and
+    # multiplied with packed shares
+    public = public_shares(galois_field, values, ell, x)
+    for i, f in enumerate(shares):
+        g = polynomial.interpolate(
+            [
+                (galois_field(p), v)
+                for p, v in zip(secret_points(galois_field, ell), values[i * ell :])
+            ]
+        )
+        assert public[i] == g(x)
+        assert [(f * g)(p) for p in secret_points(galois_field, ell)] == [
+            s * v for s, v in zip(secrets[i * ell : (i + 1) * ell], values[i * ell :])
+        ]
+
+
+@mark.asyncio
+@mark.parametrize("faulty", [(), (2,)])
+async def test_batch_reconstruct_packed(test_router, galois_field, faulty):
+    n, t, ell = 7, 1, 3
+    secrets = [galois_field.random().value for _ in range(2 * ell)]
+    polys = [
+        random_packed_polynomial(galois_field, secrets[i : i + ell], t + ell - 1)
+        for i in range(0, 2 * ell, ell)
+    ]
+
+    sends, recvs, _ = test_router(n)
+    results = await asyncio.gather(
+        *[
+            batch_reconstruct_packed(
+                [galois_field(0) if i in faulty else f(i + 1) for f in polys],
+                galois_field.modulus,
+                t,
+                ell,
+                n,
+                i,
+                sends[i],
+                recvs[i],
+            )
+            for i in range(n)
+        ]
+    )
+    for result in results:
+        assert [v.value for v in result] == secrets
@@ -1,6 +1,26 @@
 from random import randint, shuffle
 
-from honeybadgermpc.polynomial import fnt_decode_step1, fnt_decode_step2, get_omega
+from pytest import mark, raises
+
+from honeybadgermpc.field import GFArray
+from honeybadgermpc.polynomial import (
+    TWIDDLE_CACHE_SIZE,
+    _mul_karatsuba,
+    _mul_ntt,
+    _mul_schoolbook,
+    _twiddle_cache,
+    fnt_decode_step1,
+    fnt_decode_step2,
+    get_omega,
+    intt,
+    intt_batch,
+    ntt,
+    ntt_batch,
+    NewtonInterpolator,
+    SubproductTree,
+    get_subproduct_tree,
+    poly_mul,
+)
 
 
 def test_poly_eval_at_k(galois_field, polynomial):
@@ -20,6 +40,16 @@ def test_poly_eval_at_k(galois_field, polynomial):
     assert y == poly3(x)
 
 
+def test_poly_packed_coeffs(galois_field, polynomial):
+    a = polynomial([1, galois_field(2), 3, 0])
+    b = polynomial(GFArray([5, -1], galois_field))
+    assert isinstance(a.coeffs, GFArray) and a.coeffs == [1, 2, 3]
+    assert a + b == polynomial([6, 1, 3])
+    assert (a - a).is_zero()
+    assert (a * b)(7) == a(7) * b(7)
+    assert divmod(a * b + polynomial([4]), b) == (a, polynomial([4]))
+
+
 def test_evaluate_fft(galois_field, polynomial):
     d = randint(210, 300)
     coeffs = [galois_field.random().value for i in range(d)]
@@ -45,6 +75,36 @@ def test_interpolate_fft(galois_field, polynomial):
         assert poly(pow(omega, i)) == a
 
 
+def test_ntt(galois_field, polynomial):
+    p = galois_field.modulus
+    for n in [2, 8, 64, 512]:
+        poly = polynomial.random(n - 1)
+        omega = get_omega(galois_field, n)
+        coeffs = [c.value for c in poly.coeffs] + [0] * (n - len(poly.coeffs))
+
+        evals = ntt(list(coeffs), omega, p)
+        assert evals == [poly(pow(omega, i)).value for i in range(n)]
+        assert intt(evals, omega, p) == coeffs
+
+
+@mark.parametrize("n, k", [(2, 3), (4, 50), (32, 5)])
+def test_ntt_batch(galois_field, polynomial, n, k):
+    p = galois_field.modulus
+    omega = get_omega(galois_field, n)
+    polys = [[galois_field.random().value for _ in range(n)] for _ in range(k)]
+
+    evals = ntt_batch([list(a) for a in polys], omega, p)
+    assert evals == [ntt(list(a), omega, p) for a in polys]
+    assert intt_batch(evals, omega, p) == polys
+
+
+def test_twiddle_cache_bounded(galois_field):
+    p = galois_field.modulus
+    for i in range(TWIDDLE_CACHE_SIZE + 1):
+        ntt([1, 2, 3, 4], get_omega(galois_field, 4) ** (2 * i + 1), p)
+    assert len(_twiddle_cache) <= TWIDDLE_CACHE_SIZE
+
+
 def test_interp_extrap(galois_field, polynomial):
     d = randint(210, 300)
     y = [galois_field.random().value for i in range(d)]
@@ -142,3 +202,65 @@ def test_rust_poly_interpolate_at_random(rust_field, rust_polynomial):
     values = [(i, random_poly(i)) for i in range(t + 1)]
     k = rust_field.random()
     assert rust_polynomial.interpolate_at(values, k) == random_poly(k)
+
+
+def test_poly_mul_algorithms(galois_field, polynomial):
+    p = galois_field.modulus
+    for la, lb in [(1, 1), (5, 3), (40, 40), (100, 35), (300, 300), (33, 700)]:
+        a = [randint(0, p - 1) for _ in range(la)]
+        b = [randint(0, p - 1) for _ in range(lb)]
+        expected = _mul_schoolbook(a, b, p)
+        assert _mul_karatsuba(a, b, p) == expected
+        assert _mul_ntt(a, b, p) == expected
+        assert poly_mul(a, b, p) == expected
+
+    # Fields without large enough roots of unity fall back to Karatsuba
+    a, b = [randint(0, 16) for _ in range(400)], [randint(0, 16) for _ in range(400)]
+    assert _mul_ntt(a, b, 17) is None
+    assert poly_mul(a, b, 17) == _mul_schoolbook(a, b, 17)
+
+
+def test_poly_divmod(galois_field, polynomial):
+    for la, lb in [(10, 3), (300, 20), (600, 300), (5, 8)]:
+        a, b = polynomial.random(la - 1), polynomial.random(lb - 1)
+        q, r = divmod(a, b)
+        assert q * b + r == a
+        assert r.degree() < b.degree()
+
+    with raises(ZeroDivisionError):
+        divmod(polynomial.random(3), polynomial([]))
+
+
+def test_subproduct_tree(galois_field, polynomial):
+    p = galois_field.modulus
+    for n in [1, 2, 7, 9, 33, 100]:
+        xs = [randint(0, p - 1) for _ in range(n)]
+        tree = SubproductTree(xs, p)
+        poly = polynomial.random(n - 1)
+        values = tree.evaluate([c.value for c in poly.coeffs])
+        assert values == [poly(x).value for x in xs]
+        assert polynomial(tree.interpolate(values)) == poly
+
+        # Polynomials of higher degree are reduced modulo the root first
+        poly = polynomial.random(3 * n)
+        values = tree.evaluate([c.value for c in poly.coeffs])
+        assert values == [poly(x).value for x in xs]
+
+    assert get_subproduct_tree([1, 2, 3], p) is get_subproduct_tree([1, 2, 3], p)
+
+
+def test_newton_interpolator(galois_field, polynomial):
+    p = galois_field.modulus
+    polys = [polynomial.random(4) for _ in range(3)]
+    interpolator = NewtonInterpolator(p, 3)
+
+    for x in [5, 2, 9, 1, 7]:
+        interpolator.add(x, [f(x).value for f in polys])
+    assert len(interpolator) == 5
+
+    x = randint(0, p - 1)
+    assert interpolator.evaluate(x) == [f(x).value for f in polys]
+    assert [polynomial(c) for c in interpolator.coefficients()] == polys
+
+    with raises(ValueError):
+        interpolator.add(2, [0, 0, 0])
@@ -2,6 +2,7 @@ import asyncio
 
 from pytest import mark
 
+from honeybadgermpc.field import GFArray
 from honeybadgermpc.mpc import TaskProgramRunner
 from honeybadgermpc.preprocessing import PreProcessedElements
 
@@ -78,6 +79,31 @@ async def test_get_rand():
     await program_runner.join()
 
 
+@mark.asyncio
+async def test_get_zeros_packed():
+    n, t = 4, 1
+    num_zeros = 50
+    pp_elements = PreProcessedElements()
+    pp_elements.generate_zeros(1000, n, t)
+
+    async def _prog(ctx):
+        zeros = ctx.preproc.get_zeros(ctx, num_zeros)
+        assert len(zeros) == num_zeros
+
+        # Share values stay packed, and Shares are only built on indexing
+        doubled = zeros + zeros
+        assert isinstance(doubled.values, GFArray)
+        assert doubled._share_list is None
+        assert doubled[1].v == zeros.values[1] * 2
+
+        opened = await doubled.open()
+        assert opened == [0] * num_zeros
+
+    program_runner = TaskProgramRunner(n, t)
+    program_runner.add(_prog)
+    await program_runner.join()
+
+
 @mark.asyncio
 async def test_get_bit():
     n, t = 4, 1
@@ -1,19 +1,26 @@
+from random import randint
 from unittest.mock import patch
 
 import pytest
 
 from honeybadgermpc.ntl import AvailableNTLThreads
 from honeybadgermpc.polynomial import EvalPoint
-from honeybadgermpc.reed_solomon import DecoderFactory, EncoderFactory
+from honeybadgermpc.reed_solomon import Algorithm, DecoderFactory, EncoderFactory
 from honeybadgermpc.reed_solomon import DecoderSelector, EncoderSelector
 from honeybadgermpc.reed_solomon import (
+    CalibrationProfile,
+    CodecCache,
     FFTDecoder,
     FFTEncoder,
     GaoRobustDecoder,
+    IncrementalDecoder,
+    SubproductTreeDecoder,
+    SubproductTreeEncoder,
     VandermondeDecoder,
     VandermondeEncoder,
     WelchBerlekampRobustDecoder,
 )
+from honeybadgermpc.reed_solomon_calibration import calibrate
 
 
 @pytest.fixture
@@ -115,6 +122,15 @@ def test_fft_encode(fft_encoding_test_cases):
         assert actual == encoded
 
 
+def test_subproduct_tree_encode(encoding_test_cases, fft_encoding_test_cases):
+    for test_case in encoding_test_cases + fft_encoding_test_cases:
+        data, encoded, point = test_case
+        enc = EncoderFactory.get(point, Algorithm.SUBPRODUCT_TREE)
+        assert isinstance(enc, SubproductTreeEncoder)
+        actual = enc.encode(data)
+        assert actual == encoded
+
+
 def test_auto_encode_fft_disabled(encoding_test_cases):
     # Just check if some encoder is being picked
     for test_case in encoding_test_cases:
@@ -149,6 +165,31 @@ def test_fft_decode(fft_decoding_test_cases):
         assert actual == decoded
 
 
+def test_subproduct_tree_decode(decoding_test_cases, fft_decoding_test_cases):
+    for test_case in decoding_test_cases + fft_decoding_test_cases:
+        z, encoded, decoded, point = test_case
+        dec = DecoderFactory.get(point, Algorithm.SUBPRODUCT_TREE)
+        assert isinstance(dec, SubproductTreeDecoder)
+        actual = dec.decode(z, encoded)
+        assert actual == decoded
+
+
+def test_subproduct_tree_roundtrip(galois_field):
+    n, t = 40, 13
+    point = EvalPoint(galois_field, n)
+    p = galois_field.modulus
+    data = [[randint(0, p - 1) for _ in range(t + 1)] for _ in range(5)]
+
+    enc = SubproductTreeEncoder(point)
+    dec = SubproductTreeDecoder(point)
+    encoded = enc.encode(data)
+    assert encoded == VandermondeEncoder(point).encode(data)
+
+    z = list(range(3, 3 + t + 1))
+    shares = [[e[i] for i in z] for e in encoded]
+    assert dec.decode(z, shares) == data
+
+
 def test_auto_decode_fft_disabled(decoding_test_cases):
     for test_case in decoding_test_cases:
         z, encoded, decoded, point = test_case
@@ -174,6 +215,127 @@ def test_gao_robust_decode(robust_decoding_test_cases):
         assert actual_errors == expected_errors
 
 
+@pytest.mark.parametrize("decoder_cls", [GaoRobustDecoder, WelchBerlekampRobustDecoder])
+def test_robust_decode_batch(galois_field, decoder_cls):
+    n, t = 7, 2
+    p = galois_field.modulus
+    point = EvalPoint(galois_field, n)
+    coeffs = [[randint(0, p - 1) for _ in range(t + 1)] for _ in range(10)]
+    encoded = VandermondeEncoder(point).encode_batch(coeffs)
+
+    # Party 1 corrupts every share, party 4 only the shares of the later chunks
+    for i, row in enumerate(encoded):
+        row[1] = (row[1] + 1) % p
+        if i >= 6:
+            row[4] = (row[4] + 1) % p
+
+    dec = decoder_cls(t, point)
+    with patch.object(dec, "robust_decode", wraps=dec.robust_decode) as robust:
+        decoded, errors = dec.robust_decode_batch(list(range(n)), encoded)
+
+    assert decoded == coeffs
+    assert errors == [1, 4]
+    # Only the first chunk, and the first chunk with a new error, are decoded robustly
+    assert robust.call_count == 2
+
+
+def test_robust_decode_batch_incomplete(galois_field):
+    n, t = 4, 1
+    point = EvalPoint(galois_field, n)
+    encoded = VandermondeEncoder(point).encode_batch([[1, 2], [3, 4], [5, 6]])
+
+    # With only d + 2 points, a second faulty party cannot be corrected
+    z = [0, 1, 2]
+    rows = [[row[zi] for zi in z] for row in encoded]
+    rows[1][0] += 1
+    rows[1][2] += 1
+    decoded, errors = GaoRobustDecoder(t, point).robust_decode_batch(z, rows)
+    assert decoded == [[1, 2]]
+    assert errors == []
+
+
+@pytest.mark.asyncio
+async def test_async_encode_decode(
+    encoding_test_cases, decoding_test_cases, robust_decoding_test_cases
+):
+    for data, encoded, point in encoding_test_cases:
+        assert await VandermondeEncoder(point).encode_async(data) == encoded
+
+    for z, encoded, decoded, point in decoding_test_cases:
+        assert await VandermondeDecoder(point).decode_async(z, encoded) == decoded
+
+    for test_case in robust_decoding_test_cases:
+        z, encoded, decoded, expected_errors, t, point = test_case
+        dec = GaoRobustDecoder(t, point)
+        actual, actual_errors = await dec.robust_decode_async(z, encoded)
+        assert actual == decoded
+        assert actual_errors == expected_errors
+
+
+@pytest.mark.asyncio
+async def test_incremental_decoder_add_async(galois_field):
+    point = EvalPoint(galois_field, 4)
+    enc, dec = VandermondeEncoder(point), VandermondeDecoder(point)
+    coeffs = [[1, 2], [2, 3]]
+    encoded = enc.encode_batch(coeffs)
+
+    inc_decoder = IncrementalDecoder(
+        enc, dec, GaoRobustDecoder(1, point), degree=1, batch_size=2, max_errors=1
+    )
+    for i in range(4):
+        await inc_decoder.add_async(i, [e[i] for e in encoded])
+    assert inc_decoder.get_results() == (coeffs, set())
+
+
+def test_incremental_decoder_optimistic(galois_field):
+    n, t = 10, 3
+    p = galois_field.modulus
+    point = EvalPoint(galois_field, n)
+    enc, dec = VandermondeEncoder(point), VandermondeDecoder(point)
+    robust_dec = GaoRobustDecoder(t, point)
+    coeffs = [[randint(0, p - 1) for _ in range(t + 1)] for _ in range(5)]
+    encoded = enc.encode_batch(coeffs)
+
+    inc_decoder = IncrementalDecoder(
+        enc, dec, robust_dec, degree=t, batch_size=5, max_errors=t
+    )
+    with patch.object(robust_dec, "robust_decode_batch") as robust:
+        for i in [9, 2, 5, 0, 7, 3, 1]:
+            assert not inc_decoder.done()
+            inc_decoder.add(i, [e[i] for e in encoded])
+        robust.assert_not_called()
+
+    assert inc_decoder.done()
+    assert inc_decoder.get_results() == (coeffs, set())
+
+
+def test_incremental_decoder_reuses_robust_guess(galois_field):
+    n, t = 10, 3
+    p = galois_field.modulus
+    point = EvalPoint(galois_field, n)
+    enc, dec = VandermondeEncoder(point), VandermondeDecoder(point)
+    robust_dec = GaoRobustDecoder(t, point)
+    coeffs = [[randint(0, p - 1) for _ in range(t + 1)] for _ in range(5)]
+    encoded = enc.encode_batch(coeffs)
+    for row in encoded:
+        row[2] = (row[2] + 1) % p
+
+    inc_decoder = IncrementalDecoder(
+        enc, dec, robust_dec, degree=t, batch_size=5, max_errors=t
+    )
+    with patch.object(
+        robust_dec, "robust_decode_batch", wraps=robust_dec.robust_decode_batch
+    ) as robust:
+        for i in range(8):
+            inc_decoder.add(i, [e[i] for e in encoded])
+
+        # With 7 points the robust decoding only has 6 agreeing parties. The 8th
+        # party agrees with it, which is checked without decoding again.
+        assert robust.call_count == 1
+
+    assert inc_decoder.get_results() == (coeffs, {2})
+
+
 def test_wb_robust_decode(robust_decoding_test_cases):
     for test_case in robust_decoding_test_cases:
         z, encoded, decoded, expected_errors, t, point = test_case
@@ -275,3 +437,84 @@ def test_decoder_selection(mocked_cpu_count, galois_field):
                     assert isinstance(
                         DecoderSelector.select(point, batch_size), FFTDecoder
                     )
+
+
+def test_calibration_profile_lookup(tmp_path):
+    profile = CalibrationProfile(cpu_count=1)
+    assert profile.lookup("encoder", 4, 1) is None
+
+    profile.add("encoder", 4, 1, Algorithm.VANDERMONDE, 1)
+    profile.add("encoder", 64, 1, Algorithm.FFT, 2)
+    profile.add("encoder", 64, 4096, Algorithm.VANDERMONDE, 4)
+    assert profile.lookup("encoder", 8, 1)["algorithm"] == Algorithm.VANDERMONDE
+    assert profile.lookup("encoder", 100, 2)["algorithm"] == Algorithm.FFT
+    assert profile.lookup("encoder", 100, 1000)["threads"] == 4
+    assert profile.lookup("decoder", 4, 1) is None
+
+    path = tmp_path / "profile.json"
+    profile.save(path)
+    assert CalibrationProfile.load(path).entries == profile.entries
+
+
+def test_calibrated_selection(galois_field, tmp_path, monkeypatch):
+    point = EvalPoint(galois_field, 4, use_omega_powers=True)
+    profile = CalibrationProfile()
+    profile.add("encoder", 4, 1, Algorithm.FFT, 1)
+    profile.add("decoder", 4, 1, Algorithm.SUBPRODUCT_TREE, 1)
+
+    path = tmp_path / "profile.json"
+    profile.save(path)
+
+    # Profiles are never loaded implicitly from the default path
+    monkeypatch.setenv(CalibrationProfile.ENV_VAR, str(path))
+    assert CalibrationProfile.get_default() is None
+    assert isinstance(EncoderSelector.select(point, 1), VandermondeEncoder)
+
+    # The profile overrides the heuristics, which pick Vandermonde for small n
+    CalibrationProfile.set_default(CalibrationProfile.load(path))
+    assert isinstance(EncoderSelector.select(point, 1), FFTEncoder)
+    assert isinstance(DecoderSelector.select(point, 1), SubproductTreeDecoder)
+
+    CalibrationProfile.set_default(None)
+    assert isinstance(EncoderSelector.select(point, 1), VandermondeEncoder)
+    assert isinstance(DecoderSelector.select(point, 1), VandermondeDecoder)
+
+
+def test_calibrate(galois_field):
+    profile = calibrate(
+        galois_field, ns=[4, 8], batch_sizes=[1, 4], thread_counts=[1], repeat=1
+    )
+    for kind in ["encoder", "decoder"]:
+        assert len(profile.entries[kind]) == 4
+        for entry in profile.entries[kind]:
+            assert entry["threads"] == 1
+            assert entry["algorithm"] in [
+                Algorithm.VANDERMONDE,
+                Algorithm.FFT,
+                Algorithm.SUBPRODUCT_TREE,
+            ]
+
+
+def test_codec_cache(galois_field):
+    codecs = CodecCache(galois_field, 4, 1, Algorithm.WELCH_BERLEKAMP)
+
+    codec = codecs.get(1)
+    assert type(codec.encoder) is VandermondeEncoder
+    assert type(codec.decoder) is VandermondeDecoder
+    assert type(codec.robust_decoder) is WelchBerlekampRobustDecoder
+    assert not codec.point.use_omega_powers
+    assert codecs.get(1) is codec
+
+    fft_codec = codecs.get(1, use_omega_powers=True)
+    assert type(fft_codec.encoder) is FFTEncoder
+    assert type(fft_codec.decoder) is FFTDecoder
+    assert fft_codec.point.use_omega_powers
+    assert codecs.get(2) is not codec
+    # Robust decoders are built for the degree of the polynomials they decode
+    assert codec.robust_decoder.d == 1
+    assert codecs.get(2).robust_decoder.d == 2
+
+    assert len(codecs) == 3
+    assert (codecs.hits, codecs.misses) == (2, 3)
+    assert codecs.setup_time > 0
+    assert codecs.saved_time == 2 * codecs.setup_time / 3
@@ -3,7 +3,7 @@ from random import randint
 
 from pytest import mark
 
-from honeybadgermpc.utils.misc import wrap_send
+from honeybadgermpc.utils.misc import subscribe_recv, wrap_send
 
 
 def test_wrap_send():
@@ -19,6 +19,74 @@ def test_wrap_send():
     assert (test_dest, test_message) == (1, ("hello", "world"))
 
 
+@mark.asyncio
+async def test_subscribe_recv_nested():
+    queue = asyncio.Queue()
+    root_task, subscribe = subscribe_recv(queue.get)
+
+    recv_a = subscribe("a")
+    queue.put_nowait((0, ("a", ("x", 1))))
+    queue.put_nowait((1, ("b", 2)))
+    await asyncio.sleep(0)
+
+    # Messages queued before the nested subscription are dispatched again
+    sub_task, sub_subscribe = subscribe_recv(recv_a)
+    recv_ax, recv_ay = sub_subscribe("x"), sub_subscribe("y")
+    assert await recv_ax() == (0, 1)
+
+    queue.put_nowait((2, ("a", ("y", 3))))
+    assert await recv_ay() == (2, 3)
+    assert await subscribe("b")() == (1, 2)
+
+    # Once cancelled, messages for "a" are no longer dispatched by their next tag
+    sub_task.cancel()
+    await asyncio.sleep(0)
+    queue.put_nowait((3, ("a", ("x", 4))))
+    assert await recv_a() == (3, ("x", 4))
+
+    root_task.cancel()
+
+
+@mark.asyncio
+async def test_subscribe_recv_consumed():
+    queue, consumed = asyncio.Queue(), []
+    root_task, subscribe = subscribe_recv(queue.get, consumed.append, 2)
+
+    # Messages are consumed once taken out of the queue of their tag
+    recv_a = subscribe("a")
+    for j in range(3):
+        queue.put_nowait((j, ("a", j)))
+    await asyncio.sleep(0)
+    assert consumed == []
+    assert await recv_a() == (0, 0)
+    assert consumed == [0]
+    assert [await recv_a(), await recv_a()] == [(1, 1), (2, 2)]
+    assert consumed == [0, 1, 2]
+
+    # Messages left for a cancelled subscription are dropped and consumed, once
+    # nothing reads them
+    sub_task, sub_subscribe = subscribe_recv(subscribe("b"))
+    recv_bx = sub_subscribe("x")
+    queue.put_nowait((3, ("b", ("x", 3))))
+    await asyncio.sleep(0)
+    sub_task.cancel()
+    await asyncio.sleep(0)
+    assert consumed[3:] == []
+    del recv_bx
+    assert consumed[3:] == [3]
+
+    # As are those for a tag nobody reads anymore
+    queue.put_nowait((4, ("a", 4)))
+    await asyncio.sleep(0)
+    del recv_a
+    queue.put_nowait((5, ("a", 5)))
+    queue.put_nowait((6, "no tag"))
+    await asyncio.sleep(0)
+    assert consumed[4:] == [4, 5, 6]
+
+    root_task.cancel()
+
+
 @mark.asyncio
 async def test_pool():
     from honeybadgermpc.utils.task_pool import TaskPool
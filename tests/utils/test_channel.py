@@ -0,0 +1,98 @@
+from honeybadgermpc.utils.channel import ACK_CLOSING, ACK_RESEND, PeerChannel
+
+
+def _channels(window=4, keys=(b"key", b"key")):
+    sender = PeerChannel(0, 1, epoch=1, window=window, key=keys[0])
+    receiver = PeerChannel(1, 0, epoch=1, window=window, key=keys[1])
+    # The sender learns the nonce of the receiver from its first ack
+    sender.receive_ack(receiver.ack_frames(force=True))
+    return sender, receiver
+
+
+def test_channel_in_order():
+    sender, receiver = _channels()
+    first, second = sender.frame([b"a", b"b"]), sender.frame([b"c"])
+
+    assert receiver.receive(first) == [b"a", b"b"]
+    # Duplicates are dropped
+    assert receiver.receive(first) == []
+    assert receiver.receive(second) == [b"c"]
+
+    assert sender.credits() == 1
+    receiver.consumed += 3
+    assert not sender.receive_ack(receiver.ack_frames(force=True))
+    assert len(sender.unacked) == 0
+    assert sender.credits() == 4
+
+    sender.receive_ack(receiver.ack_frames(ACK_CLOSING))
+    assert sender.credits() == float("inf")
+
+
+def test_channel_resend():
+    sender, receiver = _channels()
+    sender.frame([b"a"])
+    second = sender.frame([b"b"])
+
+    # The first batch is lost, so the receiver asks for it once
+    assert receiver.receive(second) is None
+    ack = receiver.ack_frames()
+    assert ack is not None
+    assert receiver.ack_frames() is None
+    assert sender.receive_ack(ack)
+
+    assert receiver.receive(sender.resend_frames()) == [b"a", b"b"]
+    sender.receive_ack(receiver.ack_frames(force=True))
+    assert len(sender.unacked) == 0
+
+
+def test_channel_restart():
+    sender, receiver = _channels()
+    sender.frame([b"a"])
+    assert receiver.receive(sender.frame([b"b"])) is None
+    sender.receive_ack(receiver.ack_frames(force=True))
+
+    # A restarted sender starts over with a larger epoch, once it learns the nonce of
+    # the receiver
+    restarted = PeerChannel(0, 1, epoch=2, window=4, key=b"key")
+    assert receiver.receive(restarted.frame([b"c"])) is None
+    assert restarted.receive_ack(receiver.ack_frames())
+    assert receiver.receive(restarted.resend_frames()) == [b"c"]
+    assert receiver.receive(sender.frame([b"d"])) is None
+
+    # Acks from a restarted receiver trigger a resend of what it did not ack
+    restarted = PeerChannel(1, 0, epoch=2, window=4, key=b"key")
+    assert sender.receive_ack(restarted.ack_frames(force=True))
+    assert restarted.receive(sender.resend_frames()) == [b"a", b"b", b"d"]
+
+
+def test_channel_authentication():
+    sender, receiver = _channels(keys=(b"key", b"other key"))
+    assert receiver.receive(sender.frame([b"a"])) is None
+    assert not sender.receive_ack(receiver.ack_frames(ACK_RESEND))
+    assert sender.acked == 0
+
+    # Frames are authenticated as a whole
+    sender, receiver = _channels()
+    frames = sender.frame([b"a"])
+    assert receiver.receive(frames[:2] + [b"b"]) is None
+    assert receiver.receive(frames) == [b"a"]
+
+
+def test_channel_replay():
+    sender, receiver = _channels()
+    batches = [sender.frame([b"a"]), sender.frame([b"b"])]
+    assert receiver.receive(batches[0]) == [b"a"]
+    ack = receiver.ack_frames(force=True)
+
+    # A new run of the receiver rejects the batches sent to earlier runs
+    restarted = PeerChannel(1, 0, epoch=2, window=4, key=b"key")
+    for batch in batches:
+        assert restarted.receive(batch) is None
+    assert sender.receive_ack(restarted.ack_frames(force=True))
+    assert restarted.receive(sender.resend_frames()) == [b"a", b"b"]
+
+    # A new run of the sender rejects the acks sent to earlier runs
+    restarted = PeerChannel(0, 1, epoch=2, window=4, key=b"key")
+    restarted.frame([b"c"])
+    assert not restarted.receive_ack(ack)
+    assert restarted.acked == 0 and len(restarted.unacked) == 1
@@ -0,0 +1,151 @@
+import pickle
+from random import randint
+
+from pytest import fixture, mark, raises
+
+from honeybadgermpc.field import GF
+from honeybadgermpc.utils.serialization import MessageCodec, register_type
+
+
+@fixture
+def codec(galois_field):
+    return MessageCodec(galois_field)
+
+
+@mark.parametrize(
+    "msg",
+    [
+        None,
+        (True, False, 0, -1, 2 ** 63 - 1, -(2 ** 63), 2 ** 300, -(2 ** 300)),
+        ("tag", b"\x00\xff", "", b"", [], ()),
+        [[1, 2], (3, [4, (5,)])],
+        [0, 1, 255, 256, 2 ** 255],
+        (0, 2 ** 256, -1),
+        [1, -1],
+        [1, "a"],
+        [True, 1],
+    ],
+)
+def test_roundtrip(codec, msg):
+    assert codec.loads(codec.dumps(msg)) == msg
+
+
+def test_roundtrip_field_elements(codec, galois_field):
+    elements = [galois_field.random() for _ in range(10)]
+    msg = ("sid", ("randousha", ("H1", (elements, tuple(elements)))))
+
+    result = codec.loads(codec.dumps(msg))
+    assert result == msg
+    assert type(result[1][1][1][1]) is tuple
+    for e in result[1][1][1][0] + [galois_field.random()]:
+        assert e.field is galois_field
+
+
+def test_message_types(codec, galois_field):
+    p = galois_field.modulus
+    values = [randint(0, p - 1) for _ in range(100)]
+    elements = list(map(galois_field, values))
+    messages = [
+        ("sid", ("S", [0, 1, 2], values[:3])),
+        ("sid", ("R1", 7, values)),
+        ("sid", ("R2", 7, elements)),
+        ("sid", ("O", values)),
+        ("sid", ("S", 3, galois_field(5))),
+        ("H1", (values[:10], values[10:20])),
+        ("H3", "S"),
+        ("rbc", ("sid", "VAL", b"roothash", [b"a" * 32, b"b" * 32], b"stripe")),
+        (("rbc", 1), "READY", b"roothash"),
+        ("avid", (0, ("READY", b"roothash"))),
+        ("avid", ("sid", "VAL", [b"r1", b"r2"], [[b"a"], [b"b", b"c"]], [b"s"])),
+        ("avid", ("sid", "RESPONSE", 1, b"roothash", b"stripe")),
+        ("avid", ("sid", "RETRIEVE", 1)),
+        ("avid", ("sid", "ECHO")),
+    ]
+
+    for msg in messages:
+        assert codec.loads(codec.dumps(msg)) == msg
+
+
+def test_schemas(codec, galois_field):
+    elements = [galois_field.random() for _ in range(100)]
+
+    # Messages with a schema have a single type code
+    msg = ("R1", 7, elements)
+    assert codec.dumps(msg)[1] == 12
+    assert len(codec.dumps(msg)) < 100 * 32 + 20
+    assert len(codec.dumps(msg)) < len(pickle.dumps(msg))
+
+    # Lists of ints are written as arrays of words
+    values = [e.value for e in elements]
+    assert len(codec.dumps(("R1", 7, values))) == len(codec.dumps(msg))
+
+    # Messages which do not match their schema are written in the generic format
+    for msg in [
+        ("R1", "7", elements),
+        ("R1", 7, tuple(elements)),
+        ("R1", True, []),
+        ("R1", 7, [-1]),
+        ("R1", 7, [True]),
+    ]:
+        assert codec.dumps(msg)[1] != 12
+        assert codec.loads(codec.dumps(msg)) == msg
+
+
+def test_field_not_sent(codec, galois_field):
+    # Elements of the field are sent without their modulus, and loaded back into the
+    # field of the codec
+    raw = codec.dumps(("S", [0], [galois_field(3)]))
+    assert galois_field.modulus.to_bytes(32, "little") not in raw
+    assert codec.loads(raw)[2][0].field is galois_field
+
+    # Elements of other fields cannot be sent
+    other_field = GF(2 ** 127 - 1)
+    with raises(TypeError):
+        codec.dumps(("R1", 7, [other_field(3)]))
+
+
+class _Point(object):
+    def __init__(self, x, y):
+        self.x, self.y = x, y
+
+    def __getstate__(self):
+        return [self.x, self.y]
+
+    def __setstate__(self, state):
+        self.x, self.y = state
+
+    def __eq__(self, other):
+        return (self.x, self.y) == (other.x, other.y)
+
+
+def test_registered_types(codec):
+    # Only the types registered on both sides can be sent
+    msg = ("RECOVERY1", _Point(1, b"2"))
+    with raises(TypeError):
+        codec.dumps(msg)
+    for value in [{"dict": 1}, {2, 3}, 1.5]:
+        with raises(TypeError):
+            codec.dumps(value)
+
+    register_type(_Point)
+    assert codec.loads(codec.dumps(msg)) == msg
+
+
+def test_loads_pickle(codec):
+    # Pickles are never loaded, as they can run code
+    with raises(ValueError):
+        codec.loads(pickle.dumps(("sid", ("R2", 1, [1, 2, 3]))))
+
+
+def test_loads_invalid(codec):
+    with raises(ValueError):
+        codec.loads(b"\x07\x00")
+    with raises(ValueError):
+        codec.loads(codec.dumps([1, 2]) + b"\x00")
+    with raises(ValueError):
+        codec.loads(b"\x03\x0c\xff")
+    with raises(ValueError):
+        codec.loads(codec.dumps(("R1", 7, [1, 2, 3]))[:-1])
+    # Objects of unregistered types are never built
+    with raises(ValueError):
+        codec.loads(b"\x03\x0f\x0b\x00\x00\x00builtins.eval\x00")
@@ -0,0 +1,51 @@
+import os
+
+from pytest import raises
+
+from honeybadgermpc.utils.shm_ring import (
+    RingBuffer,
+    Wakeup,
+    drain_wakeup_pipe,
+    open_wakeup_pipe,
+)
+
+
+def test_ring_buffer(tmp_path):
+    path = str(tmp_path / "ring")
+    reader = RingBuffer(path, 64, create=True)
+    writer = RingBuffer(path)
+    assert writer.size == 64
+
+    assert reader.read() == []
+    # Messages take 4 bytes for their length, so only 3 of these fit
+    msgs = [bytes([i]) * 16 for i in range(4)]
+    assert writer.write(msgs) == 3
+    assert reader.read() == msgs[:3]
+
+    # Wraps around the end of the ring
+    assert writer.write(msgs[3:] + msgs[:2]) == 3
+    assert reader.read() == msgs[3:] + msgs[:2]
+
+    with raises(ValueError):
+        writer.write([b"\x00" * 64])
+
+    reader.close()
+    writer.close()
+
+
+def test_wakeup_pipe(tmp_path):
+    path = str(tmp_path / "wakeup")
+    fd = open_wakeup_pipe(path)
+    wakeup = Wakeup(path)
+
+    for _ in range(3):
+        wakeup.notify()
+    assert os.read(fd, 16) == b"\0\0\0"
+
+    wakeup.notify()
+    drain_wakeup_pipe(fd)
+    with raises(BlockingIOError):
+        os.read(fd, 16)
+
+    wakeup.close()
+    os.close(fd)